@@ -59,6 +59,8 @@ def print_help():
   评测机:
     judge start          启动评测机服务
     judge start --port 3726  指定端口启动
+    dispatcher           启动独立评测调度器 (从评测队列认领提交)
+    dispatcher --workers 8   指定并发评测数
 
   系统信息:
     status               显示系统状态
@@ -344,6 +346,33 @@ def judge_command(subcmd: str, *args):
         print("可用命令: start, build, status")
 
 
+def run_dispatcher(workers: int = None, poll_interval: float = None):
+    """启动独立评测调度器进程"""
+    os.environ['EVERJUDGE_CONFIG'] = os.environ.get('EVERJUDGE_CONFIG') or os.path.join(project_root, 'config.toml')
+
+    from everjudge import create_app
+    from everjudge.utils.dispatcher import JudgeDispatcher
+    from everjudge.utils.judge_cluster import judge_nodes_from_config
+
+    app = create_app()
+    import logging
+    logging.basicConfig(
+        level=logging.DEBUG if app.config.get('DEBUG') else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    dispatcher = JudgeDispatcher(app, workers=workers, poll_interval=poll_interval)
+    print("启动评测调度器...")
+    print(f"  标识: {dispatcher.worker_id}")
+    print(f"  并发: {dispatcher.workers}")
+    nodes = judge_nodes_from_config(app.config)
+    print(f"  评测机: {len(nodes)} 个节点（路由: {app.config.get('JUDGE_ROUTING', 'least_loaded')}）")
+    for node in nodes:
+        print(f"    - {node.get('host', '127.0.0.1')}:{int(node.get('port', 3726))} 权重 {node.get('weight', 1.0):g}")
+    if app.config.get('JUDGE_DISPATCHER_EMBEDDED', False):
+        print("  提示: Web 进程仍会启动内嵌调度器，可在 config.toml [judge] 中设置 embedded_dispatcher = false")
+    dispatcher.run_forever()
+
+
 def show_status():
     """显示系统状态"""
     print("\n" + "=" * 60)
@@ -504,6 +533,33 @@ def main():
         judge_command(sys.argv[2], *sys.argv[3:])
         return
 
+    if cmd == 'dispatcher':
+        workers = None
+        poll_interval = None
+
+        i = 2
+        while i < len(sys.argv):
+            if sys.argv[i] == '--workers' and i + 1 < len(sys.argv):
+                try:
+                    workers = int(sys.argv[i + 1])
+                except ValueError:
+                    print(f"错误: 无效并发数 {sys.argv[i + 1]}")
+                    return
+                i += 2
+            elif sys.argv[i] == '--poll-interval' and i + 1 < len(sys.argv):
+                try:
+                    poll_interval = float(sys.argv[i + 1])
+                except ValueError:
+                    print(f"错误: 无效轮询间隔 {sys.argv[i + 1]}")
+                    return
+                i += 2
+            else:
+                print(f"未知参数: {sys.argv[i]}")
+                return
+
+        run_dispatcher(workers=workers, poll_interval=poll_interval)
+        return
+
     if cmd == 'shell':
         try:
             from IPython import start_ipython
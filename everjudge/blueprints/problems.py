@@ -11,7 +11,7 @@ from werkzeug.utils import secure_filename
 from ..extensions import db
 from ..models import Problem, TestCase, Submission
 from ..forms import ProblemForm, SubmissionForm, TestCaseForm
-from ..utils import admin_required, judge_submission
+from ..utils import admin_required, enqueue_submission, notify_dispatcher
 # 不再使用get_config函数
 
 
@@ -85,7 +85,8 @@ def create():
             difficulty=form.difficulty.data,
             author=current_user.username,
             visible=form.visible.data,
-            library=form.library.data
+            library=form.library.data,
+            verdict_policy=form.verdict_policy.data
         )
         db.session.add(problem)
         db.session.commit()
@@ -192,17 +193,14 @@ def submit(id):
             user_id=current_user.id,
             code=form.code.data,
             language=form.language.data,
-            status="PENDING",
             score=0
         )
+        enqueue_submission(submission)
         db.session.add(submission)
         db.session.commit()
         
-        # 异步评测
-        import threading
-        thread = threading.Thread(target=judge_submission, args=(submission.id,))
-        thread.daemon = True
-        thread.start()
+        # 入队后唤醒调度器异步评测
+        notify_dispatcher(current_app._get_current_object())
         
         flash("代码提交成功，正在评测中", "success")
         return redirect(url_for("problems.submission", id=submission.id))
@@ -272,9 +270,11 @@ def add_testcase(id):
             score=form.score.data,
             time_limit=form.time_limit.data,
             memory_limit=form.memory_limit.data,
+            subtask=form.subtask.data,
             is_sample=form.is_sample.data
         )
         db.session.add(testcase)
+        problem.testcase_revision = (problem.testcase_revision or 0) + 1
         db.session.commit()
         
         flash("测试用例添加成功", "success")
@@ -300,6 +300,7 @@ def delete_testcase(id, case_id):
     if os.path.exists(output_file):
         os.remove(output_file)
     
+    testcase.problem.testcase_revision = (testcase.problem.testcase_revision or 0) + 1
     db.session.delete(testcase)
     db.session.commit()
     flash("测试用例删除成功", "success")
@@ -351,6 +352,7 @@ def upload_testcases_zip(id):
         # 清空现有测试用例
         for testcase in TestCase.query.filter_by(problem_id=id).all():
             db.session.delete(testcase)
+        problem.testcase_revision = (problem.testcase_revision or 0) + 1
         db.session.commit()
         
         # 删除现有测试用例文件
@@ -129,6 +129,27 @@ class AppConfig:
             "ROOT_LOGIN_ENABLED": bool(root_cfg.get("login_enabled", True)),
             "JUDGE_RPC_HOST": judge.get("rpc_host", "127.0.0.1"),
             "JUDGE_RPC_PORT": judge.get("rpc_port", 3726),
+            "JUDGE_NODES": [
+                {
+                    "host": node.get("host", "127.0.0.1"),
+                    "port": int(node.get("port", 3726)),
+                    "weight": float(node.get("weight", 1.0)),
+                }
+                for node in judge.get("nodes", [])
+            ],
+            "JUDGE_ROUTING": str(judge.get("routing", "least_loaded")).lower(),
+            "JUDGE_SPILL_THRESHOLD": float(judge.get("spill_threshold", 2.0)),
+            "JUDGE_STATS_INTERVAL": float(judge.get("stats_interval", 1.0)),
+            "JUDGE_HEALTH_CHECK_INTERVAL": float(judge.get("health_check_interval", 5.0)),
+            "JUDGE_POOL_SIZE": int(judge.get("pool_size", 4)),
+            "JUDGE_ENCODING": str(judge.get("encoding", "msgpack")).lower(),
+            "JUDGE_RESULT_TIMEOUT": int(judge.get("result_timeout", 60)),
+            "JUDGE_DISPATCHER_EMBEDDED": bool(judge.get("embedded_dispatcher", False)),
+            "JUDGE_DISPATCHER_WORKERS": int(judge.get("dispatcher_workers", 4)),
+            "JUDGE_DISPATCHER_POLL_INTERVAL": float(judge.get("dispatcher_poll_interval", 2.0)),
+            "JUDGE_CLAIM_TIMEOUT": int(judge.get("claim_timeout", 300)),
+            "JUDGE_MAX_ATTEMPTS": int(judge.get("max_attempts", 3)),
+            "JUDGE_VERDICT_CACHE": bool(judge.get("verdict_cache", True)),
             "BABEL_DEFAULT_LOCALE": i18n.get("default_locale", "zh_CN"),
             "BABEL_SUPPORTED_LOCALES": i18n.get("supported_locales", ["zh_CN", "en_US"]),
             "DATA_ROOT": data_root,
@@ -15,6 +15,11 @@ class ProblemForm(FlaskForm):
         ('remote', '远程题库')
     ], default='public')
     visible = BooleanField('是否可见', default=True)
+    verdict_policy = SelectField('判题策略', validators=[DataRequired()], choices=[
+        ('all', '运行全部测试用例，按测试用例计分'),
+        ('first_failure', '遇到首个错误即停止（ICPC）'),
+        ('subtask', '按子任务计分，子任务失败后跳过其余测试用例')
+    ], default='all')
     submit = SubmitField('保存')
     
     def validate_difficulty(self, field):
@@ -48,5 +53,6 @@ class TestCaseForm(FlaskForm):
     score = IntegerField('分值', validators=[DataRequired(), NumberRange(min=1, max=100)])
     time_limit = IntegerField('时间限制 (毫秒)', validators=[Optional(), NumberRange(min=1, max=10000)])
     memory_limit = IntegerField('内存限制 (MB)', validators=[Optional(), NumberRange(min=1, max=1024)])
+    subtask = IntegerField('子任务编号', validators=[Optional(), NumberRange(min=1, max=100)])
     is_sample = BooleanField('是否为样例', default=False)
     submit = SubmitField('保存')
\ No newline at end of file
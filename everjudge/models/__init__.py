@@ -5,5 +5,6 @@ from .user import User
 from .problem import Problem
 from .testcase import TestCase
 from .submission import Submission
+from .verdict_cache import VerdictCache
 
-__all__ = ["User", "Problem", "TestCase", "Submission"]
+__all__ = ["User", "Problem", "TestCase", "Submission", "VerdictCache"]
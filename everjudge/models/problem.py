@@ -18,10 +18,13 @@ class Problem(db.Model):
     author = Column(String(100), nullable=False)
     visible = Column(Boolean, default=True)
     library = Column(String(50), nullable=False, default="public")  # public, private, personal
+    verdict_policy = Column(String(20), nullable=False, default="all")  # all, first_failure, subtask
+    testcase_revision = Column(Integer, nullable=False, default=0)  # 每次上传、添加或删除测试用例时加一
 
     # 关联
     test_cases = relationship('TestCase', back_populates='problem', cascade='all, delete-orphan')
     submissions = relationship('Submission', back_populates='problem')
+    cached_verdicts = relationship('VerdictCache', back_populates='problem', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Problem {self.id}: {self.title}>'
\ No newline at end of file
@@ -12,13 +12,18 @@ class Submission(db.Model):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     code = Column(Text, nullable=False)
     language = Column(String(50), nullable=False)
-    status = Column(String(50), nullable=False, default='PENDING')  # PENDING, RUNNING, ACCEPTED, WRONG_ANSWER, TIME_LIMIT_EXCEEDED, MEMORY_LIMIT_EXCEEDED, RUNTIME_ERROR, COMPILATION_ERROR, SYSTEM_ERROR
+    status = Column(String(50), nullable=False, default='PENDING', index=True)  # PENDING, RUNNING, ACCEPTED, WRONG_ANSWER, TIME_LIMIT_EXCEEDED, MEMORY_LIMIT_EXCEEDED, RUNTIME_ERROR, COMPILATION_ERROR, SYSTEM_ERROR
     score = Column(Integer, nullable=False, default=0)
     execution_time = Column(Integer)  # 毫秒
     memory_used = Column(Integer)  # KB
     error_message = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     judge_id = Column(String(100))
+    judge_node = Column(String(100))  # 评测节点 host:port
+    # 评测队列：PENDING 即排队，调度器认领后写入 claimed_by/claimed_at
+    claimed_by = Column(String(100))
+    claimed_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, nullable=False, default=0)
 
     # 关联
     problem = relationship('Problem', back_populates='submissions')
@@ -15,6 +15,7 @@ class TestCase(db.Model):
     is_sample = Column(Boolean, default=False)
     time_limit = Column(Integer, nullable=True)  # 单个测试用例的时间限制（毫秒）
     memory_limit = Column(Integer, nullable=True)  # 单个测试用例的内存限制（MB）
+    subtask = Column(Integer, nullable=True)  # 所属子任务编号，按子任务评分时同组测试用例全部通过才得分
 
     # 关联
     problem = relationship('Problem', back_populates='test_cases')
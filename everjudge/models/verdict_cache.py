@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from everjudge.extensions import db
+
+
+class VerdictCache(db.Model):
+    __tablename__ = 'verdict_cache'
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256(题目, 代码, 语言, 测试数据版本)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    problem_id = Column(Integer, ForeignKey('problems.id'), nullable=False, index=True)
+    # 测试数据版本：测试数据修订号、测试用例、分值、子任务、时间与内存限制及判题策略的哈希
+    testcase_version = Column(String(64), nullable=False)
+    status = Column(String(50), nullable=False)
+    score = Column(Integer, nullable=False, default=0)
+    execution_time = Column(Integer)  # 毫秒
+    memory_used = Column(Integer)  # KB
+    error_message = Column(Text)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 关联
+    problem = relationship('Problem', back_populates='cached_verdicts')
+
+    def __repr__(self):
+        return f'<VerdictCache {self.cache_key[:12]} for Problem {self.problem_id}: {self.status}>'
@@ -152,6 +152,8 @@ class BaseJudgeProvider(ABC):
 class DefaultJudgeProvider(BaseJudgeProvider):
     """默认评测机提供者（基于Rust后端）"""
 
+    _router = None
+
     @property
     def provider_name(self) -> str:
         return "default"
@@ -170,12 +172,7 @@ class DefaultJudgeProvider(BaseJudgeProvider):
 
     def judge(self, request: JudgeRequest) -> JudgeResult:
         """通过RPC调用Rust后端"""
-        import socket
-        import json as json_module
-
-        config = self._get_judge_config()
-        host = config.get("host", "127.0.0.1")
-        port = config.get("port", 3726)
+        router = self._get_router()
 
         request_data = {
             "action": "submit",
@@ -188,23 +185,11 @@ class DefaultJudgeProvider(BaseJudgeProvider):
         }
 
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((host, port))
-            sock.send(json_module.dumps(request_data).encode())
-
-            response = b""
-            while True:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                response += chunk
+            node, judge_id = router.submit(request_data)
+            if not judge_id:
+                raise RuntimeError("No judge node accepted the submission")
 
-            sock.close()
-
-            response_data = json_module.loads(response.decode())
-            judge_id = response_data.get("judge_id")
-
-            return self._wait_for_result(host, port, judge_id)
+            return self._wait_for_result(router, node, judge_id, *self._get_wait_timeouts())
 
         except Exception as e:
             return JudgeResult(
@@ -215,68 +200,60 @@ class DefaultJudgeProvider(BaseJudgeProvider):
                 error_message=str(e)
             )
 
-    def _wait_for_result(self, host: str, port: str, judge_id: str) -> JudgeResult:
-        """等待评测结果"""
-        import socket
-        import json as json_module
+    def _get_router(self):
+        """评测节点路由器（每个节点一个长连接池），随提供者实例复用"""
+        if self._router is None:
+            from flask import has_app_context
+            from everjudge.utils.judge_cluster import JudgeRouter, get_judge_router
+
+            if has_app_context():
+                self._router = get_judge_router()
+            else:
+                self._router = JudgeRouter([self._get_judge_config()])
+        return self._router
+
+    def _get_wait_timeouts(self) -> tuple:
+        """单次订阅的等待时间与总等待时间（秒），与调度器使用相同的配置"""
+        from flask import has_app_context, current_app
+
+        if has_app_context():
+            config = current_app.config
+            return config.get("JUDGE_RESULT_TIMEOUT", 60), config.get("JUDGE_CLAIM_TIMEOUT", 300)
+        return 60.0, 300.0
+
+    def _wait_for_result(self, router, node, judge_id: str, timeout: float = 60.0,
+                         max_wait: float = 300.0) -> JudgeResult:
+        """
+        等待评测结果：评测完成时由评测机推送；订阅超时或推送丢失时按 judge_id 查询状态并重新订阅，
+        与调度器的 await_result 相同。结果取回后确认，评测机随即释放
+        """
         import time
+        from everjudge.utils.judge import await_result
 
-        max_retries = 100
-        retry_interval = 0.1
-
-        for _ in range(max_retries):
+        data = await_result(router, node, judge_id, timeout, time.monotonic() + max_wait)
+        if data is not None and data.get("status") not in ("PENDING", "RUNNING"):
+            node.client.ack(judge_id)
+            status = data.get("status", "SYSTEM_ERROR")
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.connect((host, port))
-                sock.settimeout(1)
-
-                request = {
-                    "action": "status",
-                    "judge_id": judge_id
-                }
-                sock.send(json_module.dumps(request).encode())
-
-                response = b""
-                while True:
-                    try:
-                        chunk = sock.recv(4096)
-                        if not chunk:
-                            break
-                        response += chunk
-                    except socket.timeout:
-                        break
-
-                sock.close()
-
-                if response:
-                    response_data = json_module.loads(response.decode())
-                    data = response_data.get("data", {})
-
-                    status = data.get("status", "SYSTEM_ERROR")
-                    try:
-                        status = JudgeStatus(status)
-                    except ValueError:
-                        status = JudgeStatus.SYSTEM_ERROR
-
-                    return JudgeResult(
-                        status=status,
-                        score=data.get("score", 0),
-                        execution_time=data.get("execution_time", 0),
-                        memory_used=data.get("memory_used", 0),
-                        error_message=data.get("error_message")
-                    )
-
-                time.sleep(retry_interval)
-
-            except Exception:
-                time.sleep(retry_interval)
+                status = JudgeStatus(status)
+            except ValueError:
+                status = JudgeStatus.SYSTEM_ERROR
+
+            return JudgeResult(
+                status=status,
+                score=data.get("score", 0),
+                execution_time=data.get("execution_time") or 0,
+                memory_used=data.get("memory_used") or 0,
+                error_message=data.get("error_message")
+            )
 
         return JudgeResult(
             status=JudgeStatus.SYSTEM_ERROR,
             score=0,
             execution_time=0,
             memory_used=0,
-            error_message="Timeout waiting for judge result"
+            error_message="Timeout waiting for judge result" if data is not None
+            else "Judge node lost the submission"
         )
 
     def compile(self, code: str, language: str) -> tuple:
@@ -1,5 +1,18 @@
 # 工具与装饰器
 from .auth import login_required, admin_required
-from .judge import JudgeClient, update_submission_status, judge_submission
+from .judge import (
+    JudgeClient, get_judge_client, update_submission_status, judge_submission, build_submit_request, await_result,
+)
+from .judge_cluster import JudgeRouter, get_judge_router
+from .async_judge import AsyncJudgeClient, create_async_judge_client
+from .judge_queue import enqueue_submission, claim_submissions, requeue_stale_submissions
+from .dispatcher import JudgeDispatcher, get_dispatcher, start_embedded_dispatcher, notify_dispatcher
+from .verdict_cache import testcase_version, lookup_verdict, store_verdict
 
-__all__ = ["login_required", "admin_required", "JudgeClient", "update_submission_status", "judge_submission"]
+__all__ = [
+    "login_required", "admin_required", "JudgeClient", "get_judge_client", "update_submission_status", "judge_submission",
+    "build_submit_request", "await_result", "AsyncJudgeClient", "create_async_judge_client", "JudgeRouter", "get_judge_router",
+    "enqueue_submission", "claim_submissions", "requeue_stale_submissions",
+    "JudgeDispatcher", "get_dispatcher", "start_embedded_dispatcher", "notify_dispatcher",
+    "testcase_version", "lookup_verdict", "store_verdict",
+]
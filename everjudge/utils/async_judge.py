@@ -0,0 +1,281 @@
+"""
+asyncio 版评测机客户端。
+
+协议与 JudgeClient 相同（长度前缀分帧、request_id 多路复用、hello 协商编码，均由 judge_protocol 提供），
+但所有 I/O 都在事件循环中完成：一个事件循环即可同时挂起成千上万个等待中的评测，
+无需为每个评测占用一个线程。
+
+每个客户端只连接一个评测节点，不做负载路由与故障转移：提交应经由 JudgeRouter，
+异步客户端用于在任务所在的节点（Submission.judge_node）上等待结果。
+"""
+import asyncio
+import itertools
+import socket
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .judge_protocol import (
+    ENCODING_JSON, ENCODING_MSGPACK, ServerBusyError, encode_message, hello_request, is_busy, negotiated_encoding,
+    read_message_async,
+)
+
+
+class AsyncJudgeConnection:
+    """
+    与评测机之间的一条异步长连接，响应由读任务按 request_id 分发
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, encoding: str):
+        self._reader = reader
+        self._writer = writer
+        self.encoding = encoding
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self.closed = False
+        self._read_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def open(cls, host: str, port: int, connect_timeout: float = 5.0,
+                   encoding: str = ENCODING_MSGPACK) -> 'AsyncJudgeConnection':
+        """
+        建立连接并完成编码协商
+        :param host: 评测机地址
+        :param port: 评测机端口
+        :param connect_timeout: 连接与握手超时（秒）
+        :param encoding: 期望使用的编码
+        """
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            negotiated = await asyncio.wait_for(cls._negotiate(reader, writer, encoding), connect_timeout)
+        except BaseException:
+            writer.close()
+            raise
+        return cls(reader, writer, negotiated)
+
+    @staticmethod
+    async def _negotiate(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, preferred: str) -> str:
+        request = hello_request(preferred)
+        if request is None:
+            return ENCODING_JSON
+        writer.write(encode_message(request))
+        await writer.drain()
+        return negotiated_encoding(request, await read_message_async(reader))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def call(self, data: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        发送请求并等待对应的响应
+        :param data: 请求内容
+        :param timeout: 等待响应的超时（秒），超时抛出 TimeoutError
+        :return: 响应内容
+        """
+        if self.closed:
+            raise ConnectionError("Judge connection closed")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            # write 不会让出事件循环，同一连接上的多个请求不会交错
+            self._writer.write(encode_message(dict(data, request_id=request_id), self.encoding))
+            await self._writer.drain()
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Judge request {data.get('action')} timed out")
+        except OSError:
+            self.close()
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+        # 未协商编码时繁忙拒绝作为第一个请求的响应返回，评测机随即关闭连接
+        if is_busy(result):
+            self.close()
+            raise ServerBusyError("Judge server busy")
+        return result
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        pending = list(self._pending.values())
+        self._pending.clear()
+        self._writer.close()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("Judge connection closed"))
+        if self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                message = await read_message_async(self._reader, self.encoding)
+                if message is None:
+                    break
+                future = self._pending.get(message.pop('request_id', None))
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (OSError, ValueError) as e:
+            if not self.closed:
+                print(f"Judge connection error: {e}")
+        finally:
+            self.close()
+
+
+class AsyncJudgeClient:
+    """
+    异步评测机客户端（连接池），接口与 JudgeClient 对应，方法均为协程
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 3726, pool_size: int = 4,
+                 encoding: str = ENCODING_MSGPACK):
+        self.host = host
+        self.port = port
+        self.pool_size = max(pool_size, 1)
+        self.encoding = encoding
+        self._connections: List[Optional[AsyncJudgeConnection]] = [None] * self.pool_size
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> 'AsyncJudgeClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _get_connection(self) -> AsyncJudgeConnection:
+        """取在途请求最少的连接，空位或已断开的连接按需重建"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            for i, conn in enumerate(self._connections):
+                if conn is None or conn.closed:
+                    conn = await AsyncJudgeConnection.open(self.host, self.port, encoding=self.encoding)
+                    self._connections[i] = conn
+                    return conn
+            return min(self._connections, key=lambda c: c.in_flight)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            if conn is not None:
+                conn.close()
+        self._connections = [None] * self.pool_size
+
+    async def request(self, data: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        通过连接池发送一个请求并等待响应
+        :param data: 请求内容
+        :param timeout: 等待响应的超时（秒）
+        :return: 响应内容
+        """
+        conn = await self._get_connection()
+        try:
+            return await conn.call(data, timeout)
+        except ServerBusyError:
+            raise
+        except ConnectionError:
+            # 评测机会关闭空闲的连接，请求恰好发在正被关闭的连接上时换一条连接重试一次
+            conn = await self._get_connection()
+            return await conn.call(data, timeout)
+
+    async def submit(self, request: Dict[str, Any]) -> Optional[str]:
+        """
+        提交代码到评测机
+        :param request: submit 请求内容，可由 build_submit_request 构造
+        :return: 评测任务ID
+        """
+        try:
+            result = await self.request(dict(request, action='submit'))
+            if result and result.get('status') == 'ok':
+                return result.get('judge_id')
+            return None
+        except Exception as e:
+            print(f"Error submitting to judge: {e}")
+            return None
+
+    async def get_status(self, judge_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取评测状态
+        :param judge_id: 评测任务ID
+        :return: 评测结果
+        """
+        try:
+            result = await self.request({'action': 'status', 'judge_id': judge_id})
+            if result and result.get('status') == 'ok':
+                return result.get('data')
+            return None
+        except Exception as e:
+            print(f"Error getting judge status: {e}")
+            return None
+
+    async def wait_result(self, judge_id: str, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """
+        订阅评测结果，评测机在结果产生时立即推送
+        :param judge_id: 评测任务ID
+        :param timeout: 最长等待时间（秒）
+        :return: 评测结果，超时返回 None
+        """
+        try:
+            result = await self.request({'action': 'wait', 'judge_id': judge_id}, timeout=timeout)
+            if result and result.get('status') == 'ok':
+                return result.get('data')
+            return None
+        except TimeoutError:
+            return None
+        except Exception as e:
+            print(f"Error waiting for judge result: {e}")
+            return None
+
+    async def ack(self, judge_id: str) -> bool:
+        """
+        确认评测结果已保存，评测机随即释放该结果
+        :param judge_id: 评测任务ID
+        :return: 是否确认成功
+        """
+        try:
+            result = await self.request({'action': 'ack', 'judge_id': judge_id}, timeout=5.0)
+            return bool(result and result.get('status') == 'ok')
+        except Exception as e:
+            print(f"Error acknowledging judge result: {e}")
+            return False
+
+    async def stream_results(self, judge_ids: Iterable[str],
+                             timeout: float = 30.0) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        同时订阅多个评测任务，按完成先后依次产出结果
+        :param judge_ids: 评测任务ID
+        :param timeout: 每个任务的最长等待时间（秒）
+        :return: (评测任务ID, 评测结果) 的异步迭代器，超时的任务结果为 None
+        """
+        async def wait_one(judge_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            return judge_id, await self.wait_result(judge_id, timeout)
+
+        tasks = [asyncio.ensure_future(wait_one(judge_id)) for judge_id in judge_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def create_async_judge_client(config: Dict[str, Any], node: Optional[str] = None) -> AsyncJudgeClient:
+    """
+    按应用配置创建连接到单个评测节点的异步客户端，节点列表与 JudgeRouter 相同
+    （[[judge.nodes]]，未配置时为 rpc_host/rpc_port）。客户端绑定创建它的事件循环，因此不做进程级缓存
+    :param config: 应用配置，例如 current_app.config
+    :param node: 节点名称 host:port（如 Submission.judge_node），未指定或未知时使用第一个节点
+    """
+    from .judge_cluster import judge_nodes_from_config
+
+    nodes = [(n.get('host', '127.0.0.1'), int(n.get('port', 3726))) for n in judge_nodes_from_config(config)]
+    host, port = next((n for n in nodes if f"{n[0]}:{n[1]}" == node), nodes[0])
+    return AsyncJudgeClient(
+        host,
+        port,
+        pool_size=config.get('JUDGE_POOL_SIZE', 4),
+        encoding=config.get('JUDGE_ENCODING', ENCODING_MSGPACK),
+    )
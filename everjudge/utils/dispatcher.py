@@ -0,0 +1,151 @@
+"""
+评测调度器：以固定数量的工作线程消费评测队列。
+
+并发上限由 [judge] dispatcher_workers 决定，与 Web 进程的请求线程数无关；
+提交时只需入队并唤醒调度器，请求本身不会等待评测。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from flask import Flask
+
+from .judge import judge_submission
+from .judge_queue import claim_submissions, requeue_stale_submissions
+
+logger = logging.getLogger(__name__)
+
+_dispatcher_lock = threading.Lock()
+
+
+class JudgeDispatcher:
+    def __init__(self, app: Flask, workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.app = app
+        self.workers = workers or app.config.get("JUDGE_DISPATCHER_WORKERS", 4)
+        self.poll_interval = poll_interval or app.config.get("JUDGE_DISPATCHER_POLL_INTERVAL", 2.0)
+        self.claim_timeout = app.config.get("JUDGE_CLAIM_TIMEOUT", 300)
+        self.max_attempts = app.config.get("JUDGE_MAX_ATTEMPTS", 3)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._wakeup = threading.Semaphore(0)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._reap_lock = threading.Lock()
+        self._next_reap = 0.0
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        """启动工作线程"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"judge-dispatcher-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+        logger.info("Judge dispatcher %s started with %d workers", self.worker_id, self.workers)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止工作线程（正在评测的任务会先完成）"""
+        self._stop.set()
+        for _ in self._threads:
+            self._wakeup.release()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_forever(self) -> None:
+        """以独立进程方式运行，直到收到 SIGINT/SIGTERM"""
+        import signal
+
+        def _handle_signal(signum, frame):
+            logger.info("Judge dispatcher %s received signal %d, stopping", self.worker_id, signum)
+            self._stop.set()
+
+        signal.signal(signal.SIGTERM, _handle_signal)
+        signal.signal(signal.SIGINT, _handle_signal)
+
+        self.start()
+        while not self._stop.wait(1.0):
+            pass
+        self.stop()
+        logger.info("Judge dispatcher %s stopped", self.worker_id)
+
+    def notify(self) -> None:
+        """有新提交入队时唤醒一个空闲工作线程"""
+        self._wakeup.release()
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            retry_later = False
+            try:
+                with self.app.app_context():
+                    self._maybe_reap()
+                    claimed = claim_submissions(self.worker_id, limit=1)
+                    for submission_id in claimed:
+                        retry_later = judge_submission(submission_id) or retry_later
+            except Exception:
+                logger.exception("Judge dispatcher worker error")
+                claimed = []
+            if retry_later:
+                # 评测机暂时无法接收任务，等待一个轮询间隔再认领，避免立即耗尽重试次数
+                self._stop.wait(self.poll_interval)
+            elif not claimed:
+                self._wakeup.acquire(timeout=self.poll_interval)
+
+    def _maybe_reap(self) -> None:
+        """定期回收认领超时的提交，多个工作线程中只由一个执行"""
+        now = time.monotonic()
+        if now < self._next_reap or not self._reap_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_reap = now + max(self.claim_timeout / 2, self.poll_interval)
+            requeue_stale_submissions(self.claim_timeout, self.max_attempts)
+        finally:
+            self._reap_lock.release()
+
+
+def get_dispatcher(app: Flask) -> JudgeDispatcher:
+    """获取（必要时创建并启动）当前进程内嵌的调度器"""
+    with _dispatcher_lock:
+        dispatcher = app.extensions.get("judge_dispatcher")
+        if dispatcher is None:
+            dispatcher = JudgeDispatcher(app)
+            app.extensions["judge_dispatcher"] = dispatcher
+        if not dispatcher.running:
+            dispatcher.start()
+    return dispatcher
+
+
+def start_embedded_dispatcher(app: Flask) -> None:
+    """
+    在 Web 入口（wsgi.py / run.py）启动内嵌调度器，使重启前遗留的排队与超时提交无需等待新提交即被处理。
+    uWSGI 预加载应用时 master 中启动的线程不会随 fork 进入 worker，改为在每个 worker fork 后启动
+    """
+    if not app.config.get("JUDGE_DISPATCHER_EMBEDDED", False):
+        return
+    try:
+        import uwsgi
+        from uwsgidecorators import postfork
+    except ImportError:
+        get_dispatcher(app)
+        return
+    if uwsgi.worker_id() == 0:
+        postfork(lambda: get_dispatcher(app))
+    else:
+        get_dispatcher(app)
+
+
+def notify_dispatcher(app: Flask) -> None:
+    """通知调度器有新提交；未启用内嵌调度器时由独立调度器轮询队列"""
+    if app.config.get("JUDGE_DISPATCHER_EMBEDDED", False):
+        get_dispatcher(app).notify()
@@ -1,16 +1,208 @@
-import json
+import itertools
+import os
 import socket
+import threading
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple
 
 from ..extensions import db
 from ..models import Submission
+from .judge_protocol import (
+    ENCODING_JSON, ENCODING_MSGPACK, ServerBusyError, encode_message, hello_request, is_busy, negotiated_encoding,
+    read_message,
+)
+
+
+def build_submit_request(submission: Submission) -> Dict[str, Any]:
+    """
+    构造提交评测的请求。测试用例以输入文件名（不含扩展名）标识，
+    评测机据此与本地测试用例文件对应，按分值与子任务计分。
+    测试数据版本随请求下发，评测机据此区分同一提交的重测与重复提交
+    :param submission: 提交记录
+    :return: submit 请求内容
+    """
+    from .verdict_cache import testcase_version
+
+    problem = submission.problem
+    test_cases = [
+        {
+            'name': os.path.splitext(os.path.basename(test_case.input_path))[0],
+            'score': test_case.score,
+            'subtask': test_case.subtask
+        }
+        for test_case in sorted(problem.test_cases, key=lambda t: t.case_number)
+    ]
+    return {
+        'action': 'submit',
+        'submission_id': submission.id,
+        'problem_id': submission.problem_id,
+        'code': submission.code,
+        'language': submission.language,
+        'time_limit': problem.time_limit,
+        'memory_limit': problem.memory_limit * 1024 * 1024,  # 转换为字节
+        'verdict_policy': problem.verdict_policy or 'all',
+        'test_cases': test_cases,
+        'testcase_version': testcase_version(problem)
+    }
+
+
+class JudgeConnection:
+    """
+    与评测机之间的一条长连接。请求带有 request_id，响应由读线程按 request_id
+    分发给等待者，因此多个线程可以在同一连接上同时发起请求。
+    建立连接后先通过 hello 协商负载编码，评测机不支持时保持 JSON。
+    """
+
+    def __init__(self, host: str, port: int, connect_timeout: float = 5.0, encoding: str = ENCODING_MSGPACK):
+        self.sock = socket.create_connection((host, port), timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._rfile = self.sock.makefile('rb')
+        self.encoding = ENCODING_JSON
+        try:
+            self.encoding = self._negotiate(encoding)
+        except (OSError, ValueError):
+            self.sock.close()
+            raise
+        self.sock.settimeout(None)
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="judge-connection-reader", daemon=True)
+        self._reader.start()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def _negotiate(self, preferred: str) -> str:
+        """
+        在读线程启动前同步完成编码协商
+        :param preferred: 期望使用的编码
+        :return: 双方约定的编码
+        """
+        request = hello_request(preferred)
+        if request is None:
+            return ENCODING_JSON
+        self.sock.sendall(encode_message(request))
+        return negotiated_encoding(request, read_message(self._rfile))
+
+    def call(self, data: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        发送请求并等待对应的响应
+        :param data: 请求内容
+        :param timeout: 等待响应的超时（秒），超时抛出 TimeoutError
+        :return: 响应内容
+        """
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            if self.closed:
+                raise ConnectionError("Judge connection closed")
+            self._pending[request_id] = future
+        try:
+            payload = encode_message(dict(data, request_id=request_id), self.encoding)
+            with self._send_lock:
+                self.sock.sendall(payload)
+            result = future.result(timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"Judge request {data.get('action')} timed out")
+        except OSError:
+            self.close()
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+        # 未协商编码时繁忙拒绝作为第一个请求的响应返回，评测机随即关闭连接
+        if is_busy(result):
+            self.close()
+            raise ServerBusyError("Judge server busy")
+        return result
+
+    def close(self) -> None:
+        with self._pending_lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("Judge connection closed"))
+
+    def _read_loop(self) -> None:
+        try:
+            with self._rfile as f:
+                while True:
+                    message = read_message(f, self.encoding)
+                    if message is None:
+                        break
+                    with self._pending_lock:
+                        future = self._pending.get(message.pop('request_id', None))
+                    if future is not None and not future.done():
+                        future.set_result(message)
+        except (OSError, ValueError) as e:
+            if not self.closed:
+                print(f"Judge connection error: {e}")
+        finally:
+            self.close()
 
 
 class JudgeClient:
-    def __init__(self, host: str = '127.0.0.1', port: int = 3726):
+    def __init__(self, host: str = '127.0.0.1', port: int = 3726, pool_size: int = 4,
+                 encoding: str = ENCODING_MSGPACK):
         self.host = host
         self.port = port
+        self.pool_size = max(pool_size, 1)
+        self.encoding = encoding
+        self._connections: List[Optional[JudgeConnection]] = [None] * self.pool_size
+        self._lock = threading.Lock()
+
+    def _get_connection(self) -> JudgeConnection:
+        """取在途请求最少的连接，空位或已断开的连接按需重建"""
+        with self._lock:
+            for i, conn in enumerate(self._connections):
+                if conn is None or conn.closed:
+                    conn = JudgeConnection(self.host, self.port, encoding=self.encoding)
+                    self._connections[i] = conn
+                    return conn
+            return min(self._connections, key=lambda c: c.in_flight)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                if conn is not None:
+                    conn.close()
+            self._connections = [None] * self.pool_size
+
+    def close_idle(self) -> None:
+        """关闭没有在途请求的连接；仍有请求（如等待中的评测结果）的连接保留，由其自行超时或断开"""
+        with self._lock:
+            for i, conn in enumerate(self._connections):
+                if conn is not None and conn.in_flight == 0:
+                    conn.close()
+                    self._connections[i] = None
+
+    def request(self, data: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        通过连接池发送一个请求并等待响应
+        :param data: 请求内容
+        :param timeout: 等待响应的超时（秒）
+        :return: 响应内容
+        """
+        try:
+            return self._get_connection().call(data, timeout)
+        except ServerBusyError:
+            raise
+        except ConnectionError:
+            # 评测机会关闭空闲的连接，请求恰好发在正被关闭的连接上时换一条连接重试一次
+            return self._get_connection().call(data, timeout)
 
     def submit_code(self, submission: Submission) -> Optional[str]:
         """
@@ -19,23 +211,10 @@ class JudgeClient:
         :return: 评测任务ID
         """
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((self.host, self.port))
-                data = {
-                    'action': 'submit',
-                    'submission_id': submission.id,
-                    'problem_id': submission.problem_id,
-                    'code': submission.code,
-                    'language': submission.language,
-                    'time_limit': submission.problem.time_limit,
-                    'memory_limit': submission.problem.memory_limit * 1024 * 1024  # 转换为字节
-                }
-                s.sendall(json.dumps(data).encode('utf-8') + b'\n')
-                response = s.recv(1024).decode('utf-8')
-                result = json.loads(response)
-                if result.get('status') == 'ok':
-                    return result.get('judge_id')
-                return None
+            result = self.request(build_submit_request(submission))
+            if result and result.get('status') == 'ok':
+                return result.get('judge_id')
+            return None
         except Exception as e:
             print(f"Error submitting to judge: {e}")
             return None
@@ -47,22 +226,68 @@ class JudgeClient:
         :return: 评测结果
         """
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((self.host, self.port))
-                data = {
-                    'action': 'status',
-                    'judge_id': judge_id
-                }
-                s.sendall(json.dumps(data).encode('utf-8') + b'\n')
-                response = s.recv(4096).decode('utf-8')
-                result = json.loads(response)
-                if result.get('status') == 'ok':
-                    return result.get('data')
-                return None
+            result = self.request({'action': 'status', 'judge_id': judge_id})
+            if result and result.get('status') == 'ok':
+                return result.get('data')
+            return None
         except Exception as e:
             print(f"Error getting judge status: {e}")
             return None
 
+    def wait_result(self, judge_id: str, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """
+        订阅评测结果，评测机在结果产生时立即推送
+        :param judge_id: 评测任务ID
+        :param timeout: 最长等待时间（秒）
+        :return: 评测结果，超时返回 None
+        """
+        try:
+            result = self.request({'action': 'wait', 'judge_id': judge_id}, timeout=timeout)
+            if result and result.get('status') == 'ok':
+                return result.get('data')
+            return None
+        except TimeoutError:
+            return None
+        except Exception as e:
+            print(f"Error waiting for judge result: {e}")
+            return None
+
+    def ack(self, judge_id: str) -> bool:
+        """
+        确认评测结果已保存，评测机随即释放该结果
+        :param judge_id: 评测任务ID
+        :return: 是否确认成功
+        """
+        try:
+            result = self.request({'action': 'ack', 'judge_id': judge_id}, timeout=5.0)
+            return bool(result and result.get('status') == 'ok')
+        except Exception as e:
+            print(f"Error acknowledging judge result: {e}")
+            return False
+
+
+_clients: Dict[Tuple[int, str, int], JudgeClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_judge_client(host: Optional[str] = None, port: Optional[int] = None) -> JudgeClient:
+    """
+    获取进程内共享的评测机客户端（连接池），默认使用当前应用配置的地址
+    """
+    from flask import current_app
+    host = host or current_app.config.get('JUDGE_RPC_HOST', '127.0.0.1')
+    port = port or current_app.config.get('JUDGE_RPC_PORT', 3726)
+    # 以 pid 区分，避免 fork 出的子进程复用父进程的套接字
+    key = (os.getpid(), host, port)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = JudgeClient(host, port,
+                                 pool_size=current_app.config.get('JUDGE_POOL_SIZE', 4),
+                                 encoding=current_app.config.get('JUDGE_ENCODING', ENCODING_MSGPACK))
+            _clients[key] = client
+        return client
+
 
 def update_submission_status(submission_id: int):
     """
@@ -73,43 +298,116 @@ def update_submission_status(submission_id: int):
     if not submission or not submission.judge_id:
         return
 
-    judge_client = JudgeClient()
-    status = judge_client.get_status(submission.judge_id)
+    from .judge_cluster import get_judge_router
+    node = get_judge_router().get_node(submission.judge_node)
+    status = node.client.get_status(submission.judge_id)
     if status:
-        submission.status = status.get('status', 'SYSTEM_ERROR')
-        submission.score = status.get('score', 0)
-        submission.execution_time = status.get('execution_time')
-        submission.memory_used = status.get('memory_used')
-        submission.error_message = status.get('error_message')
+        _apply_status(submission, status)
         db.session.commit()
+        if status.get('status') not in ['PENDING', 'RUNNING']:
+            node.client.ack(submission.judge_id)
+
+
+def _apply_status(submission: Submission, status: Dict[str, Any]):
+    """
+    将评测机返回的状态写入提交记录
+    """
+    submission.status = status.get('status', 'SYSTEM_ERROR')
+    submission.score = status.get('score', 0)
+    submission.execution_time = status.get('execution_time')
+    submission.memory_used = status.get('memory_used')
+    submission.error_message = status.get('error_message')
 
 
-def judge_submission(submission_id: int):
+def judge_submission(submission_id: int) -> bool:
     """
     评测提交记录
     :param submission_id: 提交记录ID
+    :return: 没有节点接收任务、提交已重新入队时返回 True，调用方应稍后再认领
     """
     submission = Submission.query.get(submission_id)
     if not submission:
-        return
+        return False
+
+    from flask import current_app
+    from .judge_cluster import get_judge_router
+    from .judge_queue import enqueue_submission
+    from .verdict_cache import lookup_verdict, store_verdict
+
+    # 相同代码在当前测试数据下已有评测结果时直接复用，不占用评测机
+    cached = lookup_verdict(submission)
+    if cached:
+        _apply_status(submission, cached)
+        submission.judge_id = None
+        submission.judge_node = None
+        db.session.commit()
+        return False
 
     submission.status = 'RUNNING'
     db.session.commit()
 
-    judge_client = JudgeClient()
-    judge_id = judge_client.submit_code(submission)
+    router = get_judge_router()
+    max_attempts = current_app.config.get('JUDGE_MAX_ATTEMPTS', 3)
+    try:
+        node, judge_id = router.submit(build_submit_request(submission))
+    except ServerBusyError:
+        # 评测机繁忙是正常的背压，重新入队稍后再试，不计入尝试次数
+        enqueue_submission(submission)
+        submission.attempts = max((submission.attempts or 0) - 1, 0)
+        db.session.commit()
+        return True
     if judge_id:
         submission.judge_id = judge_id
+        submission.judge_node = node.name
+        db.session.commit()
+
+        # 订阅评测结果，评测完成时由评测机推送；超过认领超时仍未完成的留给调度器回收
+        deadline = time.monotonic() + current_app.config.get('JUDGE_CLAIM_TIMEOUT', 300)
+        status = await_result(router, node, judge_id, current_app.config.get('JUDGE_RESULT_TIMEOUT', 60), deadline)
+        if status and status.get('status') not in ['PENDING', 'RUNNING']:
+            _apply_status(submission, status)
+            db.session.commit()
+            # 结果已落库，通知评测机释放
+            node.client.ack(judge_id)
+            store_verdict(submission, status)
+        elif status is None and submission.attempts < max_attempts:
+            # 节点在评测过程中下线或丢失了任务，立即重新入队，由其他节点评测
+            enqueue_submission(submission)
+            submission.judge_id = None
+            submission.judge_node = None
+            db.session.commit()
+    elif submission.attempts < max_attempts:
+        # 节点暂时全部不可达、繁忙或正在重启，重新入队稍后再试
+        enqueue_submission(submission)
         db.session.commit()
-        
-        # 轮询评测结果
-        for _ in range(30):  # 最多轮询30次
-            time.sleep(1)
-            update_submission_status(submission_id)
-            submission = Submission.query.get(submission_id)
-            if submission.status not in ['PENDING', 'RUNNING']:
-                break
+        return True
     else:
         submission.status = 'SYSTEM_ERROR'
         submission.error_message = 'Failed to connect to judge server'
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+    return False
+
+
+def await_result(router, node, judge_id: str, wait_timeout: float, deadline: float) -> Optional[Dict[str, Any]]:
+    """
+    等待评测结果。订阅超时或连接中断时按 judge_id 查询 status：已有结果直接返回，
+    仍在评测则重新订阅，直到 deadline
+    :param router: 评测机路由器
+    :param node: 评测任务所在节点
+    :param judge_id: 评测任务ID
+    :param wait_timeout: 单次订阅的最长等待时间（秒）
+    :param deadline: time.monotonic() 时间点，之后不再等待
+    :return: 评测结果（到达 deadline 时可能仍为 PENDING/RUNNING）；任务在节点上已不存在或节点下线时返回 None
+    """
+    while True:
+        remaining = deadline - time.monotonic()
+        status = node.client.wait_result(judge_id, max(min(wait_timeout, remaining), 1.0))
+        if status is None or status.get('status') in ['PENDING', 'RUNNING']:
+            status = node.client.get_status(judge_id)
+            if status is None and router.check(node):
+                # 节点可用，查询失败可能只是连接刚断开，换一条连接再查一次
+                status = node.client.get_status(judge_id)
+        if status is None or status.get('status') not in ['PENDING', 'RUNNING']:
+            return status
+        if time.monotonic() >= deadline:
+            return status
@@ -0,0 +1,272 @@
+"""
+评测机集群：按负载把提交路由到多个评测节点。
+
+节点列表来自 [[judge.nodes]]（未配置时为 rpc_host/rpc_port 单节点）。路由器定期
+通过 stats 请求获取各节点的运行与排队任务数，选择 负载/权重 最小的健康节点；
+节点连接失败时标记为下线（不再接收新提交，已在等待的结果不受影响）并自动转投下一个节点，
+下线节点在健康检查间隔后重新探测。节点繁忙（连接处理线程已满）属于正常的背压，
+不标记下线，所有候选节点都繁忙时由调用方稍后重试。
+
+routing = "affinity" 时按 problem_id 做一致性哈希，同一题目固定落在同一节点，
+节点上的测试数据始终处于页缓存中；所属节点饱和（排队+运行任务数超过
+工作线程数 × spill_threshold）时依次溢出到哈希环上的后继节点。
+"""
+import bisect
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .judge import JudgeClient
+from .judge_protocol import ENCODING_MSGPACK, ServerBusyError
+
+logger = logging.getLogger(__name__)
+
+ROUTING_LEAST_LOADED = 'least_loaded'
+ROUTING_AFFINITY = 'affinity'
+
+# 权重为 1 的节点在哈希环上的虚拟节点数
+_VIRTUAL_NODES = 64
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class JudgeNode:
+    """一个评测节点及其最近一次观测到的负载"""
+
+    def __init__(self, host: str, port: int, weight: float = 1.0, pool_size: int = 4,
+                 encoding: str = ENCODING_MSGPACK):
+        self.host = host
+        self.port = port
+        self.weight = max(float(weight), 0.01)
+        self.client = JudgeClient(host, port, pool_size=pool_size, encoding=encoding)
+        self.healthy = True
+        self.load = 0
+        self.workers = 0
+        # 上次刷新负载之后本进程路由到该节点的提交数，避免两次刷新之间把提交全部压到同一节点
+        self.routed = 0
+        self.next_check = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def score(self) -> float:
+        return (self.load + self.routed) / self.weight
+
+    def saturated(self, spill_threshold: float) -> bool:
+        """节点排队+运行任务数是否已超过 工作线程数 × spill_threshold"""
+        if not self.workers:
+            return False
+        return self.load + self.routed >= self.workers * spill_threshold
+
+    def __repr__(self):
+        state = 'up' if self.healthy else 'down'
+        return f'<JudgeNode {self.name} weight={self.weight:g} load={self.load} {state}>'
+
+
+class JudgeRouter:
+    def __init__(self, nodes: Iterable[Dict[str, Any]], pool_size: int = 4, encoding: str = ENCODING_MSGPACK,
+                 stats_interval: float = 1.0, health_check_interval: float = 5.0, stats_timeout: float = 2.0,
+                 routing: str = ROUTING_LEAST_LOADED, spill_threshold: float = 2.0):
+        self.nodes: List[JudgeNode] = [
+            JudgeNode(n.get('host', '127.0.0.1'), int(n.get('port', 3726)), n.get('weight', 1.0),
+                      pool_size=pool_size, encoding=encoding)
+            for n in nodes
+        ]
+        if not self.nodes:
+            raise ValueError("At least one judge node is required")
+        self.stats_interval = stats_interval
+        self.health_check_interval = health_check_interval
+        self.stats_timeout = stats_timeout
+        self.routing = routing
+        self.spill_threshold = spill_threshold
+        self._ring = sorted(
+            (_ring_hash(f"{node.name}#{i}"), index)
+            for index, node in enumerate(self.nodes)
+            for i in range(max(int(_VIRTUAL_NODES * node.weight), 1))
+        )
+        self._ring_keys = [h for h, _ in self._ring]
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get_node(self, name: Optional[str]) -> JudgeNode:
+        """
+        按名称查找节点，未知名称（如旧记录）返回第一个节点
+        :param name: 节点名称 host:port
+        """
+        for node in self.nodes:
+            if node.name == name:
+                return node
+        return self.nodes[0]
+
+    def mark_down(self, node: JudgeNode, reason: Any = None) -> None:
+        """
+        节点不再参与路由，直到健康检查通过。只关闭空闲连接：同一连接上其他线程等待中的评测结果
+        不因一次超时而中断，节点确实不可用时这些请求会随连接断开或各自超时结束
+        """
+        with self._lock:
+            if node.healthy:
+                logger.warning("Judge node %s marked down: %s", node.name, reason)
+            node.healthy = False
+            node.next_check = time.monotonic() + self.health_check_interval
+        node.client.close_idle()
+
+    def check(self, node: JudgeNode) -> bool:
+        """
+        通过 stats 请求探测节点并更新负载
+        :return: 节点是否可用
+        """
+        try:
+            result = node.client.request({'action': 'stats'}, timeout=self.stats_timeout) or {}
+        except ServerBusyError:
+            # 节点可用，只是暂时无法接受新连接，保留上次的负载
+            with self._lock:
+                node.next_check = time.monotonic() + self.stats_interval
+            return node.healthy
+        except Exception as e:
+            self.mark_down(node, e)
+            return False
+        stats = result.get('stats')
+        with self._lock:
+            if stats:
+                node.load = stats.get('active', 0) + stats.get('queued', 0)
+                node.workers = stats.get('workers', 0)
+            else:
+                # 旧版评测机只在 data.score 中返回运行中的任务数
+                node.load = (result.get('data') or {}).get('score', 0)
+            node.routed = 0
+            if not node.healthy:
+                logger.info("Judge node %s is back up", node.name)
+            node.healthy = True
+            node.next_check = time.monotonic() + self.stats_interval
+        return True
+
+    def refresh(self) -> None:
+        """刷新到期节点的负载；并发调用时只由一个线程执行"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            for node in self.nodes:
+                if now >= node.next_check:
+                    self.check(node)
+        finally:
+            self._refresh_lock.release()
+
+    def owners(self, problem_id: Any) -> List[JudgeNode]:
+        """
+        题目在哈希环上的节点顺序（第一个为所属节点，其余为溢出顺序）
+        :param problem_id: 题目ID
+        """
+        start = bisect.bisect(self._ring_keys, _ring_hash(f"problem:{problem_id}"))
+        order: List[JudgeNode] = []
+        for i in range(len(self._ring)):
+            node = self.nodes[self._ring[(start + i) % len(self._ring)][1]]
+            if node not in order:
+                order.append(node)
+                if len(order) == len(self.nodes):
+                    break
+        return order
+
+    def candidates(self, problem_id: Any = None) -> List[JudgeNode]:
+        """
+        提交的候选节点，按尝试顺序排列。
+        按负载路由时为 负载/权重 从低到高的健康节点；按题目亲和路由时为哈希环上未饱和的
+        健康节点，其后是其余健康节点（按负载）。全部下线时返回所有节点作为最后尝试。
+        """
+        self.refresh()
+        with self._lock:
+            healthy = [n for n in self.nodes if n.healthy]
+            by_load = sorted(healthy or self.nodes, key=lambda n: n.score)
+            if self.routing != ROUTING_AFFINITY or problem_id is None or not healthy:
+                return by_load
+            preferred = [n for n in self.owners(problem_id) if n.healthy and not n.saturated(self.spill_threshold)]
+            return preferred + [n for n in by_load if n not in preferred]
+
+    def submit(self, data: Dict[str, Any]) -> Tuple[Optional[JudgeNode], Optional[str]]:
+        """
+        把提交路由到候选节点中的第一个，连接失败时转投下一个节点。
+        超时的请求可能已被节点接受，因此先在同一节点上重试一次（节点按 submission_id 去重，
+        重试不会重复评测），仍失败才转投。节点繁忙时不标记下线，直接尝试下一个节点
+        :param data: submit 请求内容
+        :return: (节点, 评测任务ID)，所有节点都不可用时为 (None, None)
+        :raises ServerBusyError: 没有节点接受提交且至少一个节点繁忙，调用方应稍后重试
+        """
+        busy = False
+        for node in self.candidates(data.get('problem_id')):
+            try:
+                try:
+                    result = node.client.request(data, timeout=self.stats_timeout * 5) or {}
+                except ServerBusyError:
+                    raise
+                except Exception as e:
+                    logger.info("Retrying submission on judge node %s: %s", node.name, e)
+                    result = node.client.request(data, timeout=self.stats_timeout * 5) or {}
+            except ServerBusyError:
+                logger.info("Judge node %s is busy", node.name)
+                busy = True
+                continue
+            except Exception as e:
+                self.mark_down(node, e)
+                continue
+            if result.get('status') == 'ok' and result.get('judge_id'):
+                with self._lock:
+                    node.routed += 1
+                return node, result['judge_id']
+            logger.warning("Judge node %s rejected submission: %s", node.name, result.get('error'))
+        if busy:
+            raise ServerBusyError("All available judge nodes are busy")
+        return None, None
+
+    def close(self) -> None:
+        for node in self.nodes:
+            node.client.close()
+
+
+def judge_nodes_from_config(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    从应用配置读取节点列表
+    :param config: 应用配置，例如 current_app.config
+    """
+    nodes = config.get('JUDGE_NODES')
+    if nodes:
+        return nodes
+    return [{
+        'host': config.get('JUDGE_RPC_HOST', '127.0.0.1'),
+        'port': config.get('JUDGE_RPC_PORT', 3726),
+        'weight': 1.0,
+    }]
+
+
+_routers: Dict[Tuple[int, int], JudgeRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_judge_router() -> JudgeRouter:
+    """
+    获取进程内共享的评测机路由器，节点列表来自当前应用配置
+    """
+    from flask import current_app
+    config = current_app.config
+    # 以 pid 区分，避免 fork 出的子进程复用父进程的套接字
+    key = (os.getpid(), id(current_app._get_current_object()))
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = JudgeRouter(
+                judge_nodes_from_config(config),
+                pool_size=config.get('JUDGE_POOL_SIZE', 4),
+                encoding=config.get('JUDGE_ENCODING', ENCODING_MSGPACK),
+                stats_interval=config.get('JUDGE_STATS_INTERVAL', 1.0),
+                health_check_interval=config.get('JUDGE_HEALTH_CHECK_INTERVAL', 5.0),
+                routing=config.get('JUDGE_ROUTING', ROUTING_LEAST_LOADED),
+                spill_threshold=config.get('JUDGE_SPILL_THRESHOLD', 2.0),
+            )
+            _routers[key] = router
+        return router
@@ -0,0 +1,159 @@
+"""
+评测机 RPC 协议：每条消息为 4 字节大端长度前缀 + 负载。
+
+长度前缀分帧使任意大小的代码与编译错误信息都能在一次往返内完整传输，
+接收方按长度读取，无需扫描分隔符。负载默认为 JSON；连接建立后可通过
+hello 请求协商为 MessagePack（需安装 msgpack），协商失败时保持 JSON。
+"""
+import asyncio
+import json
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # type: ignore
+
+# 与评测机 [server] max_message_size 保持一致
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+_HEADER = struct.Struct('>I')
+
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+
+# 评测机连接处理线程已满时拒绝新连接的响应状态
+STATUS_BUSY = 'busy'
+
+
+class ProtocolError(ValueError):
+    """消息格式错误或超出大小限制"""
+
+
+class ServerBusyError(ConnectionRefusedError):
+    """评测机繁忙，拒绝了本次连接。节点本身可用，稍后重试即可，不应视为节点下线"""
+
+
+def is_busy(reply: Dict[str, Any]) -> bool:
+    """
+    响应是否为繁忙拒绝（旧版评测机以 error 字段表示）
+    """
+    return reply.get('status') == STATUS_BUSY or reply.get('error') == 'Server busy'
+
+
+def supported_encodings(preferred: str = ENCODING_MSGPACK) -> List[str]:
+    """
+    本端可用的编码，按偏好排序，用于 hello 协商
+    """
+    encodings = [ENCODING_JSON]
+    if msgpack is not None and preferred == ENCODING_MSGPACK:
+        encodings.insert(0, ENCODING_MSGPACK)
+    return encodings
+
+
+def hello_request(preferred: str = ENCODING_MSGPACK) -> Optional[Dict[str, Any]]:
+    """
+    编码协商的 hello 请求（以 JSON 发送）
+    :param preferred: 期望使用的编码
+    :return: 请求内容；本端只支持 JSON 时无需协商，返回 None
+    """
+    offered = supported_encodings(preferred)
+    if offered == [ENCODING_JSON]:
+        return None
+    return {'action': 'hello', 'encodings': offered}
+
+
+def negotiated_encoding(request: Dict[str, Any], reply: Optional[Dict[str, Any]]) -> str:
+    """
+    由 hello 的响应确定双方约定的编码
+    :param request: hello_request 返回的请求
+    :param reply: 评测机的响应，连接已关闭时为 None
+    :return: 约定的编码
+    :raises ConnectionError: 握手期间连接关闭
+    :raises ServerBusyError: 评测机繁忙
+    """
+    if reply is None:
+        raise ConnectionError("Judge connection closed during handshake")
+    if is_busy(reply):
+        raise ServerBusyError("Judge server busy")
+    # 旧版评测机对 hello 返回 Unknown action，继续使用 JSON
+    if reply.get('status') == 'ok' and reply.get('encoding') in request['encodings']:
+        return reply['encoding']
+    return ENCODING_JSON
+
+
+def encode_message(message: Dict[str, Any], encoding: str = ENCODING_JSON) -> bytes:
+    """
+    将消息编码为一帧
+    :param message: 消息内容
+    :param encoding: 负载编码
+    :return: 帧字节
+    """
+    if encoding == ENCODING_MSGPACK:
+        payload = msgpack.packb(message, use_bin_type=True)
+    else:
+        payload = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    if len(payload) > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {len(payload)} bytes exceeds limit of {MAX_MESSAGE_SIZE} bytes")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def parse_header(header: bytes) -> int:
+    """
+    解析帧头，返回负载长度
+    """
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {size} bytes exceeds limit of {MAX_MESSAGE_SIZE} bytes")
+    return size
+
+
+def decode_payload(payload: bytes, encoding: str = ENCODING_JSON) -> Dict[str, Any]:
+    """
+    解码帧负载
+    """
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload.decode('utf-8'))
+
+
+def read_message(stream: BinaryIO, encoding: str = ENCODING_JSON) -> Optional[Dict[str, Any]]:
+    """
+    从缓冲的二进制流中读取一条完整消息
+    :param stream: 例如 socket.makefile('rb')
+    :param encoding: 负载编码
+    :return: 消息内容，连接在消息边界处关闭时返回 None
+    """
+    header = stream.read(_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _HEADER.size:
+        raise ProtocolError("Connection closed in the middle of a message header")
+    size = parse_header(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise ProtocolError("Connection closed in the middle of a message")
+    return decode_payload(payload, encoding)
+
+
+async def read_message_async(reader: 'asyncio.StreamReader', encoding: str = ENCODING_JSON) -> Optional[Dict[str, Any]]:
+    """
+    read_message 的 asyncio 版本
+    :param reader: asyncio.open_connection 返回的 StreamReader
+    :param encoding: 负载编码
+    :return: 消息内容，连接在消息边界处关闭时返回 None
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError("Connection closed in the middle of a message header")
+    size = parse_header(header)
+    try:
+        payload = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed in the middle of a message")
+    return decode_payload(payload, encoding)
@@ -0,0 +1,95 @@
+"""
+评测队列：以 submissions 表作为持久化队列。
+
+status 为 PENDING 且未被认领的提交即为排队中的任务；调度器通过行锁
+（支持 SKIP LOCKED 的数据库）加条件更新认领任务，因此任意数量的调度器
+进程可以安全地并发消费同一个队列。进程被回收导致长期停留在 RUNNING
+的提交会在认领超时后重新入队。
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import update
+
+from ..extensions import db
+from ..models import Submission
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_submission(submission: Submission) -> None:
+    """
+    将提交放入评测队列（由调用方负责 commit）
+    :param submission: 提交记录
+    """
+    submission.status = 'PENDING'
+    submission.claimed_by = None
+    submission.claimed_at = None
+
+
+def claim_submissions(worker_id: str, limit: int = 1) -> List[int]:
+    """
+    认领最多 limit 个排队中的提交
+    :param worker_id: 调度器标识
+    :param limit: 最大认领数量
+    :return: 认领成功的提交ID列表
+    """
+    candidates = (
+        db.session.query(Submission.id)
+        .filter(Submission.status == 'PENDING', Submission.claimed_by.is_(None))
+        .order_by(Submission.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = [row.id for row in candidates]
+
+    claimed = []
+    now = datetime.utcnow()
+    for submission_id in ids:
+        # 条件更新保证不支持行锁的数据库（如 SQLite）上也只有一个调度器能认领成功
+        result = db.session.execute(
+            update(Submission)
+            .where(
+                Submission.id == submission_id,
+                Submission.status == 'PENDING',
+                Submission.claimed_by.is_(None),
+            )
+            .values(
+                status='RUNNING',
+                claimed_by=worker_id,
+                claimed_at=now,
+                attempts=Submission.attempts + 1,
+            )
+        )
+        if result.rowcount == 1:
+            claimed.append(submission_id)
+    db.session.commit()
+    return claimed
+
+
+def requeue_stale_submissions(claim_timeout: int, max_attempts: int) -> int:
+    """
+    将认领超时的提交重新入队；超过最大尝试次数的直接标记为系统错误
+    :param claim_timeout: 认领超时（秒）
+    :param max_attempts: 最大评测尝试次数
+    :return: 处理的提交数量
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=claim_timeout)
+    stale = Submission.status == 'RUNNING', Submission.claimed_at < cutoff
+
+    failed = db.session.execute(
+        update(Submission)
+        .where(*stale, Submission.attempts >= max_attempts)
+        .values(status='SYSTEM_ERROR', error_message='Judge dispatcher timed out')
+    ).rowcount
+    requeued = db.session.execute(
+        update(Submission)
+        .where(*stale, Submission.attempts < max_attempts)
+        .values(status='PENDING', claimed_by=None, claimed_at=None, judge_id=None, judge_node=None)
+    ).rowcount
+    db.session.commit()
+
+    if failed or requeued:
+        logger.warning("Stale submissions: %d requeued, %d failed", requeued, failed)
+    return failed + requeued
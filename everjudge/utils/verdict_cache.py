@@ -0,0 +1,106 @@
+"""
+评测结果缓存：代码、语言与测试数据版本都相同的提交直接复用上一次的评测结果，
+不再占用评测机。重复提交与重测未修改的代码时命中。
+
+测试数据版本由题目的测试数据修订号（上传、添加或删除测试用例时加一）、测试用例路径、分值、子任务、
+时间与内存限制及判题策略计算，任一项变化后旧结果自然不再命中，保存新结果时一并清理该题目的旧版本结果。
+Web 端不一定保存测试数据文件，因此不以文件本身计算版本；直接替换评测机上的测试数据后需重新上传以更新修订号。
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Problem, Submission, VerdictCache
+
+logger = logging.getLogger(__name__)
+
+# 评测机自身的错误及未完成的状态不缓存
+_UNCACHEABLE_STATUSES = ('PENDING', 'RUNNING', 'SYSTEM_ERROR')
+
+
+def _digest(fields: Iterable[Any]) -> str:
+    hasher = hashlib.sha256()
+    for field in fields:
+        data = str(field).encode('utf-8')
+        hasher.update(len(data).to_bytes(8, 'little'))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+def testcase_version(problem: Problem) -> str:
+    """
+    计算题目测试数据的版本
+    :param problem: 题目
+    :return: 版本哈希
+    """
+    fields = [problem.id, problem.testcase_revision or 0,
+              problem.time_limit, problem.memory_limit, problem.verdict_policy or 'all']
+    for test_case in sorted(problem.test_cases, key=lambda t: t.case_number):
+        fields.extend([
+            test_case.case_number, test_case.input_path, test_case.output_path,
+            test_case.score, test_case.subtask, test_case.time_limit, test_case.memory_limit,
+        ])
+    return _digest(fields)
+
+
+def _cache_key(submission: Submission, version: str) -> str:
+    return _digest([submission.problem_id, submission.language, version, submission.code])
+
+
+def lookup_verdict(submission: Submission) -> Optional[Dict[str, Any]]:
+    """
+    查找与提交相同的代码在当前测试数据下的评测结果
+    :param submission: 提交记录
+    :return: 评测结果，未命中返回 None
+    """
+    if not current_app.config.get('JUDGE_VERDICT_CACHE', True):
+        return None
+    version = testcase_version(submission.problem)
+    entry = VerdictCache.query.filter_by(cache_key=_cache_key(submission, version)).first()
+    if entry is None:
+        return None
+    entry.hits = (entry.hits or 0) + 1
+    return {
+        'status': entry.status,
+        'score': entry.score,
+        'execution_time': entry.execution_time,
+        'memory_used': entry.memory_used,
+        'error_message': entry.error_message,
+    }
+
+
+def store_verdict(submission: Submission, status: Dict[str, Any]) -> None:
+    """
+    保存提交的评测结果，并清理该题目旧版本测试数据下的结果
+    :param submission: 提交记录
+    :param status: 评测机返回的结果
+    """
+    if not current_app.config.get('JUDGE_VERDICT_CACHE', True):
+        return
+    if status.get('status', 'SYSTEM_ERROR') in _UNCACHEABLE_STATUSES:
+        return
+    version = testcase_version(submission.problem)
+    try:
+        VerdictCache.query.filter(
+            VerdictCache.problem_id == submission.problem_id,
+            VerdictCache.testcase_version != version,
+        ).delete(synchronize_session=False)
+        db.session.add(VerdictCache(
+            cache_key=_cache_key(submission, version),
+            problem_id=submission.problem_id,
+            testcase_version=version,
+            status=status.get('status'),
+            score=status.get('score', 0),
+            execution_time=status.get('execution_time'),
+            memory_used=status.get('memory_used'),
+            error_message=status.get('error_message'),
+            hits=0,
+        ))
+        db.session.commit()
+    except IntegrityError:
+        # 相同代码的结果已由其他调度线程保存
+        db.session.rollback()
@@ -0,0 +1,135 @@
+// 状态查询吞吐基准：N 个线程并发查询任务状态，同时一个线程持续提交新任务。
+// 对比分片任务表 TaskStore 与原先的全局 Mutex<HashMap>。
+//
+// 运行：cargo bench --bench status_qps
+
+#[allow(dead_code)]
+#[path = "../src/types.rs"]
+mod types;
+#[allow(dead_code)]
+#[path = "../src/task_store.rs"]
+mod task_store;
+
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+use task_store::{RetentionPolicy, TaskStore};
+use types::JudgeStatus;
+
+const PRELOADED_TASKS: usize = 100_000;
+const RUN_TIME: Duration = Duration::from_millis(1000);
+
+fn task_id(n: usize) -> String {
+    format!("{:x}", n)
+}
+
+trait Store: Send + Sync + 'static {
+    fn insert(&self, n: usize, status: JudgeStatus);
+    fn get(&self, task_id: &str) -> Option<JudgeStatus>;
+}
+
+// 与服务端相同，经由提交路径登记任务，第 n 个任务属于提交 n
+impl Store for TaskStore {
+    fn insert(&self, n: usize, status: JudgeStatus) {
+        TaskStore::insert_for_submission(self, n as i32, "", || task_id(n), status);
+    }
+
+    fn get(&self, task_id: &str) -> Option<JudgeStatus> {
+        TaskStore::get(self, task_id)
+    }
+}
+
+struct GlobalMutex(Mutex<HashMap<String, JudgeStatus>>);
+
+impl Store for GlobalMutex {
+    fn insert(&self, n: usize, status: JudgeStatus) {
+        self.0.lock().unwrap().insert(task_id(n), status);
+    }
+
+    fn get(&self, task_id: &str) -> Option<JudgeStatus> {
+        self.0.lock().unwrap().get(task_id).cloned()
+    }
+}
+
+fn pending() -> JudgeStatus {
+    JudgeStatus {
+        status: "PENDING".to_string(),
+        score: 0,
+        execution_time: None,
+        memory_used: None,
+        error_message: None,
+    }
+}
+
+fn run<S: Store>(store: Arc<S>, readers: usize) -> f64 {
+    let stop = Arc::new(AtomicBool::new(false));
+    let lookups = Arc::new(AtomicU64::new(0));
+
+    // 模拟持续到来的提交
+    let writer = {
+        let store = store.clone();
+        let stop = stop.clone();
+        thread::spawn(move || {
+            let mut n = PRELOADED_TASKS;
+            while !stop.load(Ordering::Relaxed) {
+                store.insert(n, pending());
+                n += 1;
+            }
+        })
+    };
+
+    let handles: Vec<_> = (0..readers)
+        .map(|r| {
+            let store = store.clone();
+            let stop = stop.clone();
+            let lookups = lookups.clone();
+            thread::spawn(move || {
+                // 简单的线性同余序列，避免各线程访问相同的键
+                let mut x = (r as u64 + 1) * 0x9e37_79b9;
+                let mut local = 0u64;
+                while !stop.load(Ordering::Relaxed) {
+                    x = x.wrapping_mul(6364136223846793005).wrapping_add(1442695040888963407);
+                    let id = task_id((x >> 33) as usize % PRELOADED_TASKS);
+                    if store.get(&id).is_some() {
+                        local += 1;
+                    }
+                }
+                lookups.fetch_add(local, Ordering::Relaxed);
+            })
+        })
+        .collect();
+
+    let start = Instant::now();
+    thread::sleep(RUN_TIME);
+    stop.store(true, Ordering::Relaxed);
+    for handle in handles {
+        let _ = handle.join();
+    }
+    let _ = writer.join();
+    lookups.load(Ordering::Relaxed) as f64 / start.elapsed().as_secs_f64()
+}
+
+fn main() {
+    let cores = thread::available_parallelism().map(|n| n.get()).unwrap_or(4);
+    let mut thread_counts = vec![1];
+    while *thread_counts.last().unwrap() < cores * 2 {
+        thread_counts.push(thread_counts.last().unwrap() * 2);
+    }
+
+    println!("status lookups/s with one concurrent submitter ({} cores)", cores);
+    println!("{:>8} {:>16} {:>16}", "threads", "TaskStore", "Mutex<HashMap>");
+    for &readers in &thread_counts {
+        let sharded = Arc::new(TaskStore::with_policy(RetentionPolicy::default()));
+        let global = Arc::new(GlobalMutex(Mutex::new(HashMap::new())));
+        for n in 0..PRELOADED_TASKS {
+            sharded.insert(n, pending());
+            global.insert(n, pending());
+        }
+        let sharded_qps = run(sharded, readers);
+        let global_qps = run(global, readers);
+        println!("{:>8} {:>16.0} {:>16.0}", readers, sharded_qps, global_qps);
+    }
+}
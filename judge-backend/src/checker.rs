@@ -0,0 +1,109 @@
+use std::borrow::Cow;
+
+use crate::sandbox::OutputSink;
+
+// 与 str::trim 一致的 ASCII 空白字符
+fn is_space(byte: u8) -> bool {
+    matches!(byte, b' ' | b'\t' | b'\n' | b'\r' | 0x0b | 0x0c)
+}
+
+// 逐块比较程序输出与标准答案，不缓存完整输出。
+// 比较规则：两侧统一换行符（\r\n、\r 视为 \n）并去除首尾空白后逐字节相等。
+// 发现不一致后不再比较，后续输出直接丢弃
+pub struct StreamingComparator<'a> {
+    // 统一换行并去除首尾空白后的标准答案
+    expected: Cow<'a, [u8]>,
+    // 已匹配到的标准答案位置
+    pos: usize,
+    // 是否已输出过非空白字符，用于跳过开头的空白
+    started: bool,
+    // 上一个字节是否为 \r，用于把 \r\n 合并为一个换行
+    pending_cr: bool,
+    // 当前连续空白的长度；末尾的空白不参与比较，遇到非空白字符时才确认
+    pending_spaces: usize,
+    // 当前连续空白是否与标准答案不一致
+    spaces_mismatch: bool,
+    mismatch: bool,
+}
+
+impl<'a> StreamingComparator<'a> {
+    pub fn new(expected: &'a str) -> Self {
+        let expected: Cow<'a, str> = if expected.contains('\r') {
+            Cow::Owned(expected.replace("\r\n", "\n").replace('\r', "\n").trim().to_string())
+        } else {
+            Cow::Borrowed(expected.trim())
+        };
+        let expected = match expected {
+            Cow::Borrowed(s) => Cow::Borrowed(s.as_bytes()),
+            Cow::Owned(s) => Cow::Owned(s.into_bytes()),
+        };
+        Self {
+            expected,
+            pos: 0,
+            started: false,
+            pending_cr: false,
+            pending_spaces: 0,
+            spaces_mismatch: false,
+            mismatch: false,
+        }
+    }
+
+    fn push(&mut self, byte: u8) {
+        // 统一换行符
+        let byte = match byte {
+            b'\r' => {
+                self.pending_cr = true;
+                b'\n'
+            }
+            b'\n' if self.pending_cr => {
+                self.pending_cr = false;
+                return;
+            }
+            other => {
+                self.pending_cr = false;
+                other
+            }
+        };
+
+        if is_space(byte) {
+            if !self.started {
+                return;
+            }
+            if self.expected.get(self.pos + self.pending_spaces) != Some(&byte) {
+                self.spaces_mismatch = true;
+            }
+            self.pending_spaces += 1;
+            return;
+        }
+
+        // 非空白字符：之前的空白不再是末尾空白，必须与标准答案一致
+        if self.spaces_mismatch {
+            self.mismatch = true;
+            return;
+        }
+        self.pos += self.pending_spaces;
+        self.pending_spaces = 0;
+        if self.expected.get(self.pos) != Some(&byte) {
+            self.mismatch = true;
+            return;
+        }
+        self.pos += 1;
+        self.started = true;
+    }
+
+    // 输出结束后判断是否与标准答案一致
+    pub fn finish(&self) -> bool {
+        !self.mismatch && self.pos == self.expected.len()
+    }
+}
+
+impl OutputSink for StreamingComparator<'_> {
+    fn write(&mut self, chunk: &[u8]) {
+        for &byte in chunk {
+            if self.mismatch {
+                return;
+            }
+            self.push(byte);
+        }
+    }
+}
@@ -0,0 +1,335 @@
+use std::collections::{BTreeMap, HashMap};
+use std::fs;
+use std::io;
+use std::path::{Path, PathBuf};
+use std::process::Command;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Mutex;
+
+use sha2::{Digest, Sha256};
+
+use crate::config::{CommandLine, LanguageConfig};
+
+// 写入中的缓存项目录前缀，启动时清理上次异常退出遗留的目录
+const STAGING_PREFIX: &str = "staging-";
+
+// 已淘汰、等待在锁外删除的缓存项目录前缀，启动时同样清理
+const TRASH_PREFIX: &str = "trash-";
+
+struct CacheEntry {
+    size: u64,
+    last_used: u64,
+    // 正在复制该缓存项的线程数，大于 0 时不会被淘汰
+    readers: usize,
+}
+
+#[derive(Default)]
+struct CacheInner {
+    entries: HashMap<String, CacheEntry>,
+    // 最近使用序号 -> 缓存键，序号最小的最先淘汰
+    lru: BTreeMap<u64, String>,
+    used: u64,
+    tick: u64,
+}
+
+impl CacheInner {
+    fn touch(&mut self, key: &str) {
+        self.tick += 1;
+        let tick = self.tick;
+        if let Some(entry) = self.entries.get_mut(key) {
+            self.lru.remove(&entry.last_used);
+            entry.last_used = tick;
+            self.lru.insert(tick, key.to_string());
+        }
+    }
+
+    fn insert(&mut self, key: String, size: u64) {
+        self.used += size;
+        self.entries.insert(key.clone(), CacheEntry { size, last_used: 0, readers: 0 });
+        self.touch(&key);
+    }
+
+    fn remove(&mut self, key: &str) -> bool {
+        match self.entries.remove(key) {
+            Some(entry) => {
+                self.lru.remove(&entry.last_used);
+                self.used -= entry.size;
+                true
+            }
+            None => false,
+        }
+    }
+}
+
+// 编译产物缓存，所有工作线程共享。
+// 以源代码、语言、编译命令与编译器版本的 SHA-256 为键，在磁盘上按键保存编译后工作目录中除源文件外的全部文件；
+// 命中时把产物复制到新的工作目录，跳过编译。只缓存编译成功的结果，总大小超出预算时按最近最少使用淘汰。
+// 锁只保护索引，产物的复制与删除都在锁外进行
+pub struct CompileCache {
+    dir: PathBuf,
+    budget: u64,
+    inner: Mutex<CacheInner>,
+    staging_seq: AtomicU64,
+    // 编译器程序 -> `--version` 的输出，首次用到时获取
+    versions: Mutex<HashMap<String, Vec<u8>>>,
+}
+
+impl std::fmt::Debug for CompileCache {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        let inner = self.inner.lock().unwrap();
+        f.debug_struct("CompileCache")
+            .field("dir", &self.dir)
+            .field("budget", &self.budget)
+            .field("used", &inner.used)
+            .field("entries", &inner.entries.len())
+            .finish()
+    }
+}
+
+impl CompileCache {
+    // budget 为缓存的字节数上限，为 0 时不缓存。目录中已有的缓存项按修改时间恢复最近使用顺序
+    pub fn new(dir: &str, budget: u64) -> Self {
+        let cache = Self {
+            dir: PathBuf::from(dir),
+            budget,
+            inner: Mutex::new(CacheInner::default()),
+            staging_seq: AtomicU64::new(0),
+            versions: Mutex::new(HashMap::new()),
+        };
+        if budget == 0 {
+            return cache;
+        }
+        if let Err(e) = fs::create_dir_all(&cache.dir) {
+            println!("Failed to create compile cache dir {}: {}", dir, e);
+            return cache;
+        }
+
+        let mut existing = Vec::new();
+        if let Ok(entries) = fs::read_dir(&cache.dir) {
+            for entry in entries.filter_map(|e| e.ok()) {
+                let path = entry.path();
+                let name = entry.file_name().to_string_lossy().into_owned();
+                if name.starts_with(STAGING_PREFIX) || name.starts_with(TRASH_PREFIX) {
+                    let _ = fs::remove_dir_all(&path);
+                    continue;
+                }
+                if !path.is_dir() {
+                    continue;
+                }
+                let modified = entry.metadata().and_then(|m| m.modified()).ok();
+                existing.push((modified, name, dir_size(&path)));
+            }
+        }
+        existing.sort();
+
+        let evicted = {
+            let mut inner = cache.inner.lock().unwrap();
+            for (_, key, size) in existing {
+                inner.insert(key, size);
+            }
+            let evicted = cache.evict(&mut inner);
+            println!("Compile cache: {} entries, {} bytes", inner.entries.len(), inner.used);
+            evicted
+        };
+        remove_dirs(evicted);
+        cache
+    }
+
+    pub fn enabled(&self) -> bool {
+        self.budget > 0
+    }
+
+    // 编译器 `--version` 的输出（含标准错误），无法执行时为空
+    fn compiler_version(&self, compile: &CommandLine) -> Vec<u8> {
+        if let Some(version) = self.versions.lock().unwrap().get(&compile.program) {
+            return version.clone();
+        }
+        let version = match Command::new(&compile.program).arg("--version").output() {
+            Ok(output) => [output.stdout, output.stderr].concat(),
+            Err(_) => Vec::new(),
+        };
+        self.versions.lock().unwrap().insert(compile.program.clone(), version.clone());
+        version
+    }
+
+    // 计算缓存键：编译命令、编译器版本或源文件扩展名变化时不会命中旧的产物
+    pub fn key(&self, language: &str, lang_config: &LanguageConfig, code: &str) -> String {
+        let version = match &lang_config.compile {
+            Some(compile) if self.enabled() => self.compiler_version(compile),
+            _ => Vec::new(),
+        };
+        let mut hasher = Sha256::new();
+        let mut field = |value: &[u8]| {
+            hasher.update((value.len() as u64).to_le_bytes());
+            hasher.update(value);
+        };
+        field(language.as_bytes());
+        field(lang_config.file_extension.as_bytes());
+        if let Some(compile) = &lang_config.compile {
+            field(compile.program.as_bytes());
+            for arg in &compile.args {
+                field(arg.as_bytes());
+            }
+        }
+        field(&version);
+        field(code.as_bytes());
+        hasher.finalize().iter().map(|b| format!("{:02x}", b)).collect()
+    }
+
+    // 命中时把缓存的产物复制到工作目录并返回 true
+    pub fn restore(&self, key: &str, work_dir: &Path) -> bool {
+        if !self.enabled() {
+            return false;
+        }
+        // 复制期间缓存项计入 readers，不会被淘汰
+        {
+            let mut inner = self.inner.lock().unwrap();
+            match inner.entries.get_mut(key) {
+                Some(entry) => entry.readers += 1,
+                None => return false,
+            }
+            inner.touch(key);
+        }
+        let copied = copy_dir(&self.dir.join(key), work_dir, None);
+
+        let mut inner = self.inner.lock().unwrap();
+        let readers = match inner.entries.get_mut(key) {
+            Some(entry) => {
+                entry.readers -= 1;
+                entry.readers
+            }
+            None => 0,
+        };
+        match copied {
+            Ok(()) => true,
+            Err(e) => {
+                println!("Failed to restore compile cache entry {}: {}", key, e);
+                // 其他线程仍在复制时保留，由淘汰或下一次失败清理
+                let trash = if readers == 0 && inner.remove(key) { self.discard(key) } else { None };
+                drop(inner);
+                remove_dirs(trash);
+                false
+            }
+        }
+    }
+
+    // 保存编译成功后工作目录中除源文件外的全部文件
+    pub fn store(&self, key: &str, work_dir: &Path, code_file: &Path) {
+        if !self.enabled() {
+            return;
+        }
+        // 先在锁外复制到临时目录，再重命名为缓存项
+        let staging = self.dir.join(format!(
+            "{}{}-{}",
+            STAGING_PREFIX,
+            std::process::id(),
+            self.staging_seq.fetch_add(1, Ordering::Relaxed)
+        ));
+        if let Err(e) = copy_dir(work_dir, &staging, Some(code_file)) {
+            println!("Failed to store compile cache entry {}: {}", key, e);
+            let _ = fs::remove_dir_all(&staging);
+            return;
+        }
+        let size = dir_size(&staging);
+        if size > self.budget {
+            let _ = fs::remove_dir_all(&staging);
+            return;
+        }
+
+        let mut inner = self.inner.lock().unwrap();
+        // 其他线程可能已保存同一份源代码的产物
+        if inner.entries.contains_key(key) {
+            drop(inner);
+            let _ = fs::remove_dir_all(&staging);
+            return;
+        }
+        if let Err(e) = fs::rename(&staging, self.dir.join(key)) {
+            println!("Failed to store compile cache entry {}: {}", key, e);
+            drop(inner);
+            let _ = fs::remove_dir_all(&staging);
+            return;
+        }
+        inner.insert(key.to_string(), size);
+        let evicted = self.evict(&mut inner);
+        drop(inner);
+        remove_dirs(evicted);
+    }
+
+    // 按最近最少使用淘汰到预算以内，跳过正在复制的缓存项。
+    // 被淘汰的目录在锁内改名，返回改名后的路径，由调用方在锁外删除
+    fn evict(&self, inner: &mut CacheInner) -> Vec<PathBuf> {
+        let mut evicted = Vec::new();
+        while inner.used > self.budget {
+            let oldest = inner
+                .lru
+                .values()
+                .find(|key| inner.entries.get(*key).map_or(true, |entry| entry.readers == 0))
+                .cloned();
+            let oldest = match oldest {
+                Some(oldest) => oldest,
+                None => break,
+            };
+            inner.remove(&oldest);
+            evicted.extend(self.discard(&oldest));
+        }
+        evicted
+    }
+
+    // 把缓存项目录改名为待删除目录，同一键随后可以立即重新保存
+    fn discard(&self, key: &str) -> Option<PathBuf> {
+        let trash = self.dir.join(format!(
+            "{}{}-{}",
+            TRASH_PREFIX,
+            std::process::id(),
+            self.staging_seq.fetch_add(1, Ordering::Relaxed)
+        ));
+        match fs::rename(self.dir.join(key), &trash) {
+            Ok(()) => Some(trash),
+            Err(_) => {
+                let _ = fs::remove_dir_all(self.dir.join(key));
+                None
+            }
+        }
+    }
+}
+
+fn remove_dirs(dirs: impl IntoIterator<Item = PathBuf>) {
+    for dir in dirs {
+        let _ = fs::remove_dir_all(dir);
+    }
+}
+
+// 递归复制目录内容，exclude 指定的文件不复制
+fn copy_dir(from: &Path, to: &Path, exclude: Option<&Path>) -> io::Result<()> {
+    fs::create_dir_all(to)?;
+    for entry in fs::read_dir(from)? {
+        let entry = entry?;
+        let path = entry.path();
+        if Some(path.as_path()) == exclude {
+            continue;
+        }
+        let target = to.join(entry.file_name());
+        if entry.file_type()?.is_dir() {
+            copy_dir(&path, &target, None)?;
+        } else {
+            // fs::copy 会保留可执行权限
+            fs::copy(&path, &target)?;
+        }
+    }
+    Ok(())
+}
+
+fn dir_size(dir: &Path) -> u64 {
+    let entries = match fs::read_dir(dir) {
+        Ok(entries) => entries,
+        Err(_) => return 0,
+    };
+    entries
+        .filter_map(|e| e.ok())
+        .map(|entry| match entry.metadata() {
+            Ok(meta) if meta.is_dir() => dir_size(&entry.path()),
+            Ok(meta) => meta.len(),
+            Err(_) => 0,
+        })
+        .sum()
+}
@@ -2,11 +2,19 @@ use serde::Deserialize;
 use std::fs::File;
 use std::io::Read;
 use std::collections::HashMap;
+use std::path::Path;
+use std::process::Command;
 
 #[derive(Deserialize, Debug, Clone)]
 pub struct Config {
     pub server: ServerConfig,
     pub languages: LanguagesConfig,
+    #[serde(default)]
+    pub results: ResultsConfig,
+    #[serde(default)]
+    pub sandbox: SandboxConfig,
+    #[serde(default)]
+    pub cache: CacheConfig,
 }
 
 #[derive(Deserialize, Debug, Clone)]
@@ -14,6 +22,134 @@ pub struct ServerConfig {
     pub host: String,
     pub port: u16,
     pub max_threads: usize,
+    // 单条请求/响应消息的最大字节数
+    #[serde(default = "default_max_message_size")]
+    pub max_message_size: usize,
+    // 连接处理线程数，即同时服务的最大连接数
+    #[serde(default = "default_max_connections")]
+    pub max_connections: usize,
+    // 等待处理线程的连接队列长度，队列满时新连接收到 busy 响应
+    #[serde(default = "default_connection_queue")]
+    pub connection_queue: usize,
+    // 没有等待中的评测结果的连接空闲超过该时间（秒）即关闭
+    #[serde(default = "default_idle_timeout")]
+    pub idle_timeout: u64,
+    // 读取一条请求、写出一条响应的超时（秒）
+    #[serde(default = "default_io_timeout")]
+    pub io_timeout: u64,
+}
+
+fn default_max_message_size() -> usize {
+    64 * 1024 * 1024
+}
+
+fn default_max_connections() -> usize {
+    256
+}
+
+fn default_connection_queue() -> usize {
+    64
+}
+
+fn default_idle_timeout() -> u64 {
+    300
+}
+
+fn default_io_timeout() -> u64 {
+    10
+}
+
+// 评测结果保留策略
+#[derive(Deserialize, Debug, Clone)]
+#[serde(default)]
+pub struct ResultsConfig {
+    // 结果未被取走时的保留时间（秒）
+    pub ttl: u64,
+    // 结果被 status/wait 取走后的保留时间（秒）
+    pub fetched_ttl: u64,
+    // 内存中最多保留的已完成结果数
+    pub max_results: usize,
+    // 过期清理间隔（秒）
+    pub sweep_interval: u64,
+    // 结果日志路径，为空时不落盘
+    pub log_path: String,
+}
+
+impl Default for ResultsConfig {
+    fn default() -> Self {
+        Self {
+            ttl: 24 * 3600,
+            fetched_ttl: 300,
+            max_results: 100_000,
+            sweep_interval: 30,
+            log_path: "./data/results.log".to_string(),
+        }
+    }
+}
+
+// 运行限制
+#[derive(Deserialize, Debug, Clone)]
+#[serde(default)]
+pub struct SandboxConfig {
+    // 墙钟时间上限 = 题目时间限制 × wall_time_factor
+    pub wall_time_factor: f64,
+    // 编译的时间上限（毫秒）
+    pub compile_timeout: u64,
+    // 地址空间上限 = 题目内存限制 × address_space_factor，为 0 时不设置
+    pub address_space_factor: f64,
+    // 不设置地址空间上限的语言（JVM 启动时会预留远超实际占用的虚拟内存）
+    pub address_space_exempt: Vec<String>,
+    // 是否将同一提交的测试点分发到空闲 CPU 上并行运行
+    pub parallel_cases: bool,
+    // 单个提交最多同时运行的测试点数
+    pub max_case_parallelism: usize,
+    // 用于并行评测的 CPU 槽位数，为 0 时使用全部可用 CPU
+    pub cpu_slots: usize,
+    // 单个测试点的输出上限（MB），同时限制写入单个文件的大小，为 0 时不限制
+    pub output_limit_mb: u64,
+    // 使用预热运行时的语言：常驻已启动的解释器进程，测试点由其 fork 出的子进程运行
+    pub warm_languages: Vec<String>,
+    // 每种预热语言保留的空闲常驻进程数
+    pub warm_runtimes: usize,
+}
+
+impl Default for SandboxConfig {
+    fn default() -> Self {
+        Self {
+            wall_time_factor: 3.0,
+            compile_timeout: 30000,
+            address_space_factor: 2.0,
+            address_space_exempt: vec!["java".to_string(), "kotlin".to_string()],
+            parallel_cases: false,
+            max_case_parallelism: 4,
+            cpu_slots: 0,
+            output_limit_mb: 64,
+            warm_languages: Vec::new(),
+            warm_runtimes: 2,
+        }
+    }
+}
+
+// 评测节点本地缓存
+#[derive(Deserialize, Debug, Clone)]
+#[serde(default)]
+pub struct CacheConfig {
+    // 测试数据缓存的内存预算（MB），为 0 时不缓存
+    pub test_cases_mb: usize,
+    // 编译产物缓存的磁盘预算（MB），为 0 时不缓存
+    pub compile_mb: u64,
+    // 编译产物缓存目录
+    pub compile_dir: String,
+}
+
+impl Default for CacheConfig {
+    fn default() -> Self {
+        Self {
+            test_cases_mb: 512,
+            compile_mb: 1024,
+            compile_dir: "compile_cache".to_string(),
+        }
+    }
 }
 
 #[derive(Deserialize, Debug, Clone)]
@@ -22,6 +158,64 @@ pub struct LanguagesConfig {
     pub supported: Vec<String>,
     pub temp_dir: String,
     pub test_cases_dir: String,
+    // 内存文件系统上的评测工作目录根，按端口区分评测机实例；为空或不可用时使用 temp_dir
+    #[serde(default = "default_workspace_dir")]
+    pub workspace_dir: String,
+    // 预编译头文件目录
+    #[serde(default = "default_pch_dir")]
+    pub pch_dir: String,
+    // [languages.<name>] 覆盖内置的语言配置
+    #[serde(flatten)]
+    pub overrides: HashMap<String, LanguageOverride>,
+}
+
+fn default_workspace_dir() -> String {
+    "/dev/shm/everjudge".to_string()
+}
+
+fn default_pch_dir() -> String {
+    "pch".to_string()
+}
+
+#[derive(Deserialize, Debug, Clone, Default)]
+pub struct LanguageOverride {
+    // 为空字符串时表示不需要编译
+    pub compile_command: Option<String>,
+    pub run_command: Option<String>,
+    pub file_extension: Option<String>,
+    // 为空列表时不使用预编译头文件
+    pub precompiled_headers: Option<Vec<String>>,
+}
+
+// 解析为 argv 的命令行，执行时直接 exec，不经过 shell
+#[derive(Debug, Clone, Default)]
+pub struct CommandLine {
+    pub program: String,
+    pub args: Vec<String>,
+}
+
+impl CommandLine {
+    pub fn parse(command: &str) -> Result<Self, Box<dyn std::error::Error>> {
+        let mut argv = shell_words::split(command)?;
+        if argv.is_empty() {
+            return Err(format!("Empty command: '{}'", command).into());
+        }
+        let program = argv.remove(0);
+        Ok(Self { program, args: argv })
+    }
+
+    // 构造在 work_dir 中执行的命令，参数中的 {file} 替换为代码文件路径。
+    // 以 ./ 开头的程序按工作目录解析，不依赖平台对相对路径的处理
+    pub fn command(&self, file: &str, work_dir: &Path) -> Command {
+        let program = if self.program.starts_with("./") || self.program.starts_with("../") {
+            work_dir.join(&self.program).to_string_lossy().into_owned()
+        } else {
+            self.program.replace("{file}", file)
+        };
+        let mut command = Command::new(program);
+        command.args(self.args.iter().map(|arg| arg.replace("{file}", file))).current_dir(work_dir);
+        command
+    }
 }
 
 #[derive(Deserialize, Debug, Clone)]
@@ -30,6 +224,59 @@ pub struct LanguageConfig {
     pub run_command: String,
     pub file_extension: String,
     pub needs_compilation: bool,
+    // 启动时预编译的头文件（仅 C/C++）
+    #[serde(default)]
+    pub precompiled_headers: Vec<String>,
+    // 加载配置时由 compile_command / run_command 解析得到
+    #[serde(skip)]
+    pub compile: Option<CommandLine>,
+    #[serde(skip)]
+    pub run: CommandLine,
+}
+
+impl LanguageConfig {
+    fn new(compile_command: Option<&str>, run_command: &str, file_extension: &str) -> Self {
+        Self {
+            compile_command: compile_command.map(|c| c.to_string()),
+            run_command: run_command.to_string(),
+            file_extension: file_extension.to_string(),
+            needs_compilation: compile_command.is_some(),
+            precompiled_headers: Vec::new(),
+            compile: None,
+            run: CommandLine::default(),
+        }
+    }
+
+    fn with_precompiled_headers(mut self, headers: &[&str]) -> Self {
+        self.precompiled_headers = headers.iter().map(|h| h.to_string()).collect();
+        self
+    }
+
+    fn apply(&mut self, language_override: &LanguageOverride) {
+        if let Some(compile_command) = &language_override.compile_command {
+            self.compile_command = Some(compile_command.clone()).filter(|c| !c.trim().is_empty());
+            self.needs_compilation = self.compile_command.is_some();
+        }
+        if let Some(run_command) = &language_override.run_command {
+            self.run_command = run_command.clone();
+        }
+        if let Some(file_extension) = &language_override.file_extension {
+            self.file_extension = file_extension.clone();
+        }
+        if let Some(precompiled_headers) = &language_override.precompiled_headers {
+            self.precompiled_headers = precompiled_headers.clone();
+        }
+    }
+
+    // 将命令解析为 argv，配置有误时在启动阶段报错
+    fn parse_commands(&mut self) -> Result<(), Box<dyn std::error::Error>> {
+        self.compile = match &self.compile_command {
+            Some(command) if self.needs_compilation => Some(CommandLine::parse(command)?),
+            _ => None,
+        };
+        self.run = CommandLine::parse(&self.run_command)?;
+        Ok(())
+    }
 }
 
 pub fn load_config() -> Result<Config, Box<dyn std::error::Error>> {
@@ -52,88 +299,31 @@ pub fn load_language_configs() -> Result<HashMap<String, LanguageConfig>, Box<dy
     
     // 根据配置文件中支持的语言列表加载配置
     for lang in config.languages.supported.iter() {
-        let lang_config = match lang.as_str() {
-            "c" => LanguageConfig {
-                compile_command: Some("gcc {file} -o output.exe".to_string()),
-                run_command: "./output.exe".to_string(),
-                file_extension: ".c".to_string(),
-                needs_compilation: true,
-            },
-            "cpp" => LanguageConfig {
-                compile_command: Some("g++ {file} -o output.exe".to_string()),
-                run_command: "./output.exe".to_string(),
-                file_extension: ".cpp".to_string(),
-                needs_compilation: true,
-            },
-            "java" => LanguageConfig {
-                compile_command: Some("javac {file}".to_string()),
-                run_command: "java Main".to_string(),
-                file_extension: ".java".to_string(),
-                needs_compilation: true,
-            },
-            "javascript" => LanguageConfig {
-                compile_command: None,
-                run_command: "node {file}".to_string(),
-                file_extension: ".js".to_string(),
-                needs_compilation: false,
-            },
-            "python_2" => LanguageConfig {
-                compile_command: None,
-                run_command: "python2 {file}".to_string(),
-                file_extension: ".py".to_string(),
-                needs_compilation: false,
-            },
-            "python_3" => LanguageConfig {
-                compile_command: None,
-                run_command: "python3 {file}".to_string(),
-                file_extension: ".py".to_string(),
-                needs_compilation: false,
-            },
-            "pascal" => LanguageConfig {
-                compile_command: Some("fpc {file}".to_string()),
-                run_command: "./code".to_string(),
-                file_extension: ".pas".to_string(),
-                needs_compilation: true,
-            },
-            "common_lisp" => LanguageConfig {
-                compile_command: None,
-                run_command: "sbcl --script {file}".to_string(),
-                file_extension: ".lisp".to_string(),
-                needs_compilation: false,
-            },
-            "plain_text" => LanguageConfig {
-                compile_command: None,
-                run_command: "cat {file}".to_string(),
-                file_extension: ".txt".to_string(),
-                needs_compilation: false,
-            },
-            "brainfuck" => LanguageConfig {
-                compile_command: None,
-                run_command: "bf {file}".to_string(),
-                file_extension: ".bf".to_string(),
-                needs_compilation: false,
-            },
-            "r" => LanguageConfig {
-                compile_command: None,
-                run_command: "Rscript {file}".to_string(),
-                file_extension: ".r".to_string(),
-                needs_compilation: false,
-            },
-            "rust" => LanguageConfig {
-                compile_command: Some("rustc {file} -o output.exe".to_string()),
-                run_command: "./output.exe".to_string(),
-                file_extension: ".rs".to_string(),
-                needs_compilation: true,
-            },
-            "kotlin" => LanguageConfig {
-                compile_command: Some("kotlinc {file} -include-runtime -d output.jar".to_string()),
-                run_command: "java -jar output.jar".to_string(),
-                file_extension: ".kt".to_string(),
-                needs_compilation: true,
-            },
+        let mut lang_config = match lang.as_str() {
+            "c" => LanguageConfig::new(Some("gcc {file} -o output.exe"), "./output.exe", ".c"),
+            "cpp" => LanguageConfig::new(Some("g++ {file} -o output.exe"), "./output.exe", ".cpp")
+                .with_precompiled_headers(&["bits/stdc++.h"]),
+            "java" => LanguageConfig::new(Some("javac {file}"), "java Main", ".java"),
+            "javascript" => LanguageConfig::new(None, "node {file}", ".js"),
+            "python_2" => LanguageConfig::new(None, "python2 {file}", ".py"),
+            "python_3" => LanguageConfig::new(None, "python3 {file}", ".py"),
+            "pascal" => LanguageConfig::new(Some("fpc {file}"), "./code", ".pas"),
+            "common_lisp" => LanguageConfig::new(None, "sbcl --script {file}", ".lisp"),
+            "plain_text" => LanguageConfig::new(None, "cat {file}", ".txt"),
+            "brainfuck" => LanguageConfig::new(None, "bf {file}", ".bf"),
+            "r" => LanguageConfig::new(None, "Rscript {file}", ".r"),
+            "rust" => LanguageConfig::new(Some("rustc {file} -o output.exe"), "./output.exe", ".rs"),
+            "kotlin" => LanguageConfig::new(Some("kotlinc {file} -include-runtime -d output.jar"), "java -jar output.jar", ".kt"),
             _ => continue, // 跳过不支持的语言
         };
         
+        if let Some(language_override) = config.languages.overrides.get(lang) {
+            lang_config.apply(language_override);
+        }
+        lang_config
+            .parse_commands()
+            .map_err(|e| format!("Invalid command for language '{}': {}", lang, e))?;
+        
         language_configs.insert(lang.clone(), lang_config);
     }
     
@@ -0,0 +1,81 @@
+use std::sync::{Condvar, Mutex};
+
+// 评测用的 CPU 槽位：每个槽位对应一个 CPU 核心，同一时刻只有一个测试点进程绑定在该核心上，
+// 并行评测测试点时各进程互不争抢 CPU，计时保持公平
+#[derive(Debug)]
+pub struct CpuSlots {
+    free: Mutex<Vec<usize>>,
+    available: Condvar,
+}
+
+// 已占用的槽位，释放时归还
+#[derive(Debug)]
+pub struct CpuSlot<'a> {
+    slots: &'a CpuSlots,
+    cpu: usize,
+}
+
+impl CpuSlot<'_> {
+    pub fn cpu(&self) -> usize {
+        self.cpu
+    }
+}
+
+impl Drop for CpuSlot<'_> {
+    fn drop(&mut self) {
+        self.slots.free.lock().unwrap().push(self.cpu);
+        self.slots.available.notify_one();
+    }
+}
+
+impl CpuSlots {
+    // count 为 0 时使用本进程可用的全部 CPU
+    pub fn new(count: usize) -> Self {
+        let mut cpus = allowed_cpus();
+        if count > 0 {
+            cpus.truncate(count);
+        }
+        // 优先分配编号小的核心
+        cpus.reverse();
+        Self {
+            free: Mutex::new(cpus),
+            available: Condvar::new(),
+        }
+    }
+
+    // 阻塞直到有空闲槽位
+    pub fn acquire(&self) -> CpuSlot<'_> {
+        let mut free = self.free.lock().unwrap();
+        loop {
+            if let Some(cpu) = free.pop() {
+                return CpuSlot { slots: self, cpu };
+            }
+            free = self.available.wait(free).unwrap();
+        }
+    }
+
+    // 仅在有空闲槽位时占用，用于借用空闲核心
+    pub fn try_acquire(&self) -> Option<CpuSlot<'_>> {
+        let cpu = self.free.lock().unwrap().pop()?;
+        Some(CpuSlot { slots: self, cpu })
+    }
+}
+
+#[cfg(target_os = "linux")]
+fn allowed_cpus() -> Vec<usize> {
+    unsafe {
+        let mut set: libc::cpu_set_t = std::mem::zeroed();
+        if libc::sched_getaffinity(0, std::mem::size_of::<libc::cpu_set_t>(), &mut set) == 0 {
+            let cpus: Vec<usize> = (0..libc::CPU_SETSIZE as usize).filter(|&cpu| libc::CPU_ISSET(cpu, &set)).collect();
+            if !cpus.is_empty() {
+                return cpus;
+            }
+        }
+    }
+    (0..std::thread::available_parallelism().map(|n| n.get()).unwrap_or(1)).collect()
+}
+
+#[cfg(not(target_os = "linux"))]
+fn allowed_cpus() -> Vec<usize> {
+    (0..std::thread::available_parallelism().map(|n| n.get()).unwrap_or(1)).collect()
+}
@@ -1,46 +1,87 @@
 use std::sync::Arc;
 use std::sync::Mutex;
 use std::sync::mpsc;
-use std::collections::HashMap;
+use std::panic::{self, AssertUnwindSafe};
 use std::thread;
 use std::time::{SystemTime, Duration};
-use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
-use std::fmt;
+use std::sync::atomic::{AtomicBool, AtomicU64, AtomicUsize, Ordering};
 
+use std::path::Path;
+
+use sha2::{Digest, Sha256};
+
+use crate::config::ResultsConfig;
 use crate::languages::LanguageHandler;
-use crate::types::{JudgeTask, JudgeStatus};
+use crate::task_store::{ResultCallback, RetentionPolicy, TaskStore};
+use crate::types::{JudgeTask, JudgeStatus, TestCaseSpec, VerdictPolicy};
+
+// 任务ID：毫秒时间戳-进程ID-进程内递增序号。
+// 同一毫秒内的任意多次提交由序号区分，进程ID区分重启前后（结果日志恢复的任务）
+static NEXT_TASK_SEQ: AtomicU64 = AtomicU64::new(0);
 
-// 简单的唯一ID生成函数，只使用时间戳
 fn generate_unique_id() -> String {
     let timestamp = SystemTime::now()
         .duration_since(SystemTime::UNIX_EPOCH)
         .unwrap()
         .as_millis();
+    let seq = NEXT_TASK_SEQ.fetch_add(1, Ordering::Relaxed);
     
-    format!("{:x}", timestamp)
+    format!("{:x}-{:x}-{:x}", timestamp, std::process::id(), seq)
+}
+
+// 评测请求摘要：代码、语言、限制、判题策略、测试点列表与 Web 端计算的测试数据版本。
+// 同一提交以相同内容重复 submit 时复用原任务；任一项变化（重测、修改测试数据或限制）时重新评测
+fn request_digest(
+    code: &str,
+    language: &str,
+    time_limit: i32,
+    memory_limit: u64,
+    verdict_policy: VerdictPolicy,
+    test_cases: &[TestCaseSpec],
+    testcase_version: Option<&str>,
+) -> String {
+    let mut hasher = Sha256::new();
+    let mut field = |value: &[u8]| {
+        hasher.update((value.len() as u64).to_le_bytes());
+        hasher.update(value);
+    };
+    field(code.as_bytes());
+    field(language.as_bytes());
+    field(&time_limit.to_le_bytes());
+    field(&memory_limit.to_le_bytes());
+    field(format!("{:?}", verdict_policy).as_bytes());
+    for test_case in test_cases {
+        field(test_case.name.as_bytes());
+        field(&test_case.score.to_le_bytes());
+        field(format!("{:?}", test_case.subtask).as_bytes());
+    }
+    field(testcase_version.unwrap_or("").as_bytes());
+    hasher.finalize().iter().map(|b| format!("{:02x}", b)).collect()
 }
 
 // 任务队列项
 struct QueueItem {
     task: JudgeTask,
     task_id: String,
-    response_sender: mpsc::Sender<JudgeStatus>,
 }
 
-// 线程池
+// 线程池：提交方通过通道把任务交给工作线程，工作线程直接把结果写回任务表
 #[derive(Debug)]
 struct ThreadPool {
-    workers: Vec<thread::JoinHandle<()>>,
+    workers: Mutex<Vec<thread::JoinHandle<()>>>,
     sender: mpsc::Sender<QueueItem>,
     shutdown: Arc<AtomicBool>,
     active_tasks: Arc<AtomicUsize>,
+    // 已提交但尚未被工作线程取走的任务数
+    queued_tasks: Arc<AtomicUsize>,
 }
 
 impl ThreadPool {
-    fn new(size: usize, language_handler: LanguageHandler) -> Self {
+    fn new(size: usize, language_handler: LanguageHandler, tasks: Arc<TaskStore>) -> Self {
         let (sender, receiver) = mpsc::channel::<QueueItem>();
         let shutdown = Arc::new(AtomicBool::new(false));
         let active_tasks = Arc::new(AtomicUsize::new(0));
+        let queued_tasks = Arc::new(AtomicUsize::new(0));
         let receiver = Arc::new(Mutex::new(receiver));
         
         let mut workers = Vec::with_capacity(size);
@@ -50,6 +91,8 @@ impl ThreadPool {
             let language_handler = language_handler.clone();
             let shutdown = shutdown.clone();
             let active_tasks = active_tasks.clone();
+            let queued_tasks = queued_tasks.clone();
+            let tasks = tasks.clone();
             
             let handle = thread::spawn(move || {
                 println!("Worker {} started", i);
@@ -70,15 +113,24 @@ impl ThreadPool {
                     match item {
                         Ok(queue_item) => {
                             // 增加活跃任务计数
+                            queued_tasks.fetch_sub(1, Ordering::Relaxed);
                             active_tasks.fetch_add(1, Ordering::Relaxed);
                             
                             println!("Worker {} processing task {}", i, queue_item.task_id);
                             
-                            // 执行评测任务
-                            let result = language_handler.judge_task(queue_item.task);
+                            // 执行评测任务；评测过程中的 panic 记为系统错误，不让工作线程退出
+                            let task = queue_item.task;
+                            let result = panic::catch_unwind(AssertUnwindSafe(|| language_handler.judge_task(task)))
+                                .unwrap_or_else(|_| JudgeStatus {
+                                    status: "SYSTEM_ERROR".to_string(),
+                                    score: 0,
+                                    execution_time: None,
+                                    memory_used: None,
+                                    error_message: Some("Judge worker panicked".to_string()),
+                                });
                             
-                            // 发送结果
-                            let _ = queue_item.response_sender.send(result);
+                            // 写入结果并推送给订阅者
+                            tasks.complete(queue_item.task_id.clone(), result);
                             
                             // 减少活跃任务计数
                             active_tasks.fetch_sub(1, Ordering::Relaxed);
@@ -102,27 +154,33 @@ impl ThreadPool {
         }
         
         Self {
-            workers,
+            workers: Mutex::new(workers),
             sender,
             shutdown,
             active_tasks,
+            queued_tasks,
         }
     }
     
-    fn submit(&self, task: JudgeTask, task_id: String, response_sender: mpsc::Sender<JudgeStatus>) -> Result<(), mpsc::SendError<QueueItem>> {
-        self.sender.send(QueueItem {
+    fn submit(&self, task: JudgeTask, task_id: String) -> Result<(), mpsc::SendError<QueueItem>> {
+        self.queued_tasks.fetch_add(1, Ordering::Relaxed);
+        let result = self.sender.send(QueueItem {
             task,
             task_id,
-            response_sender,
-        })
+        });
+        if result.is_err() {
+            self.queued_tasks.fetch_sub(1, Ordering::Relaxed);
+        }
+        result
     }
     
-    fn shutdown(self) {
+    fn shutdown(&self) {
         // 设置关闭标志
         self.shutdown.store(true, Ordering::Relaxed);
         
         // 等待所有工作线程完成
-        for worker in self.workers {
+        let workers: Vec<_> = self.workers.lock().unwrap().drain(..).collect();
+        for worker in workers {
             let _ = worker.join();
         }
         
@@ -132,60 +190,94 @@ impl ThreadPool {
     fn get_active_count(&self) -> usize {
         self.active_tasks.load(Ordering::Relaxed)
     }
+    
+    fn get_queued_count(&self) -> usize {
+        self.queued_tasks.load(Ordering::Relaxed)
+    }
 }
 
-// 评测池（包含线程池）
+// 评测池（包含线程池）。所有方法只需 &self，服务端通过 Arc 共享而无需全局锁
 #[derive(Debug)]
 pub struct JudgePool {
-    tasks: Arc<Mutex<HashMap<String, JudgeStatus>>>,
-    thread_pool: Option<ThreadPool>,
-    language_handler: LanguageHandler,
+    tasks: Arc<TaskStore>,
+    thread_pool: ThreadPool,
     max_threads: usize,
 }
 
 impl JudgePool {
-    pub fn new(max_threads: usize) -> Result<Self, Box<dyn std::error::Error>> {
+    pub fn new(max_threads: usize, results: &ResultsConfig) -> Result<Self, Box<dyn std::error::Error>> {
         let language_handler = LanguageHandler::new()?;
-        let thread_pool = ThreadPool::new(max_threads, language_handler.clone());
+        let policy = RetentionPolicy {
+            result_ttl: results.ttl,
+            fetched_ttl: results.fetched_ttl,
+            max_results: results.max_results,
+        };
+        let tasks = Arc::new(if results.log_path.is_empty() {
+            TaskStore::with_policy(policy)
+        } else {
+            TaskStore::open(policy, Path::new(&results.log_path))?
+        });
+        
+        // 定期淘汰过期结果
+        let sweeper_tasks = tasks.clone();
+        let sweep_interval = Duration::from_secs(results.sweep_interval.max(1));
+        thread::spawn(move || loop {
+            thread::sleep(sweep_interval);
+            let evicted = sweeper_tasks.sweep();
+            if evicted > 0 {
+                println!("Evicted {} judge results", evicted);
+            }
+        });
+        
+        let thread_pool = ThreadPool::new(max_threads, language_handler, tasks.clone());
         
         Ok(Self {
-            tasks: Arc::new(Mutex::new(HashMap::new())),
-            thread_pool: Some(thread_pool),
-            language_handler,
+            tasks,
+            thread_pool,
             max_threads,
         })
     }
     
     pub fn submit_task(
-        &mut self,
+        &self,
         submission_id: i32,
         problem_id: i32,
         code: String,
         language: String,
         time_limit: i32,
         memory_limit: u64,
+        verdict_policy: VerdictPolicy,
+        test_cases: Vec<TestCaseSpec>,
+        testcase_version: Option<String>,
     ) -> String {
-        // 生成唯一任务ID
-        let task_id = generate_unique_id();
-        
-        // 初始化任务状态
-        {
-            let mut tasks = self.tasks.lock().unwrap();
-            tasks.insert(
-                task_id.clone(),
-                JudgeStatus {
-                    status: "PENDING".to_string(),
-                    score: 0,
-                    execution_time: None,
-                    memory_used: None,
-                    error_message: None,
-                }
-            );
+        // 同一提交已有相同内容的任务（评测中或结果尚未被确认）时直接返回原任务ID，
+        // 调度器超时重试不会重复评测
+        let digest = request_digest(
+            &code,
+            &language,
+            time_limit,
+            memory_limit,
+            verdict_policy,
+            &test_cases,
+            testcase_version.as_deref(),
+        );
+        let (task_id, created) = self.tasks.insert_for_submission(
+            submission_id,
+            &digest,
+            generate_unique_id,
+            JudgeStatus {
+                status: "PENDING".to_string(),
+                score: 0,
+                execution_time: None,
+                memory_used: None,
+                error_message: None,
+            }
+        );
+        if !created {
+            println!("Submission {} already has task {}, not judging again", submission_id, task_id);
+            return task_id;
         }
         
-        // 创建响应通道
-        let (response_sender, response_receiver) = mpsc::channel::<JudgeStatus>();
-        
         // 创建评测任务
         let task = JudgeTask {
             id: task_id.clone(),
@@ -195,81 +287,60 @@ impl JudgePool {
             language,
             time_limit,
             memory_limit,
+            verdict_policy,
+            test_cases,
         };
         
         // 提交任务到线程池
-        if let Some(ref thread_pool) = self.thread_pool {
-            if let Err(e) = thread_pool.submit(task, task_id.clone(), response_sender) {
-                println!("Failed to submit task to thread pool: {}", e);
-                
-                // 更新任务状态为错误
-                let mut tasks = self.tasks.lock().unwrap();
-                tasks.insert(
-                    task_id.clone(),
-                    JudgeStatus {
-                        status: "SYSTEM_ERROR".to_string(),
-                        score: 0,
-                        execution_time: None,
-                        memory_used: None,
-                        error_message: Some(format!("Failed to submit task: {}", e)),
-                    }
-                );
-                
-                return task_id;
-            }
-        }
-        
-        // 启动一个线程来接收结果并更新任务状态
-        let tasks_ref = self.tasks.clone();
-        let task_id_clone = task_id.clone();
-        
-        thread::spawn(move || {
-            // 等待评测结果
-            match response_receiver.recv() {
-                Ok(result) => {
-                    // 更新任务状态
-                    let mut tasks = tasks_ref.lock().unwrap();
-                    tasks.insert(task_id_clone, result);
-                }
-                Err(e) => {
-                    println!("Failed to receive result for task {}: {}", task_id_clone, e);
-                    
-                    // 更新任务状态为错误
-                    let mut tasks = tasks_ref.lock().unwrap();
-                    tasks.insert(
-                        task_id_clone,
-                        JudgeStatus {
-                            status: "SYSTEM_ERROR".to_string(),
-                            score: 0,
-                            execution_time: None,
-                            memory_used: None,
-                            error_message: Some(format!("Failed to receive result: {}", e)),
-                        }
-                    );
+        if let Err(e) = self.thread_pool.submit(task, task_id.clone()) {
+            println!("Failed to submit task to thread pool: {}", e);
+            
+            // 更新任务状态为错误
+            self.tasks.complete(
+                task_id.clone(),
+                JudgeStatus {
+                    status: "SYSTEM_ERROR".to_string(),
+                    score: 0,
+                    execution_time: None,
+                    memory_used: None,
+                    error_message: Some(format!("Failed to submit task: {}", e)),
                 }
-            }
-        });
+            );
+            
+            return task_id;
+        }
         
         println!("Task {} submitted to thread pool", task_id);
         task_id
     }
     
     pub fn get_task_status(&self, task_id: &str) -> Option<JudgeStatus> {
-        let tasks = self.tasks.lock().unwrap();
-        tasks.get(task_id).cloned()
+        self.tasks.get(task_id)
+    }
+    
+    // 订阅任务结果：任务已完成时立即回调，否则在完成时回调；任务不存在返回 false
+    pub fn subscribe(&self, task_id: &str, callback: ResultCallback) -> bool {
+        self.tasks.subscribe(task_id, callback)
+    }
+    
+    // 客户端确认已保存结果后删除；任务不存在或尚未完成返回 false
+    pub fn ack(&self, task_id: &str) -> bool {
+        self.tasks.ack(task_id)
     }
     
     pub fn get_active_tasks_count(&self) -> usize {
-        if let Some(ref thread_pool) = self.thread_pool {
-            thread_pool.get_active_count()
-        } else {
-            0
-        }
+        self.thread_pool.get_active_count()
     }
     
-    pub fn shutdown(&mut self) {
-        if let Some(thread_pool) = self.thread_pool.take() {
-            thread_pool.shutdown();
-        }
+    pub fn get_queued_tasks_count(&self) -> usize {
+        self.thread_pool.get_queued_count()
+    }
+    
+    pub fn get_max_threads(&self) -> usize {
+        self.max_threads
+    }
+    
+    pub fn shutdown(&self) {
+        self.thread_pool.shutdown();
     }
 }
@@ -1,18 +1,136 @@
-use std::process::{Command, Stdio};
-use std::fs::{File, write};
+use std::process::Stdio;
+use std::fs::write;
 use std::path::Path;
-use std::io::{Write, Read};
-use std::time::Duration;
 use std::collections::HashMap;
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
 
-use crate::types::{JudgeTask, JudgeStatus};
-use crate::config::{LanguageConfig, load_language_configs};
+use crate::types::{JudgeTask, JudgeStatus, TestCaseSpec, VerdictPolicy};
+use crate::config::{LanguageConfig, SandboxConfig, load_language_configs};
+use crate::checker::StreamingComparator;
+use crate::compile_cache::CompileCache;
+use crate::cpu_slots::CpuSlots;
+use crate::pch::PrecompiledHeaders;
+use crate::sandbox::{self, Limits, Termination};
+use crate::testcase_cache::{TestCase, TestCaseCache};
+use crate::warm_pool::WarmPool;
+use crate::workspace::{Workspace, Workspaces};
 
 #[derive(Debug, Clone)]
 pub struct LanguageHandler {
     language_configs: HashMap<String, LanguageConfig>,
     test_cases_dir: String,
-    temp_dir: String,
+    sandbox: SandboxConfig,
+    // 所有工作线程共享的评测工作目录
+    workspaces: Arc<Workspaces>,
+    // 所有工作线程共享的 CPU 槽位
+    cpu_slots: Arc<CpuSlots>,
+    // 所有工作线程共享的测试数据缓存
+    test_case_cache: Arc<TestCaseCache>,
+    // 所有工作线程共享的编译产物缓存
+    compile_cache: Arc<CompileCache>,
+    // 所有工作线程共享的预热运行时
+    warm_pool: Arc<WarmPool>,
+    // 后台生成的预编译头文件
+    precompiled_headers: Arc<PrecompiledHeaders>,
+}
+
+// 测试点的计分方案：每个测试点所属的计分组及分值。
+// 同组测试点全部通过才得分，组内出现未通过的测试点后跳过该组其余测试点
+struct ScoringPlan {
+    groups: Vec<usize>,
+    weights: Vec<i64>,
+    group_count: usize,
+}
+
+impl ScoringPlan {
+    // 逐个计分时每个测试点自成一组；ICPC 策略下全部测试点为同一组；
+    // 子任务策略按子任务编号分组，未指定子任务的测试点自成一组。
+    // 未下发测试点信息时各测试点分值相同，下发了但未列出的测试点不计分
+    fn new(policy: VerdictPolicy, specs: &[TestCaseSpec], test_cases: &[TestCase]) -> Self {
+        let specs: HashMap<&str, &TestCaseSpec> = specs.iter().map(|spec| (spec.name.as_str(), spec)).collect();
+        let mut subtask_groups: HashMap<i32, usize> = HashMap::new();
+        let mut groups = Vec::with_capacity(test_cases.len());
+        let mut weights = Vec::with_capacity(test_cases.len());
+        let mut group_count = 0;
+        
+        for test_case in test_cases {
+            let spec = specs.get(test_case.name.as_str());
+            weights.push(match spec {
+                Some(spec) => spec.score.max(0) as i64,
+                None if specs.is_empty() => 1,
+                None => 0,
+            });
+            let subtask = spec.and_then(|spec| spec.subtask);
+            let group = match (policy, subtask) {
+                (VerdictPolicy::FirstFailure, _) => 0,
+                (VerdictPolicy::Subtask, Some(subtask)) => {
+                    *subtask_groups.entry(subtask).or_insert_with(|| {
+                        group_count += 1;
+                        group_count - 1
+                    })
+                }
+                _ => {
+                    group_count += 1;
+                    group_count - 1
+                }
+            };
+            groups.push(group);
+        }
+        
+        // 分值全部为 0 时退化为等分
+        if weights.iter().all(|&w| w == 0) {
+            weights.iter_mut().for_each(|w| *w = 1);
+        }
+        Self { groups, weights, group_count: group_count.max(1) }
+    }
+    
+    // 按通过的计分组计算百分制得分
+    fn score(&self, results: &[Option<CaseResult>]) -> i32 {
+        let mut group_passed = vec![true; self.group_count];
+        for (i, result) in results.iter().enumerate() {
+            if !matches!(result, Some(r) if r.status == "ACCEPTED") {
+                group_passed[self.groups[i]] = false;
+            }
+        }
+        let total: i64 = self.weights.iter().sum();
+        let earned: i64 = (0..results.len())
+            .filter(|&i| group_passed[self.groups[i]])
+            .map(|i| self.weights[i])
+            .sum();
+        (earned * 100 / total.max(1)) as i32
+    }
+}
+
+// 单个测试点的评测结果
+struct CaseResult {
+    status: &'static str,
+    execution_time: i32,
+    memory_used: i32,
+    error_message: Option<String>,
+}
+
+impl CaseResult {
+    fn system_error(error_message: String) -> Self {
+        Self { status: "SYSTEM_ERROR", execution_time: 0, memory_used: 0, error_message: Some(error_message) }
+    }
+
+    fn passed(&self) -> bool {
+        self.status == "ACCEPTED"
+    }
+}
+
+// 运行同一提交各测试点所需的上下文
+struct CaseRunner<'a> {
+    workspace: &'a Workspace<'a>,
+    language: &'a str,
+    lang_config: &'a LanguageConfig,
+    code_file: &'a str,
+    work_dir: &'a Path,
+    limits: Limits,
+    time_limit: i32,
+    memory_limit: u64,
 }
 
 impl LanguageHandler {
@@ -22,16 +140,46 @@ impl LanguageHandler {
         
         // 获取配置中的目录路径
         let config = crate::config::load_config()?;
+        let precompiled_headers = PrecompiledHeaders::prepare(&language_configs, &config.languages.pch_dir);
+        let workspaces = Arc::new(Self::create_workspaces(&config)?);
+        println!("Using judge workspaces under {}", workspaces.root().display());
         let test_cases_dir = config.languages.test_cases_dir;
-        let temp_dir = config.languages.temp_dir;
+        let cpu_slots = Arc::new(CpuSlots::new(config.sandbox.cpu_slots));
+        let test_case_cache = Arc::new(TestCaseCache::new(config.cache.test_cases_mb * 1024 * 1024));
+        let compile_cache = Arc::new(CompileCache::new(&config.cache.compile_dir, config.cache.compile_mb * 1024 * 1024));
+        let warm_pool = Arc::new(WarmPool::new(
+            &config.sandbox.warm_languages,
+            &language_configs,
+            config.sandbox.warm_runtimes,
+        ));
+        let sandbox = config.sandbox;
         
         Ok(Self {
             language_configs,
             test_cases_dir,
-            temp_dir,
+            workspaces,
+            sandbox,
+            cpu_slots,
+            test_case_cache,
+            compile_cache,
+            warm_pool,
+            precompiled_headers,
         })
     }
     
+    // 工作目录优先放在内存文件系统上，不可用时退回 temp_dir
+    fn create_workspaces(config: &crate::config::Config) -> Result<Workspaces, Box<dyn std::error::Error>> {
+        let slots = config.server.max_threads;
+        if !config.languages.workspace_dir.is_empty() {
+            let root = Path::new(&config.languages.workspace_dir).join(config.server.port.to_string());
+            match Workspaces::new(&root, slots) {
+                Ok(workspaces) => return Ok(workspaces),
+                Err(e) => println!("Workspace dir {} is not usable ({}), falling back to temp_dir", root.display(), e),
+            }
+        }
+        Ok(Workspaces::new(Path::new(&config.languages.temp_dir), slots)?)
+    }
+    
     pub fn judge_task(&self, task: JudgeTask) -> JudgeStatus {
         // 检查语言是否启用
         let normalized_lang = self.normalize_language_name(&task.language);
@@ -45,14 +193,28 @@ impl LanguageHandler {
             };
         }
         
-        let lang_config = &self.language_configs[&normalized_lang];
+        // 预编译头文件生成完成后编译命令带上其目录
+        let lang_config = self.precompiled_headers.apply(&normalized_lang, &self.language_configs[&normalized_lang]);
+        let lang_config = lang_config.as_ref();
         
-        // 创建临时目录
-        let temp_dir = format!("{}/{}", self.temp_dir, task.id);
-        let _ = std::fs::create_dir_all(&temp_dir);
+        // 取一个空的工作目录，评测结束时自动清空归还。
+        // 命令直接 exec 并以该目录为工作目录，目录为绝对路径，避免相对路径被解析两次
+        let workspace = match self.workspaces.acquire() {
+            Ok(workspace) => workspace,
+            Err(e) => {
+                return JudgeStatus {
+                    status: "SYSTEM_ERROR".to_string(),
+                    score: 0,
+                    execution_time: None,
+                    memory_used: None,
+                    error_message: Some(format!("Failed to create workspace: {}", e)),
+                };
+            }
+        };
+        let work_dir = workspace.path().to_path_buf();
         
         // 写入代码文件
-        let code_file = format!("{}/code{}", temp_dir, lang_config.file_extension);
+        let code_file = format!("{}/code{}", work_dir.display(), lang_config.file_extension);
         if let Err(e) = write(&code_file, &task.code) {
             return JudgeStatus {
                 status: "SYSTEM_ERROR".to_string(),
@@ -63,16 +225,46 @@ impl LanguageHandler {
             };
         }
         
-        // 编译阶段
-        if lang_config.needs_compilation {
-            if let Some(cmd) = &lang_config.compile_command {
-                let compile_result = Command::new("cmd")
-                    .args(["/c", &cmd.replace("{file}", &code_file)])
-                    .current_dir(&temp_dir)
-                    .output()
-                    .expect("Failed to execute compile command");
+        // 编译阶段：相同源代码已编译过时直接复用缓存的产物
+        let compile_key = self.compile_cache.key(&normalized_lang, lang_config, &task.code);
+        if lang_config.needs_compilation && self.compile_cache.restore(&compile_key, &work_dir) {
+            println!("Compile cache hit for task {}", task.id);
+        } else if lang_config.needs_compilation {
+            if let Some(compile) = &lang_config.compile {
+                let limits = Limits {
+                    cpu_time_ms: self.sandbox.compile_timeout,
+                    wall_time_ms: self.sandbox.compile_timeout,
+                    memory_bytes: None,
+                    address_space_bytes: None,
+                    cpu: None,
+                    output_bytes: None,
+                    file_bytes: None,
+                };
+                let mut command = compile.command(&code_file, &work_dir);
+                let compile_result = match sandbox::run(&mut command, Stdio::null(), &limits, None) {
+                    Ok(outcome) => outcome,
+                    Err(e) => {
+                        return JudgeStatus {
+                            status: "SYSTEM_ERROR".to_string(),
+                            score: 0,
+                            execution_time: None,
+                            memory_used: None,
+                            error_message: Some(format!("Failed to execute compile command: {}", e)),
+                        };
+                    }
+                };
                 
-                if !compile_result.status.success() {
+                if compile_result.time_limit_exceeded(&limits) {
+                    return JudgeStatus {
+                        status: "COMPILATION_ERROR".to_string(),
+                        score: 0,
+                        execution_time: None,
+                        memory_used: None,
+                        error_message: Some(format!("Compilation timed out after {}ms", limits.wall_time_ms)),
+                    };
+                }
+                
+                if !compile_result.success() {
                     let error_message = String::from_utf8_lossy(&compile_result.stderr).to_string();
                     return JudgeStatus {
                         status: "COMPILATION_ERROR".to_string(),
@@ -82,6 +274,8 @@ impl LanguageHandler {
                         error_message: Some(error_message),
                     };
                 }
+                
+                self.compile_cache.store(&compile_key, &work_dir, Path::new(&code_file));
             }
         }
         
@@ -99,146 +293,247 @@ impl LanguageHandler {
             };
         }
         
-        // 评估测试用例
-        let mut passed_tests = 0;
-        let mut total_time = 0;
+        // 按 CPU 时间判定超时，墙钟时间按倍数放宽，用于终止 sleep 或阻塞读的程序
+        let runner = CaseRunner {
+            workspace: &workspace,
+            language: &normalized_lang,
+            lang_config,
+            code_file: &code_file,
+            work_dir: &work_dir,
+            limits: Limits {
+                cpu_time_ms: task.time_limit.max(0) as u64,
+                wall_time_ms: (task.time_limit.max(0) as f64 * self.sandbox.wall_time_factor) as u64,
+                memory_bytes: Some(task.memory_limit).filter(|&m| m > 0),
+                address_space_bytes: self.address_space_limit(&normalized_lang, task.memory_limit),
+                cpu: None,
+                output_bytes: Some(self.sandbox.output_limit_mb * 1024 * 1024).filter(|&b| b > 0),
+                file_bytes: Some(self.sandbox.output_limit_mb * 1024 * 1024).filter(|&b| b > 0),
+            },
+            time_limit: task.time_limit,
+            memory_limit: task.memory_limit,
+        };
+        let plan = ScoringPlan::new(task.verdict_policy, &task.test_cases, &test_cases);
+        let results = self.run_cases(&runner, &test_cases, &plan);
         
-        for (i, (input, expected_output)) in test_cases.iter().enumerate() {
-            // 创建输入文件
-            let input_file = format!("{}/input{}.txt", temp_dir, i);
-            if let Err(e) = write(&input_file, input) {
+        // 评测机自身的错误不计分
+        if let Some(error) = results.iter().flatten().find(|r| r.status == "SYSTEM_ERROR") {
+            return JudgeStatus {
+                status: "SYSTEM_ERROR".to_string(),
+                score: 0,
+                execution_time: None,
+                memory_used: None,
+                error_message: error.error_message.clone(),
+            };
+        }
+        
+        // 计算得分
+        let score = plan.score(&results);
+        let executed: Vec<&CaseResult> = results.iter().flatten().collect();
+        let total_time: i32 = executed.iter().map(|r| r.execution_time).sum();
+        let peak_memory_kb = executed.iter().map(|r| r.memory_used).max().unwrap_or(0);
+        let average_time = total_time / executed.len().max(1) as i32;
+        
+        // 按测试点顺序取第一个未通过的测试点作为结论
+        let failure = results
+            .iter()
+            .enumerate()
+            .find_map(|(i, r)| r.as_ref().filter(|r| !r.passed()).map(|r| (&test_cases[i].name, r)));
+        let (name, failure) = match failure {
+            Some(failure) => failure,
+            None => {
                 return JudgeStatus {
-                    status: "SYSTEM_ERROR".to_string(),
-                    score: 0,
-                    execution_time: None,
-                    memory_used: None,
-                    error_message: Some(format!("Failed to write input file: {}", e)),
+                    status: "ACCEPTED".to_string(),
+                    score,
+                    execution_time: Some(average_time),
+                    memory_used: Some(peak_memory_kb),
+                    error_message: None,
                 };
             }
-            
-            // 执行阶段
-            let run_command = lang_config.run_command.replace("{file}", &code_file);
-            let start_time = std::time::Instant::now();
-            
-            let output = Command::new("cmd")
-                .args(["/c", &format!("{}", run_command)])
-                .current_dir(&temp_dir)
-                .stdin(Stdio::from(File::open(&input_file).unwrap()))
-                .stdout(Stdio::piped())
-                .stderr(Stdio::piped())
-                .output()
-                .expect("Failed to execute run command");
-            
-            let execution_time = start_time.elapsed().as_millis() as i32;
-            total_time += execution_time;
-            
-            // 检查时间限制
-            if execution_time > task.time_limit {
-                return JudgeStatus {
-                    status: "TIME_LIMIT_EXCEEDED".to_string(),
-                    score: 0,
-                    execution_time: Some(execution_time),
-                    memory_used: None,
-                    error_message: Some(format!("Time limit exceeded: {}ms > {}ms", execution_time, task.time_limit)),
-                };
+        };
+        
+        if failure.status == "WRONG_ANSWER" {
+            return JudgeStatus {
+                status: if score > 0 { "PARTIALLY_CORRECT" } else { "WRONG_ANSWER" }.to_string(),
+                score,
+                execution_time: Some(average_time),
+                memory_used: Some(peak_memory_kb),
+                error_message: Some(format!("Wrong answer on test case {}", name)),
+            };
+        }
+        
+        JudgeStatus {
+            status: failure.status.to_string(),
+            score,
+            execution_time: Some(failure.execution_time),
+            memory_used: Some(failure.memory_used),
+            error_message: Some(format!("Test case {}: {}", name, failure.error_message.as_deref().unwrap_or(""))),
+        }
+    }
+    
+    // 运行全部测试点，返回按测试点顺序排列的结果。测试点未通过时跳过同一计分组中序号更大的测试点，
+    // 正在运行的这些测试点被终止；序号更小的测试点照常完成，因此并行时结论始终是序号最小的未通过测试点，
+    // 与调度顺序无关。评测机自身出错时取消全部测试点。被跳过的测试点结果为 None。
+    // 开启 parallel_cases 时，本线程先占用一个 CPU 槽位，再借用空闲槽位并行运行，
+    // 每个测试点进程绑定在所占槽位对应的核心上（只有一个测试点时同样绑定，与其他评测互不干扰）
+    fn run_cases(&self, runner: &CaseRunner, test_cases: &[TestCase], plan: &ScoringPlan) -> Vec<Option<CaseResult>> {
+        let next = AtomicUsize::new(0);
+        // 每个计分组中未通过的最小测试点序号，usize::MAX 表示尚无
+        let first_failure: Vec<AtomicUsize> = (0..plan.group_count).map(|_| AtomicUsize::new(usize::MAX)).collect();
+        // 每个测试点一个取消标记
+        let cancels: Vec<AtomicBool> = (0..test_cases.len()).map(|_| AtomicBool::new(false)).collect();
+        let results: Mutex<Vec<Option<CaseResult>>> = Mutex::new((0..test_cases.len()).map(|_| None).collect());
+        
+        let worker = |cpu: Option<usize>| loop {
+            let i = next.fetch_add(1, Ordering::Relaxed);
+            if i >= test_cases.len() {
+                break;
             }
-            
-            // 检查程序是否成功退出
-            if !output.status.success() {
-                let error_message = String::from_utf8_lossy(&output.stderr).to_string();
-                return JudgeStatus {
-                    status: "RUNTIME_ERROR".to_string(),
-                    score: 0,
-                    execution_time: Some(execution_time),
-                    memory_used: None,
-                    error_message: Some(error_message),
-                };
+            let group = plan.groups[i];
+            if cancels[i].load(Ordering::Relaxed) || first_failure[group].load(Ordering::Relaxed) < i {
+                continue;
             }
-            
-            // 比较输出
-            let actual_output = String::from_utf8_lossy(&output.stdout).to_string();
-            if self.compare_outputs(&actual_output, expected_output) {
-                passed_tests += 1;
+            if let Some(result) = self.run_case(runner, i, &test_cases[i], cpu, &cancels[i]) {
+                if result.status == "SYSTEM_ERROR" {
+                    cancels.iter().for_each(|flag| flag.store(true, Ordering::Relaxed));
+                } else if !result.passed() {
+                    first_failure[group].fetch_min(i, Ordering::Relaxed);
+                    (i + 1..test_cases.len())
+                        .filter(|&j| plan.groups[j] == group)
+                        .for_each(|j| cancels[j].store(true, Ordering::Relaxed));
+                }
+                results.lock().unwrap()[i] = Some(result);
             }
-        }
-        
-        // 计算得分
-        let score = (passed_tests * 100) / test_cases.len();
-        let status = if score == 100 {
-            "ACCEPTED"
-        } else if score > 0 {
-            "PARTIALLY_CORRECT"
-        } else {
-            "WRONG_ANSWER"
         };
         
-        JudgeStatus {
-            status: status.to_string(),
-            score: score as i32,
-            execution_time: Some(total_time / test_cases.len() as i32),
-            memory_used: None,
-            error_message: None,
+        if !self.sandbox.parallel_cases {
+            worker(None);
+        } else {
+            let primary = self.cpu_slots.acquire();
+            let parallelism = self.sandbox.max_case_parallelism.max(1).min(test_cases.len());
+            let borrowed: Vec<_> = (1..parallelism).map_while(|_| self.cpu_slots.try_acquire()).collect();
+            thread::scope(|scope| {
+                for slot in &borrowed {
+                    let worker = &worker;
+                    scope.spawn(move || worker(Some(slot.cpu())));
+                }
+                worker(Some(primary.cpu()));
+            });
         }
+        
+        results.into_inner().unwrap()
     }
     
-    fn load_test_cases(&self, problem_id: i32) -> Vec<(String, String)> {
-        // 从配置的测试用例目录加载测试用例
-        let problem_dir = format!("{}/{}", self.test_cases_dir, problem_id);
-        let test_cases_dir = Path::new(&problem_dir);
+    // 运行单个测试点；被取消时返回 None
+    fn run_case(
+        &self,
+        runner: &CaseRunner,
+        index: usize,
+        test_case: &TestCase,
+        cpu: Option<usize>,
+        cancel: &AtomicBool,
+    ) -> Option<CaseResult> {
+        // 标准输入直接由缓存的测试数据构造，不在工作目录中写入输入文件
+        let stdin = match runner.workspace.input_file(index, test_case.input.as_bytes()) {
+            Ok(f) => f,
+            Err(e) => return Some(CaseResult::system_error(format!("Failed to prepare input: {}", e))),
+        };
         
-        if !test_cases_dir.exists() {
-            // 如果测试用例目录不存在，返回默认的测试用例
-            return vec![
-                ("5\n10\n".to_string(), "15\n".to_string()),
-                ("3\n7\n".to_string(), "10\n".to_string()),
-            ];
+        // 执行阶段：超出时间限制的进程由看门狗整组终止
+        
+        let limits = Limits { cpu, ..runner.limits };
+        // 输出边运行边与标准答案比较，不保留完整输出
+        let mut comparator = StreamingComparator::new(&test_case.expected_output);
+        // 开启预热的语言由常驻进程运行，无法获得常驻进程时冷启动
+        let warm = self.warm_pool.run(
+            runner.language,
+            Path::new(runner.code_file),
+            runner.work_dir,
+            &stdin,
+            &limits,
+            Some(cancel),
+            &mut comparator,
+        );
+        let output = match warm.unwrap_or_else(|| {
+            let mut command = runner.lang_config.run.command(runner.code_file, runner.work_dir);
+            sandbox::run_with_sink(&mut command, Stdio::from(stdin), &limits, Some(cancel), &mut comparator)
+        }) {
+            Ok(outcome) => outcome,
+            Err(e) => return Some(CaseResult::system_error(format!("Failed to execute run command: {}", e))),
+        };
+        if output.termination == Termination::Cancelled {
+            return None;
         }
         
-        // 读取测试用例目录中的所有输入输出文件
-        let mut test_cases = Vec::new();
-        let entries = std::fs::read_dir(&problem_dir);
+        let execution_time = output.cpu_time_ms as i32;
+        let memory_used = output.peak_memory_kb as i32;
+        let result = |status: &'static str, error_message: Option<String>| {
+            Some(CaseResult { status, execution_time, memory_used, error_message })
+        };
         
-        if let Ok(entries) = entries {
-            let mut input_files: Vec<_> = entries
-                .filter_map(|e| e.ok())
-                .filter(|e| e.path().extension().map_or(false, |ext| ext == "in"))
-                .collect();
-            
-            input_files.sort_by_key(|a| a.path());
-            
-            for input_file in input_files {
-                let input_path = input_file.path();
-                let output_path = input_path.with_extension("out");
-                
-                let input_content = File::open(&input_path)
-                    .and_then(|mut f| {
-                        let mut content = String::new();
-                        f.read_to_string(&mut content)?;
-                        Ok(content)
-                    })
-                    .unwrap_or_default();
-                
-                let expected_output = File::open(&output_path)
-                    .and_then(|mut f| {
-                        let mut content = String::new();
-                        f.read_to_string(&mut content)?;
-                        Ok(content)
-                    })
-                    .unwrap_or_default();
-                
-                test_cases.push((input_content, expected_output));
-            }
+        // 检查输出限制
+        if output.output_limit_exceeded() {
+            return result(
+                "RUNTIME_ERROR",
+                Some(format!("Output limit exceeded: more than {}MB", self.sandbox.output_limit_mb)),
+            );
+        }
+        
+        // 检查内存限制
+        if output.memory_limit_exceeded(&limits) {
+            return result(
+                "MEMORY_LIMIT_EXCEEDED",
+                Some(format!("Memory limit exceeded: {}KB > {}KB", memory_used, runner.memory_limit / 1024)),
+            );
         }
         
-        test_cases
+        // 检查时间限制
+        if output.time_limit_exceeded(&limits) {
+            let error_message = if output.termination == Termination::WallTimeLimit {
+                format!("Wall time limit exceeded: {}ms > {}ms", output.wall_time_ms, limits.wall_time_ms)
+            } else {
+                format!("Time limit exceeded: {}ms > {}ms", execution_time, runner.time_limit)
+            };
+            return result("TIME_LIMIT_EXCEEDED", Some(error_message));
+        }
+        
+        // 检查程序是否成功退出
+        if !output.success() {
+            return result("RUNTIME_ERROR", Some(String::from_utf8_lossy(&output.stderr).to_string()));
+        }
+        
+        // 比较输出
+        if comparator.finish() {
+            result("ACCEPTED", None)
+        } else {
+            result("WRONG_ANSWER", None)
+        }
     }
     
-    fn compare_outputs(&self, actual: &str, expected: &str) -> bool {
-        // 标准化输出，去除空白和换行
-        let actual_normalized = actual.trim().replace("\r\n", "\n").replace("\r", "\n");
-        let expected_normalized = expected.trim().replace("\r\n", "\n").replace("\r", "\n");
+    // 地址空间上限：未配置倍数、语言被豁免或题目未限制内存时不设置
+    fn address_space_limit(&self, language: &str, memory_limit: u64) -> Option<u64> {
+        if self.sandbox.address_space_factor <= 0.0
+            || memory_limit == 0
+            || self.sandbox.address_space_exempt.iter().any(|l| l == language)
+        {
+            return None;
+        }
+        Some((memory_limit as f64 * self.sandbox.address_space_factor) as u64)
+    }
+    
+    fn load_test_cases(&self, problem_id: i32) -> Arc<Vec<TestCase>> {
+        // 从配置的测试用例目录加载测试用例，经由缓存避免每次提交重复读取
+        let problem_dir = format!("{}/{}", self.test_cases_dir, problem_id);
+        let test_cases_dir = Path::new(&problem_dir);
+        
+        if !test_cases_dir.exists() {
+            // 如果测试用例目录不存在，返回默认的测试用例
+            return Arc::new(vec![
+                TestCase { name: "1".to_string(), input: "5\n10\n".to_string(), expected_output: "15\n".to_string() },
+                TestCase { name: "2".to_string(), input: "3\n7\n".to_string(), expected_output: "10\n".to_string() },
+            ]);
+        }
         
-        actual_normalized == expected_normalized
+        self.test_case_cache.get(problem_id, test_cases_dir).unwrap_or_default()
     }
     
     fn normalize_language_name(&self, language: &str) -> String {
@@ -1,11 +1,21 @@
+mod checker;
+mod compile_cache;
 mod config;
+mod cpu_slots;
 mod server;
 mod judge;
 mod languages;
+mod msgpack;
+mod pch;
+mod protocol;
+mod sandbox;
+mod task_store;
+mod testcase_cache;
 mod types;
+mod warm_pool;
+mod workspace;
 
 use std::sync::Arc;
-use std::sync::Mutex;
 use std::panic;
 
 fn main() {
@@ -25,8 +35,8 @@ fn main() {
         }
     };
     
-    let judge_pool = match judge::JudgePool::new(config.server.max_threads) {
-        Ok(pool) => Arc::new(Mutex::new(pool)),
+    let judge_pool = match judge::JudgePool::new(config.server.max_threads, &config.results) {
+        Ok(pool) => Arc::new(pool),
         Err(e) => {
             println!("Failed to create judge pool: {}", e);
             return;
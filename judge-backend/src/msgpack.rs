@@ -0,0 +1,229 @@
+use serde_json::{Map, Number, Value};
+
+// MessagePack 与 serde_json::Value 之间的编解码，覆盖 RPC 消息用到的全部类型
+// （nil、bool、整数、浮点、字符串、二进制、数组、映射），不支持扩展类型。
+
+const MAX_DEPTH: usize = 64;
+
+pub fn encode(value: &Value) -> Vec<u8> {
+    let mut out = Vec::with_capacity(256);
+    encode_value(value, &mut out);
+    out
+}
+
+fn encode_value(value: &Value, out: &mut Vec<u8>) {
+    match value {
+        Value::Null => out.push(0xc0),
+        Value::Bool(false) => out.push(0xc2),
+        Value::Bool(true) => out.push(0xc3),
+        Value::Number(n) => {
+            if let Some(i) = n.as_i64() {
+                encode_int(i, out);
+            } else if let Some(u) = n.as_u64() {
+                out.push(0xcf);
+                out.extend_from_slice(&u.to_be_bytes());
+            } else {
+                out.push(0xcb);
+                out.extend_from_slice(&n.as_f64().unwrap_or(0.0).to_be_bytes());
+            }
+        }
+        Value::String(s) => {
+            let len = s.len();
+            if len < 32 {
+                out.push(0xa0 | len as u8);
+            } else if len <= u8::MAX as usize {
+                out.push(0xd9);
+                out.push(len as u8);
+            } else if len <= u16::MAX as usize {
+                out.push(0xda);
+                out.extend_from_slice(&(len as u16).to_be_bytes());
+            } else {
+                out.push(0xdb);
+                out.extend_from_slice(&(len as u32).to_be_bytes());
+            }
+            out.extend_from_slice(s.as_bytes());
+        }
+        Value::Array(items) => {
+            let len = items.len();
+            if len < 16 {
+                out.push(0x90 | len as u8);
+            } else if len <= u16::MAX as usize {
+                out.push(0xdc);
+                out.extend_from_slice(&(len as u16).to_be_bytes());
+            } else {
+                out.push(0xdd);
+                out.extend_from_slice(&(len as u32).to_be_bytes());
+            }
+            for item in items {
+                encode_value(item, out);
+            }
+        }
+        Value::Object(map) => {
+            let len = map.len();
+            if len < 16 {
+                out.push(0x80 | len as u8);
+            } else if len <= u16::MAX as usize {
+                out.push(0xde);
+                out.extend_from_slice(&(len as u16).to_be_bytes());
+            } else {
+                out.push(0xdf);
+                out.extend_from_slice(&(len as u32).to_be_bytes());
+            }
+            for (key, item) in map {
+                encode_value(&Value::String(key.clone()), out);
+                encode_value(item, out);
+            }
+        }
+    }
+}
+
+fn encode_int(i: i64, out: &mut Vec<u8>) {
+    if (0..128).contains(&i) {
+        out.push(i as u8);
+    } else if (-32..0).contains(&i) {
+        out.push(i as i8 as u8);
+    } else if i >= 0 {
+        if i <= u8::MAX as i64 {
+            out.push(0xcc);
+            out.push(i as u8);
+        } else if i <= u16::MAX as i64 {
+            out.push(0xcd);
+            out.extend_from_slice(&(i as u16).to_be_bytes());
+        } else if i <= u32::MAX as i64 {
+            out.push(0xce);
+            out.extend_from_slice(&(i as u32).to_be_bytes());
+        } else {
+            out.push(0xcf);
+            out.extend_from_slice(&(i as u64).to_be_bytes());
+        }
+    } else if i >= i8::MIN as i64 {
+        out.push(0xd0);
+        out.push(i as i8 as u8);
+    } else if i >= i16::MIN as i64 {
+        out.push(0xd1);
+        out.extend_from_slice(&(i as i16).to_be_bytes());
+    } else if i >= i32::MIN as i64 {
+        out.push(0xd2);
+        out.extend_from_slice(&(i as i32).to_be_bytes());
+    } else {
+        out.push(0xd3);
+        out.extend_from_slice(&i.to_be_bytes());
+    }
+}
+
+pub fn decode(data: &[u8]) -> Result<Value, String> {
+    let mut decoder = Decoder { data, pos: 0 };
+    let value = decoder.value(0)?;
+    if decoder.pos != data.len() {
+        return Err("Trailing bytes after MessagePack value".to_string());
+    }
+    Ok(value)
+}
+
+struct Decoder<'a> {
+    data: &'a [u8],
+    pos: usize,
+}
+
+impl<'a> Decoder<'a> {
+    fn take(&mut self, n: usize) -> Result<&'a [u8], String> {
+        if self.data.len() - self.pos < n {
+            return Err("Unexpected end of MessagePack data".to_string());
+        }
+        let slice = &self.data[self.pos..self.pos + n];
+        self.pos += n;
+        Ok(slice)
+    }
+
+    fn byte(&mut self) -> Result<u8, String> {
+        Ok(self.take(1)?[0])
+    }
+
+    fn be_uint(&mut self, n: usize) -> Result<u64, String> {
+        Ok(self.take(n)?.iter().fold(0u64, |acc, b| (acc << 8) | *b as u64))
+    }
+
+    fn string(&mut self, len: usize) -> Result<Value, String> {
+        let bytes = self.take(len)?;
+        std::str::from_utf8(bytes)
+            .map(|s| Value::String(s.to_string()))
+            .map_err(|e| format!("Invalid UTF-8 in MessagePack string: {}", e))
+    }
+
+    fn array(&mut self, len: usize, depth: usize) -> Result<Value, String> {
+        let mut items = Vec::with_capacity(len.min(1024));
+        for _ in 0..len {
+            items.push(self.value(depth + 1)?);
+        }
+        Ok(Value::Array(items))
+    }
+
+    fn map(&mut self, len: usize, depth: usize) -> Result<Value, String> {
+        let mut map = Map::new();
+        for _ in 0..len {
+            let key = match self.value(depth + 1)? {
+                Value::String(s) => s,
+                other => other.to_string(),
+            };
+            let item = self.value(depth + 1)?;
+            map.insert(key, item);
+        }
+        Ok(Value::Object(map))
+    }
+
+    fn value(&mut self, depth: usize) -> Result<Value, String> {
+        if depth > MAX_DEPTH {
+            return Err("MessagePack nesting too deep".to_string());
+        }
+        let marker = self.byte()?;
+        match marker {
+            0x00..=0x7f => Ok(Value::from(marker as u64)),
+            0x80..=0x8f => self.map((marker & 0x0f) as usize, depth),
+            0x90..=0x9f => self.array((marker & 0x0f) as usize, depth),
+            0xa0..=0xbf => self.string((marker & 0x1f) as usize),
+            0xc0 => Ok(Value::Null),
+            0xc2 => Ok(Value::Bool(false)),
+            0xc3 => Ok(Value::Bool(true)),
+            0xc4 | 0xc5 | 0xc6 => {
+                // 二进制按 UTF-8 字符串处理（如以 bin 类型发送的代码）
+                let len = self.be_uint(1 << (marker - 0xc4))? as usize;
+                self.string(len)
+            }
+            0xca => {
+                let bits = self.be_uint(4)? as u32;
+                Ok(Number::from_f64(f32::from_bits(bits) as f64).map_or(Value::Null, Value::Number))
+            }
+            0xcb => {
+                let bits = self.be_uint(8)?;
+                Ok(Number::from_f64(f64::from_bits(bits)).map_or(Value::Null, Value::Number))
+            }
+            0xcc | 0xcd | 0xce | 0xcf => Ok(Value::from(self.be_uint(1 << (marker - 0xcc))?)),
+            0xd0 => Ok(Value::from(self.be_uint(1)? as u8 as i8 as i64)),
+            0xd1 => Ok(Value::from(self.be_uint(2)? as u16 as i16 as i64)),
+            0xd2 => Ok(Value::from(self.be_uint(4)? as u32 as i32 as i64)),
+            0xd3 => Ok(Value::from(self.be_uint(8)? as i64)),
+            0xd9 | 0xda | 0xdb => {
+                let len = self.be_uint(1 << (marker - 0xd9))? as usize;
+                self.string(len)
+            }
+            0xdc => {
+                let len = self.be_uint(2)? as usize;
+                self.array(len, depth)
+            }
+            0xdd => {
+                let len = self.be_uint(4)? as usize;
+                self.array(len, depth)
+            }
+            0xde => {
+                let len = self.be_uint(2)? as usize;
+                self.map(len, depth)
+            }
+            0xdf => {
+                let len = self.be_uint(4)? as usize;
+                self.map(len, depth)
+            }
+            0xe0..=0xff => Ok(Value::from(marker as i8 as i64)),
+            _ => Err(format!("Unsupported MessagePack type 0x{:02x}", marker)),
+        }
+    }
+}
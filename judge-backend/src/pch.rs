@@ -0,0 +1,196 @@
+use std::borrow::Cow;
+use std::collections::HashMap;
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::process::Command;
+use std::sync::{Arc, RwLock};
+use std::thread;
+use std::time::{Duration, SystemTime};
+
+use sha2::{Digest, Sha256};
+
+use crate::config::{CommandLine, LanguageConfig};
+
+// 预编译头文件（GCC/Clang 的 .gch）。
+// 启动时在后台按各语言的编译命令（编译器、参数与编译器版本）为 precompiled_headers 中的头文件生成 .gch，
+// 生成完成前按原编译命令编译；完成后在编译命令前部加入 -I<目录>：编译器处理 #include <bits/stdc++.h> 时
+// 会先在该目录找到 bits/stdc++.h.gch 并直接加载，代码未包含这些头文件或 .gch 与编译选项不匹配时按原方式编译，
+// 结果不受影响。编译命令变化后 -I 参数随之变化，编译产物缓存的键也随之变化
+
+// 其他编译命令或编译器版本的 .gch 目录超过该时间未被使用时删除。
+// 同一主机上的多个评测机实例共用 pch_dir，不能直接删除其他实例正在使用的目录
+const STALE_AFTER: Duration = Duration::from_secs(7 * 24 * 3600);
+
+// 各语言可用的预编译头文件目录，后台生成完成后写入
+#[derive(Debug, Default)]
+pub struct PrecompiledHeaders {
+    ready: RwLock<HashMap<String, PathBuf>>,
+}
+
+impl PrecompiledHeaders {
+    // 在后台线程中为所有支持的语言生成预编译头文件，立即返回
+    pub fn prepare(language_configs: &HashMap<String, LanguageConfig>, pch_dir: &str) -> Arc<Self> {
+        let headers = Arc::new(Self::default());
+        let pending: Vec<(String, LanguageConfig)> = language_configs
+            .iter()
+            .filter(|(language, lang_config)| {
+                header_language(language).is_some()
+                    && lang_config.compile.is_some()
+                    && !lang_config.precompiled_headers.is_empty()
+            })
+            .map(|(language, lang_config)| (language.clone(), lang_config.clone()))
+            .collect();
+        if pending.is_empty() {
+            return headers;
+        }
+
+        let shared = Arc::clone(&headers);
+        let pch_dir = PathBuf::from(pch_dir);
+        let spawned = thread::Builder::new().name("pch-builder".to_string()).spawn(move || {
+            for (language, lang_config) in pending {
+                let (header_language, compile) = match (header_language(&language), &lang_config.compile) {
+                    (Some(header_language), Some(compile)) => (header_language, compile),
+                    _ => continue,
+                };
+                match build(&language, header_language, compile, &lang_config.precompiled_headers, &pch_dir) {
+                    Ok(dir) => {
+                        println!("Using precompiled headers for {} from {}", language, dir.display());
+                        shared.ready.write().unwrap().insert(language, dir);
+                    }
+                    Err(e) => println!("Failed to build precompiled headers for {}: {}", language, e),
+                }
+            }
+        });
+        if let Err(e) = spawned {
+            println!("Failed to start precompiled header builder: {}", e);
+        }
+        headers
+    }
+
+    // 预编译头文件已生成时返回加入 -I<目录> 的语言配置，否则返回原配置
+    pub fn apply<'a>(&self, language: &str, lang_config: &'a LanguageConfig) -> Cow<'a, LanguageConfig> {
+        let ready = self.ready.read().unwrap();
+        let dir = match ready.get(language) {
+            Some(dir) => dir,
+            None => return Cow::Borrowed(lang_config),
+        };
+        let mut lang_config = lang_config.clone();
+        if let Some(compile) = &mut lang_config.compile {
+            compile.args.insert(0, format!("-I{}", dir.display()));
+        }
+        Cow::Owned(lang_config)
+    }
+}
+
+// 支持预编译头文件的语言及其 -x 参数
+fn header_language(language: &str) -> Option<&'static str> {
+    match language {
+        "c" => Some("c-header"),
+        "cpp" => Some("c++-header"),
+        _ => None,
+    }
+}
+
+// 生成一种语言的预编译头文件，返回 .gch 所在目录。同一编译命令与编译器版本的 .gch 已存在时直接复用
+fn build(
+    language: &str,
+    header_language: &str,
+    compile: &CommandLine,
+    headers: &[String],
+    pch_dir: &Path,
+) -> Result<PathBuf, Box<dyn std::error::Error>> {
+    let version = Command::new(&compile.program).arg("--version").output()?;
+    let mut hasher = Sha256::new();
+    hasher.update(compile.program.as_bytes());
+    for arg in &compile.args {
+        hasher.update([0]);
+        hasher.update(arg.as_bytes());
+    }
+    hasher.update([0]);
+    hasher.update(&version.stdout);
+    let key: String = hasher.finalize().iter().take(8).map(|b| format!("{:02x}", b)).collect();
+
+    fs::create_dir_all(pch_dir)?;
+    let dir = fs::canonicalize(pch_dir)?.join(format!("{}-{}", language, key));
+    fs::create_dir_all(&dir)?;
+    // 更新修改时间，标记该目录仍在使用
+    if let Ok(file) = fs::File::open(&dir) {
+        let _ = file.set_modified(SystemTime::now());
+    }
+    // 清理长期未被使用的旧编译命令或旧编译器版本生成的目录
+    let prefix = format!("{}-", language);
+    for entry in fs::read_dir(dir.parent().unwrap_or(pch_dir))?.filter_map(|e| e.ok()) {
+        let name = entry.file_name().to_string_lossy().into_owned();
+        if !name.starts_with(&prefix) || entry.path() == dir {
+            continue;
+        }
+        let stale = entry
+            .metadata()
+            .and_then(|metadata| metadata.modified())
+            .ok()
+            .and_then(|modified| modified.elapsed().ok())
+            .map_or(false, |age| age > STALE_AFTER);
+        if stale {
+            let _ = fs::remove_dir_all(entry.path());
+        }
+    }
+
+    let mut built = 0;
+    for (i, header) in headers.iter().enumerate() {
+        let gch = dir.join(format!("{}.gch", header));
+        if gch.exists() {
+            built += 1;
+            continue;
+        }
+        if let Some(parent) = gch.parent() {
+            fs::create_dir_all(parent)?;
+        }
+        // 以只包含目标头文件的包装文件生成 .gch，先写入临时文件，成功后再重命名。
+        // 临时文件按进程区分，多个实例同时生成同一目录时互不覆盖
+        let wrapper = dir.join(format!(".wrapper{}-{}.h", std::process::id(), i));
+        fs::write(&wrapper, format!("#include <{}>\n", header))?;
+        let partial = gch.with_extension(format!("gch.{}.partial", std::process::id()));
+        let output = Command::new(&compile.program)
+            .arg("-x")
+            .arg(header_language)
+            .args(header_args(compile, &wrapper, &partial))
+            .current_dir(&dir)
+            .output()?;
+        let _ = fs::remove_file(&wrapper);
+        if !output.status.success() {
+            let _ = fs::remove_file(&partial);
+            println!(
+                "Failed to precompile <{}> for {}: {}",
+                header,
+                language,
+                String::from_utf8_lossy(&output.stderr).trim()
+            );
+            continue;
+        }
+        fs::rename(&partial, &gch)?;
+        built += 1;
+    }
+
+    if built == 0 {
+        return Err("no header was precompiled".into());
+    }
+    Ok(dir)
+}
+
+// 由编译命令得到生成 .gch 的参数：{file} 替换为包装文件，-o 的目标替换为 .gch 路径
+fn header_args(compile: &CommandLine, wrapper: &Path, output: &Path) -> Vec<String> {
+    let mut args = Vec::with_capacity(compile.args.len() + 2);
+    let mut iter = compile.args.iter();
+    while let Some(arg) = iter.next() {
+        if arg == "-o" {
+            iter.next();
+        } else if arg.starts_with("-o") && arg.len() > 2 {
+            continue;
+        } else {
+            args.push(arg.replace("{file}", &wrapper.to_string_lossy()));
+        }
+    }
+    args.push("-o".to_string());
+    args.push(output.to_string_lossy().into_owned());
+    args
+}
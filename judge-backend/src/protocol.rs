@@ -0,0 +1,121 @@
+use std::io::{self, BufRead, Read};
+
+// 帧格式：4 字节大端无符号长度 + 负载。
+// 兼容旧客户端：连接首字节为 '{' 时按换行分隔的 JSON 处理。
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Framing {
+    Lines,
+    Length,
+}
+
+impl Framing {
+    pub fn detect(first_byte: u8) -> Self {
+        if first_byte == b'{' {
+            Framing::Lines
+        } else {
+            Framing::Length
+        }
+    }
+}
+
+fn too_large(size: usize, max_size: usize) -> io::Error {
+    io::Error::new(
+        io::ErrorKind::InvalidData,
+        format!("Message of {} bytes exceeds limit of {} bytes", size, max_size),
+    )
+}
+
+// 读取一条完整消息；连接在消息边界处关闭时返回 None
+pub fn read_message<R: BufRead>(reader: &mut R, framing: Framing, max_size: usize) -> io::Result<Option<Vec<u8>>> {
+    match framing {
+        Framing::Length => {
+            let mut header = [0u8; 4];
+            match reader.read_exact(&mut header) {
+                Ok(()) => {}
+                Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => return Ok(None),
+                Err(e) => return Err(e),
+            }
+            let size = u32::from_be_bytes(header) as usize;
+            if size > max_size {
+                return Err(too_large(size, max_size));
+            }
+            let mut payload = vec![0u8; size];
+            reader.read_exact(&mut payload)?;
+            Ok(Some(payload))
+        }
+        Framing::Lines => loop {
+            let mut line = Vec::new();
+            let n = reader.by_ref().take(max_size as u64 + 1).read_until(b'\n', &mut line)?;
+            if n == 0 {
+                return Ok(None);
+            }
+            if line.len() > max_size {
+                return Err(too_large(line.len(), max_size));
+            }
+            if line.iter().any(|b| !b.is_ascii_whitespace()) {
+                return Ok(Some(line));
+            }
+        },
+    }
+}
+
+// 把负载编码为一条完整消息，调用方一次写出，避免帧头与负载被拆成两个 TCP 包
+pub fn encode_message(framing: Framing, payload: &[u8]) -> Vec<u8> {
+    let mut message = Vec::with_capacity(payload.len() + 4);
+    match framing {
+        Framing::Length => {
+            message.extend_from_slice(&(payload.len() as u32).to_be_bytes());
+            message.extend_from_slice(payload);
+        }
+        Framing::Lines => {
+            message.extend_from_slice(payload);
+            message.push(b'\n');
+        }
+    }
+    message
+}
+
+// 负载编码：连接默认 JSON，客户端可通过 hello 协商为 MessagePack
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Encoding {
+    Json,
+    MsgPack,
+}
+
+impl Encoding {
+    pub fn name(self) -> &'static str {
+        match self {
+            Encoding::Json => "json",
+            Encoding::MsgPack => "msgpack",
+        }
+    }
+
+    // 按客户端给出的偏好顺序选择第一个支持的编码
+    pub fn negotiate(offered: &[String]) -> Self {
+        offered
+            .iter()
+            .find_map(|name| match name.as_str() {
+                "msgpack" => Some(Encoding::MsgPack),
+                "json" => Some(Encoding::Json),
+                _ => None,
+            })
+            .unwrap_or(Encoding::Json)
+    }
+
+    pub fn decode<T: serde::de::DeserializeOwned>(self, payload: &[u8]) -> Result<T, String> {
+        match self {
+            Encoding::Json => serde_json::from_slice(payload).map_err(|e| format!("Invalid JSON: {}", e)),
+            Encoding::MsgPack => {
+                let value = crate::msgpack::decode(payload)?;
+                serde_json::from_value(value).map_err(|e| format!("Invalid request: {}", e))
+            }
+        }
+    }
+
+    pub fn encode<T: serde::Serialize>(self, value: &T) -> Vec<u8> {
+        match self {
+            Encoding::Json => serde_json::to_vec(value).unwrap(),
+            Encoding::MsgPack => crate::msgpack::encode(&serde_json::to_value(value).unwrap()),
+        }
+    }
+}
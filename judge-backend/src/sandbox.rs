@@ -0,0 +1,549 @@
+use std::io::{self, Read};
+use std::process::{Child, Command, Stdio};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::thread;
+use std::time::{Duration, Instant};
+
+// 单次运行的资源限制
+#[derive(Debug, Clone, Copy)]
+pub struct Limits {
+    // CPU 时间上限（毫秒），超出即终止
+    pub cpu_time_ms: u64,
+    // 墙钟时间上限（毫秒），防止 sleep、阻塞读等不消耗 CPU 的程序长期占用工作线程
+    pub wall_time_ms: u64,
+    // 内存上限（字节），按进程组常驻内存判定，None 表示不限制
+    pub memory_bytes: Option<u64>,
+    // 地址空间上限（字节），通过 RLIMIT_AS 在分配时即拒绝，作为看门狗轮询间隙的兜底
+    pub address_space_bytes: Option<u64>,
+    // 绑定运行的 CPU 核心，None 表示不绑定
+    pub cpu: Option<usize>,
+    // 标准输出的字节数上限，None 表示不限制
+    pub output_bytes: Option<u64>,
+    // 写入单个文件的字节数上限，通过 RLIMIT_FSIZE 限制程序在工作目录（内存文件系统）中写文件，None 表示不限制
+    pub file_bytes: Option<u64>,
+}
+
+impl Limits {
+    // RLIMIT_CPU 作为看门狗之外的兜底：向上取整到秒再多给 1 秒
+    pub fn rlimit_cpu_secs(&self) -> u64 {
+        (self.cpu_time_ms + 999) / 1000 + 1
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Termination {
+    // 正常退出及退出码
+    Exited(i32),
+    // 被信号终止（非看门狗）
+    Signaled(i32),
+    // 超出 CPU 时间被看门狗终止
+    CpuTimeLimit,
+    // 超出墙钟时间被看门狗终止
+    WallTimeLimit,
+    // 超出内存限制被看门狗终止
+    MemoryLimit,
+    // 超出输出限制被看门狗终止
+    OutputLimit,
+    // 评测已有结论，被提前取消
+    Cancelled,
+}
+
+#[derive(Debug)]
+pub struct RunOutcome {
+    pub termination: Termination,
+    pub cpu_time_ms: u64,
+    pub wall_time_ms: u64,
+    // 峰值常驻内存（KB）
+    pub peak_memory_kb: u64,
+    pub stdout: Vec<u8>,
+    pub stderr: Vec<u8>,
+}
+
+impl RunOutcome {
+    pub fn success(&self) -> bool {
+        self.termination == Termination::Exited(0)
+    }
+
+    pub fn time_limit_exceeded(&self, limits: &Limits) -> bool {
+        matches!(self.termination, Termination::CpuTimeLimit | Termination::WallTimeLimit)
+            || self.cpu_time_ms > limits.cpu_time_ms
+    }
+
+    pub fn output_limit_exceeded(&self) -> bool {
+        self.termination == Termination::OutputLimit
+    }
+
+    pub fn memory_limit_exceeded(&self, limits: &Limits) -> bool {
+        self.termination == Termination::MemoryLimit
+            || limits.memory_bytes.map_or(false, |limit| self.peak_memory_kb * 1024 > limit)
+    }
+}
+
+// 看门狗轮询间隔
+const POLL_INTERVAL: Duration = Duration::from_millis(5);
+
+// 子进程标准输出的消费方，按读取到的数据块依次调用
+pub trait OutputSink: Send {
+    fn write(&mut self, chunk: &[u8]);
+}
+
+impl OutputSink for Vec<u8> {
+    fn write(&mut self, chunk: &[u8]) {
+        self.extend_from_slice(chunk);
+    }
+}
+
+// 标准错误只保留开头部分，足够给出错误信息
+const STDERR_KEEP: usize = 64 * 1024;
+const READ_CHUNK: usize = 64 * 1024;
+
+// 进程结束后，脱离进程组的后代进程（如 setsid 的孙进程）可能仍持有管道写端，
+// 读取线程此后最多再等待 DRAIN_TIMEOUT，不会永远阻塞在读取上
+const DRAIN_TIMEOUT: Duration = Duration::from_secs(1);
+const DRAIN_POLL: Duration = Duration::from_millis(50);
+
+// 可以限时等待数据到达的管道
+pub trait WaitReadable {
+    // 在 timeout 内有数据可读（或已到达 EOF、出错）时返回 true
+    fn wait_readable(&self, timeout: Duration) -> bool;
+}
+
+#[cfg(unix)]
+impl<T: std::os::unix::io::AsRawFd> WaitReadable for T {
+    fn wait_readable(&self, timeout: Duration) -> bool {
+        let mut fd = libc::pollfd { fd: self.as_raw_fd(), events: libc::POLLIN, revents: 0 };
+        let ret = unsafe { libc::poll(&mut fd, 1, timeout.as_millis() as libc::c_int) };
+        ret > 0 || (ret < 0 && io::Error::last_os_error().kind() != io::ErrorKind::Interrupted)
+    }
+}
+
+// 无法限时等待，读取一直阻塞到 EOF
+#[cfg(not(unix))]
+impl<T> WaitReadable for T {
+    fn wait_readable(&self, _timeout: Duration) -> bool {
+        true
+    }
+}
+
+// 读取一块数据；EOF、出错或进程结束后超过 DRAIN_TIMEOUT 时返回 None
+fn read_chunk<R: Read + WaitReadable>(
+    pipe: &mut R,
+    buf: &mut [u8],
+    reaped: &AtomicBool,
+    drain_deadline: &mut Option<Instant>,
+) -> Option<usize> {
+    loop {
+        if reaped.load(Ordering::Relaxed) {
+            let deadline = *drain_deadline.get_or_insert_with(|| Instant::now() + DRAIN_TIMEOUT);
+            if Instant::now() >= deadline {
+                return None;
+            }
+        }
+        if pipe.wait_readable(DRAIN_POLL) {
+            break;
+        }
+    }
+    match pipe.read(buf) {
+        Ok(0) | Err(_) => None,
+        Ok(n) => Some(n),
+    }
+}
+
+// 读取标准输出交给 sink，超出 limit 时置位 exceeded 并停止读取
+fn pump_stdout<R: Read + WaitReadable>(
+    mut pipe: R,
+    sink: &mut dyn OutputSink,
+    limit: Option<u64>,
+    exceeded: &AtomicBool,
+    reaped: &AtomicBool,
+) {
+    let mut buf = vec![0u8; READ_CHUNK];
+    let mut total: u64 = 0;
+    let mut drain_deadline = None;
+    while let Some(n) = read_chunk(&mut pipe, &mut buf, reaped, &mut drain_deadline) {
+        total += n as u64;
+        if limit.map_or(false, |limit| total > limit) {
+            exceeded.store(true, Ordering::Relaxed);
+            break;
+        }
+        sink.write(&buf[..n]);
+    }
+}
+
+// 读取标准错误，超出 STDERR_KEEP 的部分丢弃，避免子进程因管道写满而阻塞
+fn pump_stderr<R: Read + WaitReadable>(mut pipe: R, reaped: &AtomicBool) -> Vec<u8> {
+    let mut kept = Vec::new();
+    let mut buf = vec![0u8; READ_CHUNK];
+    let mut drain_deadline = None;
+    while let Some(n) = read_chunk(&mut pipe, &mut buf, reaped, &mut drain_deadline) {
+        let room = STDERR_KEEP.saturating_sub(kept.len());
+        kept.extend_from_slice(&buf[..n.min(room)]);
+    }
+    kept
+}
+
+// 在限制下运行命令并收集完整的标准输出
+pub fn run(command: &mut Command, stdin: Stdio, limits: &Limits, cancel: Option<&AtomicBool>) -> io::Result<RunOutcome> {
+    let mut stdout = Vec::new();
+    let mut outcome = run_with_sink(command, stdin, limits, cancel, &mut stdout)?;
+    outcome.stdout = stdout;
+    Ok(outcome)
+}
+
+// 在限制下运行命令：子进程位于独立进程组，超限时整组终止，
+// CPU 时间与峰值内存取自 wait4 返回的 rusage 与看门狗观察值中的较大者。
+// 标准输出边读边交给 sink，不在内存中保留（RunOutcome.stdout 为空）；
+// cancel 被置位时同样终止进程组，用于提前结束已无必要的测试点
+pub fn run_with_sink(
+    command: &mut Command,
+    stdin: Stdio,
+    limits: &Limits,
+    cancel: Option<&AtomicBool>,
+    sink: &mut dyn OutputSink,
+) -> io::Result<RunOutcome> {
+    command.stdin(stdin).stdout(Stdio::piped()).stderr(Stdio::piped());
+    platform::prepare(command, limits);
+
+    let start = Instant::now();
+    let mut child = command.spawn()?;
+    let stdout_pipe = child.stdout.take();
+    let stderr_pipe = child.stderr.take();
+    supervise(stdout_pipe, stderr_pipe, limits, start, sink, |output_exceeded| {
+        platform::watch(&mut child, limits, start, cancel, output_exceeded)
+    })
+}
+
+// 边读取已启动进程的标准输出与标准错误边由 watch 监视进程直到结束。
+// watch 返回 (结束方式, CPU 毫秒, 峰值内存 KB)，参数为输出是否已超出限制
+pub fn supervise<O, E, W>(
+    stdout_pipe: Option<O>,
+    stderr_pipe: Option<E>,
+    limits: &Limits,
+    start: Instant,
+    sink: &mut dyn OutputSink,
+    watch: W,
+) -> io::Result<RunOutcome>
+where
+    O: Read + WaitReadable + Send,
+    E: Read + WaitReadable + Send,
+    W: FnOnce(&AtomicBool) -> io::Result<(Termination, u64, u64)>,
+{
+    let output_exceeded = AtomicBool::new(false);
+    let reaped = AtomicBool::new(false);
+
+    thread::scope(|scope| {
+        let stdout = scope.spawn(|| {
+            if let Some(pipe) = stdout_pipe {
+                pump_stdout(pipe, sink, limits.output_bytes, &output_exceeded, &reaped);
+            }
+        });
+        let stderr = scope.spawn(|| stderr_pipe.map(|pipe| pump_stderr(pipe, &reaped)).unwrap_or_default());
+
+        let watched = watch(&output_exceeded);
+        reaped.store(true, Ordering::Relaxed);
+        let _ = stdout.join();
+        let stderr = stderr.join().unwrap_or_default();
+        let (termination, cpu_time_ms, peak_memory_kb) = watched?;
+
+        Ok(RunOutcome {
+            termination,
+            cpu_time_ms,
+            wall_time_ms: start.elapsed().as_millis() as u64,
+            peak_memory_kb,
+            stdout: Vec::new(),
+            stderr,
+        })
+    })
+}
+
+#[cfg(unix)]
+pub use platform::{watch_process, Reaper};
+
+#[cfg(unix)]
+mod platform {
+    use super::*;
+    use std::os::unix::process::CommandExt;
+
+    const CPU_CHECK_EVERY: u32 = 4;
+
+    pub fn prepare(command: &mut Command, limits: &Limits) {
+        let cpu_secs = limits.rlimit_cpu_secs();
+        let address_space = limits.address_space_bytes;
+        let file_bytes = limits.file_bytes;
+        let cpu = limits.cpu;
+        unsafe {
+            command.pre_exec(move || {
+                // 独立进程组，超时可以连同子进程一起终止
+                libc::setpgid(0, 0);
+                #[cfg(target_os = "linux")]
+                if let Some(cpu) = cpu {
+                    let mut set: libc::cpu_set_t = std::mem::zeroed();
+                    libc::CPU_SET(cpu, &mut set);
+                    libc::sched_setaffinity(0, std::mem::size_of::<libc::cpu_set_t>(), &set);
+                }
+                let rlim = libc::rlimit { rlim_cur: cpu_secs as libc::rlim_t, rlim_max: (cpu_secs + 1) as libc::rlim_t };
+                libc::setrlimit(libc::RLIMIT_CPU, &rlim);
+                if let Some(bytes) = address_space {
+                    let rlim = libc::rlimit { rlim_cur: bytes as libc::rlim_t, rlim_max: bytes as libc::rlim_t };
+                    libc::setrlimit(libc::RLIMIT_AS, &rlim);
+                }
+                if let Some(bytes) = file_bytes {
+                    let rlim = libc::rlimit { rlim_cur: bytes as libc::rlim_t, rlim_max: bytes as libc::rlim_t };
+                    libc::setrlimit(libc::RLIMIT_FSIZE, &rlim);
+                }
+                Ok(())
+            });
+        }
+    }
+
+    fn kill_group(pid: libc::pid_t) {
+        unsafe {
+            libc::kill(-pid, libc::SIGKILL);
+            libc::kill(pid, libc::SIGKILL);
+        }
+    }
+
+    fn rusage_cpu_ms(usage: &libc::rusage) -> u64 {
+        let user = usage.ru_utime.tv_sec as u64 * 1000 + usage.ru_utime.tv_usec as u64 / 1000;
+        let system = usage.ru_stime.tv_sec as u64 * 1000 + usage.ru_stime.tv_usec as u64 / 1000;
+        user + system
+    }
+
+    // /proc/<pid>/stat 中 ')' 之后的字段（comm 可能含空格）
+    fn read_stat(pid: libc::pid_t) -> Option<Vec<String>> {
+        let stat = std::fs::read_to_string(format!("/proc/{}/stat", pid)).ok()?;
+        let rest = &stat[stat.rfind(')')? + 1..];
+        Some(rest.split_whitespace().map(|v| v.to_string()).collect())
+    }
+
+    // (utime+stime 时钟滴答, RSS 页数)，组长另计已回收子进程的 cutime+cstime
+    fn stat_usage(pid: libc::pid_t, pgid: libc::pid_t, fields: &[String]) -> (u64, u64) {
+        let field = |i: usize| fields.get(i).and_then(|v| v.parse::<u64>().ok()).unwrap_or(0);
+        let mut ticks = field(11) + field(12);
+        if pid == pgid {
+            ticks += field(13) + field(14);
+        }
+        (ticks, field(21))
+    }
+
+    // 进程的全部直接子进程；内核不提供 children 文件时返回 None
+    fn children(pid: libc::pid_t) -> Option<Vec<libc::pid_t>> {
+        let mut children = Vec::new();
+        for task in std::fs::read_dir(format!("/proc/{}/task", pid)).ok()?.flatten() {
+            let list = std::fs::read_to_string(task.path().join("children")).ok()?;
+            children.extend(list.split_whitespace().filter_map(|c| c.parse::<libc::pid_t>().ok()));
+        }
+        Some(children)
+    }
+
+    // 从组长出发遍历后代进程，只读取这些进程的 stat，脱离进程组的后代同样计入。
+    // 组长已退出（僵尸进程的后代已被收养）或内核不支持 children 文件时返回 None
+    fn sample_tree(pgid: libc::pid_t) -> Option<(u64, u64)> {
+        let leader = read_stat(pgid)?;
+        if leader.first().map(|state| state.as_str()) == Some("Z") {
+            return None;
+        }
+        let (mut ticks_total, mut rss_pages) = stat_usage(pgid, pgid, &leader);
+        let mut pending = children(pgid)?;
+        while let Some(pid) = pending.pop() {
+            if let Some(fields) = read_stat(pid) {
+                let (ticks, rss) = stat_usage(pid, pgid, &fields);
+                ticks_total += ticks;
+                rss_pages += rss;
+            }
+            pending.extend(children(pid).unwrap_or_default());
+        }
+        Some((ticks_total, rss_pages))
+    }
+
+    // 扫描整个 /proc，按进程组 ID 统计
+    fn scan_group(pgid: libc::pid_t) -> Option<(u64, u64)> {
+        let mut ticks_total = 0u64;
+        let mut rss_pages = 0u64;
+        for entry in std::fs::read_dir("/proc").ok()?.flatten() {
+            let pid: libc::pid_t = match entry.file_name().to_str().and_then(|n| n.parse().ok()) {
+                Some(pid) => pid,
+                None => continue,
+            };
+            let fields = match read_stat(pid) {
+                Some(fields) => fields,
+                None => continue,
+            };
+            if fields.get(2).and_then(|v| v.parse::<libc::pid_t>().ok()) != Some(pgid) {
+                continue;
+            }
+            let (ticks, rss) = stat_usage(pid, pgid, &fields);
+            ticks_total += ticks;
+            rss_pages += rss;
+        }
+        Some((ticks_total, rss_pages))
+    }
+
+    // 进程组的资源占用采样：(CPU 毫秒, 常驻内存 KB)。
+    // CPU 为存活进程的 utime+stime 之和，加上组长已回收子进程的 cutime+cstime；
+    // 内存为存活进程 RSS 之和（Linux 读 /proc，其他系统返回 None 仅依赖 rlimit）。
+    // 通常只沿进程树读取组长的后代，无法遍历进程树时退回扫描整个 /proc
+    fn sample_group(pgid: libc::pid_t) -> Option<(u64, u64)> {
+        if !cfg!(target_os = "linux") {
+            return None;
+        }
+        let (ticks_total, rss_pages) = sample_tree(pgid).or_else(|| scan_group(pgid))?;
+        let ticks = unsafe { libc::sysconf(libc::_SC_CLK_TCK) }.max(1) as u64;
+        let page_kb = (unsafe { libc::sysconf(libc::_SC_PAGESIZE) }.max(1024) as u64) / 1024;
+        Some((ticks_total * 1000 / ticks, rss_pages * page_kb))
+    }
+
+    // 看门狗监视的进程，pid 同时为其进程组 ID
+    pub trait Reaper {
+        fn pid(&self) -> libc::pid_t;
+        // 进程结束时返回 (wait 状态, CPU 毫秒, 峰值内存 KB)，尚未结束时返回 None；block 为 true 时等待结束
+        fn reap(&mut self, block: bool) -> io::Result<Option<(libc::c_int, u64, u64)>>;
+    }
+
+    // 本进程直接创建的子进程，通过 wait4 回收
+    struct ChildReaper(libc::pid_t);
+
+    impl Reaper for ChildReaper {
+        fn pid(&self) -> libc::pid_t {
+            self.0
+        }
+
+        fn reap(&mut self, block: bool) -> io::Result<Option<(libc::c_int, u64, u64)>> {
+            let mut status: libc::c_int = 0;
+            let mut usage: libc::rusage = unsafe { std::mem::zeroed() };
+            let flags = if block { 0 } else { libc::WNOHANG };
+            let ret = unsafe { libc::wait4(self.0, &mut status, flags, &mut usage) };
+            if ret < 0 {
+                let err = io::Error::last_os_error();
+                if err.kind() == io::ErrorKind::Interrupted {
+                    return Ok(None);
+                }
+                return Err(err);
+            }
+            if ret != self.0 {
+                return Ok(None);
+            }
+            // Linux 上 ru_maxrss 的单位为 KB
+            Ok(Some((status, rusage_cpu_ms(&usage), usage.ru_maxrss.max(0) as u64)))
+        }
+    }
+
+    pub fn watch(
+        child: &mut Child,
+        limits: &Limits,
+        start: Instant,
+        cancel: Option<&AtomicBool>,
+        output_exceeded: &AtomicBool,
+    ) -> io::Result<(Termination, u64, u64)> {
+        watch_process(&mut ChildReaper(child.id() as libc::pid_t), limits, start, cancel, output_exceeded)
+    }
+
+    pub fn watch_process(
+        reaper: &mut dyn Reaper,
+        limits: &Limits,
+        start: Instant,
+        cancel: Option<&AtomicBool>,
+        output_exceeded: &AtomicBool,
+    ) -> io::Result<(Termination, u64, u64)> {
+        let pid = reaper.pid();
+        let mut killed_for: Option<Termination> = None;
+        // 看门狗最后一次观察到的进程组 CPU 时间：被终止的后代进程不会被回收进 rusage
+        let mut observed_cpu_ms = 0;
+        let mut observed_memory_kb = 0;
+        let mut polls: u32 = 0;
+        loop {
+            if let Some((status, cpu_ms, memory_kb)) = reaper.reap(killed_for.is_some())? {
+                // 子进程已回收，进程组中可能还有残留的后代进程
+                unsafe {
+                    libc::kill(-pid, libc::SIGKILL);
+                }
+                let cpu_ms = cpu_ms.max(observed_cpu_ms);
+                let memory_kb = memory_kb.max(observed_memory_kb);
+                let termination = if let Some(reason) = killed_for {
+                    reason
+                } else if output_exceeded.load(Ordering::Relaxed) {
+                    // 停止读取后子进程可能因 SIGPIPE 先于看门狗退出
+                    Termination::OutputLimit
+                } else if libc::WIFEXITED(status) {
+                    Termination::Exited(libc::WEXITSTATUS(status))
+                } else if libc::WIFSIGNALED(status) && libc::WTERMSIG(status) == libc::SIGXCPU {
+                    Termination::CpuTimeLimit
+                } else if libc::WIFSIGNALED(status) && libc::WTERMSIG(status) == libc::SIGXFSZ {
+                    Termination::OutputLimit
+                } else if libc::WIFSIGNALED(status) {
+                    Termination::Signaled(libc::WTERMSIG(status))
+                } else {
+                    Termination::Exited(-1)
+                };
+                return Ok((termination, cpu_ms, memory_kb));
+            }
+
+            let elapsed = start.elapsed().as_millis() as u64;
+            if cancel.map_or(false, |c| c.load(Ordering::Relaxed)) {
+                killed_for = Some(Termination::Cancelled);
+            } else if output_exceeded.load(Ordering::Relaxed) {
+                killed_for = Some(Termination::OutputLimit);
+            } else if elapsed > limits.wall_time_ms {
+                killed_for = Some(Termination::WallTimeLimit);
+            } else if polls % CPU_CHECK_EVERY == 0 {
+                // 读取 /proc 有一定开销，每隔几次轮询采样一次 CPU 时间与内存
+                if let Some((cpu, memory_kb)) = sample_group(pid) {
+                    observed_cpu_ms = observed_cpu_ms.max(cpu);
+                    observed_memory_kb = observed_memory_kb.max(memory_kb);
+                    if limits.memory_bytes.map_or(false, |limit| memory_kb * 1024 > limit) {
+                        killed_for = Some(Termination::MemoryLimit);
+                    } else if cpu > limits.cpu_time_ms {
+                        killed_for = Some(Termination::CpuTimeLimit);
+                    }
+                }
+            }
+            polls = polls.wrapping_add(1);
+            if killed_for.is_some() {
+                kill_group(pid);
+                continue;
+            }
+            thread::sleep(POLL_INTERVAL);
+        }
+    }
+}
+
+#[cfg(not(unix))]
+mod platform {
+    use super::*;
+
+    pub fn prepare(_command: &mut Command, _limits: &Limits) {}
+
+    // 无 rusage 可用，以墙钟时间近似 CPU 时间，不统计内存
+    pub fn watch(
+        child: &mut Child,
+        limits: &Limits,
+        start: Instant,
+        cancel: Option<&AtomicBool>,
+        output_exceeded: &AtomicBool,
+    ) -> io::Result<(Termination, u64, u64)> {
+        loop {
+            if let Some(status) = child.try_wait()? {
+                let elapsed = start.elapsed().as_millis() as u64;
+                return Ok((Termination::Exited(status.code().unwrap_or(-1)), elapsed, 0));
+            }
+            let elapsed = start.elapsed().as_millis() as u64;
+            if cancel.map_or(false, |c| c.load(Ordering::Relaxed)) {
+                let _ = child.kill();
+                let _ = child.wait();
+                return Ok((Termination::Cancelled, elapsed, 0));
+            }
+            if output_exceeded.load(Ordering::Relaxed) {
+                let _ = child.kill();
+                let _ = child.wait();
+                return Ok((Termination::OutputLimit, elapsed, 0));
+            }
+            if elapsed > limits.wall_time_ms || elapsed > limits.cpu_time_ms {
+                let _ = child.kill();
+                let _ = child.wait();
+                let reason = if elapsed > limits.wall_time_ms { Termination::WallTimeLimit } else { Termination::CpuTimeLimit };
+                return Ok((reason, elapsed, 0));
+            }
+            thread::sleep(POLL_INTERVAL);
+        }
+    }
+}
@@ -1,12 +1,18 @@
-use std::sync::Arc;
-use std::sync::Mutex;
-use std::net::{TcpListener, TcpStream};
-use std::io::{Read, Write};
+use std::collections::HashMap;
+use std::sync::{Arc, Mutex, OnceLock};
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::mpsc::{self, Sender, TrySendError};
+use std::net::{Shutdown, TcpListener, TcpStream};
+use std::io::{self, BufRead, BufReader, Write};
+use std::panic::{self, AssertUnwindSafe};
 use std::thread;
+use std::time::{Duration, Instant};
 use serde::{Deserialize, Serialize};
 
 use crate::judge::JudgePool;
+use crate::types::{JudgeStatus, TestCaseSpec, VerdictPolicy};
 use crate::config::Config;
+use crate::protocol::{self, Encoding, Framing};
 
 #[derive(Deserialize, Debug)]
 struct Request {
@@ -17,7 +23,15 @@ struct Request {
     language: Option<String>,
     time_limit: Option<i32>,
     memory_limit: Option<u64>,
+    verdict_policy: Option<VerdictPolicy>,
+    test_cases: Option<Vec<TestCaseSpec>>,
+    // Web 端计算的测试数据版本，参与同一提交重复 submit 的去重
+    testcase_version: Option<String>,
     judge_id: Option<String>,
+    // 客户端请求ID，原样回传，用于同一连接上多个并发请求的响应匹配
+    request_id: Option<serde_json::Value>,
+    // hello 协商时客户端按偏好排列的编码
+    encodings: Option<Vec<String>>,
 }
 
 #[derive(Serialize, Debug)]
@@ -29,6 +43,18 @@ struct Response {
     data: Option<JudgeResult>,
     #[serde(skip_serializing_if = "Option::is_none")]
     error: Option<String>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    encoding: Option<String>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    stats: Option<Stats>,
+}
+
+// 节点负载，供调度器选择评测节点
+#[derive(Serialize, Debug)]
+struct Stats {
+    active: usize,
+    queued: usize,
+    workers: usize,
 }
 
 #[derive(Serialize, Debug)]
@@ -40,22 +66,200 @@ struct JudgeResult {
     error_message: Option<String>,
 }
 
+#[derive(Serialize)]
+struct Envelope<'a> {
+    #[serde(skip_serializing_if = "Option::is_none")]
+    request_id: Option<&'a serde_json::Value>,
+    #[serde(flatten)]
+    response: &'a Response,
+}
+
+// 连接的写端，在读循环与结果推送回调之间共享
+struct ConnectionWriter {
+    stream: Arc<Mutex<TcpStream>>,
+    framing: Framing,
+    encoding: Mutex<Encoding>,
+    // 结果推送队列，首次 wait 时创建并启动该连接的推送线程
+    pushes: OnceLock<Sender<Vec<u8>>>,
+    // 尚未推送结果的 wait 订阅数，不为 0 时连接在 idle_timeout 内不算空闲
+    waiting: AtomicUsize,
+    // 任务ID -> 本连接对该任务当前有效的 wait 订阅。客户端等待超时后会对同一任务重新 wait，
+    // 新订阅或 ack 到达时之前的订阅作废，不再推送也不再计入 waiting
+    subscriptions: Mutex<HashMap<String, Arc<AtomicBool>>>,
+}
+
+type SharedWriter = Arc<ConnectionWriter>;
+
+impl ConnectionWriter {
+    fn new(stream: TcpStream, framing: Framing) -> Self {
+        Self {
+            stream: Arc::new(Mutex::new(stream)),
+            framing,
+            encoding: Mutex::new(Encoding::Json),
+            pushes: OnceLock::new(),
+            waiting: AtomicUsize::new(0),
+            subscriptions: Mutex::new(HashMap::new()),
+        }
+    }
+
+    // 登记对任务的新 wait 订阅，作废之前的订阅，返回新订阅的有效标记
+    fn subscribe(&self, judge_id: &str) -> Arc<AtomicBool> {
+        self.unsubscribe(judge_id);
+        let active = Arc::new(AtomicBool::new(true));
+        self.subscriptions.lock().unwrap().insert(judge_id.to_string(), active.clone());
+        self.waiting.fetch_add(1, Ordering::Relaxed);
+        active
+    }
+
+    // 作废对任务的 wait 订阅（如有）
+    fn unsubscribe(&self, judge_id: &str) {
+        let active = self.subscriptions.lock().unwrap().remove(judge_id);
+        if let Some(active) = active {
+            if active.swap(false, Ordering::Relaxed) {
+                self.waiting.fetch_sub(1, Ordering::Relaxed);
+            }
+        }
+    }
+
+    // 订阅的结果已推送：仍是该任务的当前订阅时移出订阅表
+    fn finish_subscription(&self, judge_id: &str, active: &Arc<AtomicBool>) {
+        let mut subscriptions = self.subscriptions.lock().unwrap();
+        if subscriptions.get(judge_id).map_or(false, |current| Arc::ptr_eq(current, active)) {
+            subscriptions.remove(judge_id);
+        }
+        drop(subscriptions);
+        self.waiting.fetch_sub(1, Ordering::Relaxed);
+    }
+
+    fn encode(&self, request_id: Option<&serde_json::Value>, response: &Response) -> Vec<u8> {
+        let encoding = *self.encoding.lock().unwrap();
+        let payload = encoding.encode(&Envelope { request_id, response });
+        protocol::encode_message(self.framing, &payload)
+    }
+
+    // 推送线程只持有套接字，连接写端（及其中的发送端）随读循环与所有订阅一同释放后线程退出
+    fn pushes(&self) -> &Sender<Vec<u8>> {
+        self.pushes.get_or_init(|| {
+            let (sender, receiver) = mpsc::channel::<Vec<u8>>();
+            let stream = self.stream.clone();
+            let spawned = thread::Builder::new().name("conn-pusher".to_string()).spawn(move || {
+                for message in receiver {
+                    let mut stream = stream.lock().unwrap();
+                    if let Err(e) = stream.write_all(&message) {
+                        println!("Failed to push result: {}", e);
+                        let _ = stream.shutdown(Shutdown::Both);
+                        break;
+                    }
+                }
+            });
+            if let Err(e) = spawned {
+                println!("Failed to start result pusher: {}", e);
+            }
+            sender
+        })
+    }
+}
+
+// 响应带上请求ID，整条消息在一次加锁内写出，并发推送不会交错
+fn send_response(writer: &SharedWriter, request_id: Option<&serde_json::Value>, response: &Response) {
+    let message = writer.encode(request_id, response);
+    let _ = writer.stream.lock().unwrap().write_all(&message);
+}
+
+// 结果推送：在评测线程上只编码并入队，由连接的推送线程写出，客户端不读时不会阻塞评测线程
+fn push_response(writer: &SharedWriter, request_id: Option<&serde_json::Value>, response: &Response) {
+    let message = writer.encode(request_id, response);
+    let _ = writer.pushes().send(message);
+}
+
+fn status_response(status: JudgeStatus) -> Response {
+    Response {
+        status: "ok".to_string(),
+        judge_id: None,
+        data: Some(JudgeResult {
+            status: status.status,
+            score: status.score,
+            execution_time: status.execution_time,
+            memory_used: status.memory_used,
+            error_message: status.error_message,
+        }),
+        error: None,
+        encoding: None,
+        stats: None,
+    }
+}
+
 pub fn run_server(
     config: Config,
-    judge_pool: Arc<Mutex<JudgePool>>,
+    judge_pool: Arc<JudgePool>,
 ) -> Result<(), Box<dyn std::error::Error>> {
     let addr = format!("{}:{}", config.server.host, config.server.port);
     let listener = TcpListener::bind(&addr)?;
     
-    println!("Server started, listening on {}", addr);
+    let max_connections = config.server.max_connections.max(1);
+    let limits = Arc::new(ConnectionLimits {
+        max_message_size: config.server.max_message_size,
+        idle_timeout: Duration::from_secs(config.server.idle_timeout.max(1)),
+        io_timeout: Duration::from_secs(config.server.io_timeout.max(1)),
+        queued: AtomicUsize::new(0),
+    });
+    
+    // 固定数量的连接处理线程；已接受但尚未分配到线程的连接在有界队列中等待，
+    // 队列满时直接回复 busy 并关闭连接，线程数与内存占用不随连接数增长
+    let (sender, receiver) = mpsc::sync_channel::<TcpStream>(config.server.connection_queue);
+    let receiver = Arc::new(Mutex::new(receiver));
+    for i in 0..max_connections {
+        let receiver = receiver.clone();
+        let judge_pool = judge_pool.clone();
+        let limits = limits.clone();
+        thread::Builder::new()
+            .name(format!("conn-handler-{}", i))
+            .spawn(move || loop {
+                let stream = match receiver.lock().unwrap().recv() {
+                    Ok(stream) => stream,
+                    Err(_) => break,
+                };
+                limits.queued.fetch_sub(1, Ordering::Relaxed);
+                let judge_pool = judge_pool.clone();
+                // 单个连接处理中的 panic 不应使处理线程减少
+                if panic::catch_unwind(AssertUnwindSafe(|| handle_client(stream, judge_pool, &limits))).is_err() {
+                    println!("Connection handler {} recovered from panic", i);
+                }
+            })?;
+    }
+    
+    // busy 响应需要先读取客户端的第一条请求，由单独的线程完成，不阻塞 accept；
+    // 该线程也积压时直接关闭新连接
+    let (reject_sender, reject_receiver) = mpsc::sync_channel::<TcpStream>(config.server.connection_queue.max(1));
+    {
+        let limits = limits.clone();
+        thread::Builder::new()
+            .name("conn-rejecter".to_string())
+            .spawn(move || {
+                for stream in reject_receiver {
+                    reject_busy(stream, &limits);
+                }
+            })?;
+    }
+    
+    println!(
+        "Server started, listening on {} ({} connection handlers, queue {})",
+        addr, max_connections, config.server.connection_queue
+    );
     
     for stream in listener.incoming() {
         match stream {
             Ok(stream) => {
-                let judge_pool_clone = judge_pool.clone();
-                thread::spawn(move || {
-                    handle_client(stream, judge_pool_clone);
-                });
+                // 先计数再入队，处理线程取出后减一，计数不会短暂为负
+                limits.queued.fetch_add(1, Ordering::Relaxed);
+                match sender.try_send(stream) {
+                    Ok(()) => {}
+                    Err(TrySendError::Full(stream)) => {
+                        limits.queued.fetch_sub(1, Ordering::Relaxed);
+                        let _ = reject_sender.try_send(stream);
+                    }
+                    Err(TrySendError::Disconnected(_)) => break,
+                }
             }
             Err(e) => {
                 println!("Failed to accept connection: {}", e);
@@ -66,47 +270,156 @@ pub fn run_server(
     Ok(())
 }
 
-fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
-    let mut buf = [0; 4096];
+// 连接的读写超时与空闲回收设置，所有处理线程共享
+struct ConnectionLimits {
+    max_message_size: usize,
+    // 没有 wait 订阅的连接空闲超过该时间即关闭，释放处理线程
+    idle_timeout: Duration,
+    // 读取一条已开始的消息、写出一条响应的超时
+    io_timeout: Duration,
+    // 已接受、等待处理线程的连接数
+    queued: AtomicUsize,
+}
+
+// 空闲连接的检查间隔
+const IDLE_POLL_INTERVAL: Duration = Duration::from_secs(1);
+
+// 有连接在排队等待处理线程时，空闲超过该时间的连接让出处理线程
+const QUEUED_IDLE_GRACE: Duration = Duration::from_secs(1);
+
+// 等待下一条消息的首字节；连接关闭、出错或空闲需要回收时返回 false。
+// 有未推送结果的 wait 订阅时不让给排队的连接，但超过 idle_timeout 没有新消息仍然回收：
+// 正常等待的客户端每次订阅超时后都会重新 wait 或查询 status
+fn wait_for_message(reader: &mut BufReader<TcpStream>, waiting: Option<&AtomicUsize>, limits: &ConnectionLimits) -> bool {
+    if !reader.buffer().is_empty() {
+        return true;
+    }
+    let _ = reader.get_ref().set_read_timeout(Some(IDLE_POLL_INTERVAL));
+    let idle_since = Instant::now();
+    loop {
+        match reader.fill_buf() {
+            Ok(buf) => return !buf.is_empty(),
+            Err(e) if matches!(e.kind(), io::ErrorKind::WouldBlock | io::ErrorKind::TimedOut) => {
+                let idle = idle_since.elapsed();
+                if waiting.map_or(false, |w| w.load(Ordering::Relaxed) > 0) {
+                    if idle >= limits.idle_timeout {
+                        return false;
+                    }
+                    continue;
+                }
+                if idle >= limits.idle_timeout
+                    || (idle >= QUEUED_IDLE_GRACE && limits.queued.load(Ordering::Relaxed) > 0)
+                {
+                    return false;
+                }
+            }
+            Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+            Err(_) => return false,
+        }
+    }
+}
+
+// 连接数已满：读取客户端的第一条请求（最多等待 100ms）以确定帧格式与请求ID，回复 busy 后关闭
+fn reject_busy(stream: TcpStream, limits: &ConnectionLimits) {
+    let _ = stream.set_read_timeout(Some(Duration::from_millis(100)));
+    let _ = stream.set_write_timeout(Some(limits.io_timeout));
+    let write_stream = match stream.try_clone() {
+        Ok(s) => s,
+        Err(_) => return,
+    };
+    let mut reader = BufReader::new(stream);
+    let framing = match reader.fill_buf() {
+        Ok(buf) if !buf.is_empty() => Framing::detect(buf[0]),
+        _ => Framing::Length,
+    };
+    let request_id = protocol::read_message(&mut reader, framing, limits.max_message_size)
+        .ok()
+        .flatten()
+        .and_then(|payload| Encoding::Json.decode::<Request>(&payload).ok())
+        .and_then(|request| request.request_id);
+    let writer: SharedWriter = Arc::new(ConnectionWriter::new(write_stream, framing));
+    // 以单独的 busy 状态区分背压与错误，客户端据此稍后重试而不是把节点视为下线
+    let response = Response {
+        status: "busy".to_string(),
+        judge_id: None,
+        data: None,
+        error: Some("Server busy".to_string()),
+        encoding: None,
+        stats: None,
+    };
+    send_response(&writer, request_id.as_ref(), &response);
+}
+
+fn handle_client(stream: TcpStream, judge_pool: Arc<JudgePool>, limits: &ConnectionLimits) {
+    let _ = stream.set_nodelay(true);
+    // 写超时作用于同一套接字的所有句柄，包括推送线程使用的那个
+    let _ = stream.set_write_timeout(Some(limits.io_timeout));
+    let write_stream = match stream.try_clone() {
+        Ok(s) => s,
+        Err(e) => {
+            println!("Failed to clone stream: {}", e);
+            return;
+        }
+    };
+    let mut reader = BufReader::new(stream);
+    
+    // 根据首字节判断帧格式
+    if !wait_for_message(&mut reader, None, limits) {
+        return;
+    }
+    let framing = Framing::detect(reader.buffer()[0]);
+    let writer: SharedWriter = Arc::new(ConnectionWriter::new(write_stream, framing));
     
     loop {
-        match stream.read(&mut buf) {
-            Ok(0) => {
+        if !wait_for_message(&mut reader, Some(&writer.waiting), limits) {
+            break;
+        }
+        // 消息已开始到达，其余部分须在 io_timeout 内读完
+        let _ = reader.get_ref().set_read_timeout(Some(limits.io_timeout));
+        match protocol::read_message(&mut reader, framing, limits.max_message_size) {
+            Ok(None) => {
                 // Connection closed
                 break;
             }
-            Ok(n) => {
-                let data = &buf[..n];
-                let request_str = match std::str::from_utf8(data) {
-                    Ok(s) => s,
-                    Err(e) => {
-                        println!("Failed to parse UTF-8: {}", e);
-                        break;
-                    }
-                };
-                
-                let request: Request = match serde_json::from_str(request_str) {
+            Ok(Some(payload)) => {
+                let encoding = *writer.encoding.lock().unwrap();
+                let request: Request = match encoding.decode(&payload) {
                     Ok(req) => req,
                     Err(e) => {
-                        println!("Failed to parse JSON: {}", e);
+                        println!("Failed to parse request: {}", e);
                         let response = Response {
                             status: "error".to_string(),
                             judge_id: None,
                             data: None,
-                            error: Some(format!("Invalid JSON: {}", e)),
+                            error: Some(e),
+                            encoding: None,
+                            stats: None,
                         };
-                        let response_json = serde_json::to_string(&response).unwrap();
-                        let _ = stream.write_all(response_json.as_bytes());
+                        send_response(&writer, None, &response);
                         break;
                     }
                 };
+                let request_id = request.request_id.clone();
                 
                 match request.action.as_str() {
+                    "hello" => {
+                        // 协商负载编码：本响应仍使用当前编码，之后的消息改用协商结果
+                        let negotiated = Encoding::negotiate(request.encodings.as_deref().unwrap_or(&[]));
+                        let response = Response {
+                            status: "ok".to_string(),
+                            judge_id: None,
+                            data: None,
+                            error: None,
+                            encoding: Some(negotiated.name().to_string()),
+                            stats: None,
+                        };
+                        send_response(&writer, request_id.as_ref(), &response);
+                        *writer.encoding.lock().unwrap() = negotiated;
+                    }
                     "submit" => {
                         if let (Some(submission_id), Some(problem_id), Some(code), Some(language), Some(time_limit), Some(memory_limit)) = (
                             request.submission_id, request.problem_id, request.code, request.language, request.time_limit, request.memory_limit
                         ) {
-                            let mut judge_pool = judge_pool.lock().unwrap();
                             let judge_id = judge_pool.submit_task(
                                 submission_id,
                                 problem_id,
@@ -114,6 +427,9 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                                 language,
                                 time_limit,
                                 memory_limit,
+                                request.verdict_policy.unwrap_or_default(),
+                                request.test_cases.unwrap_or_default(),
+                                request.testcase_version,
                             );
                             
                             let response = Response {
@@ -121,40 +437,28 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                                 judge_id: Some(judge_id),
                                 data: None,
                                 error: None,
+                                encoding: None,
+                                stats: None,
                             };
-                            let response_json = serde_json::to_string(&response).unwrap();
-                            let _ = stream.write_all(response_json.as_bytes());
+                            send_response(&writer, request_id.as_ref(), &response);
                         } else {
                             let response = Response {
                                 status: "error".to_string(),
                                 judge_id: None,
                                 data: None,
                                 error: Some("Missing required fields for submit action".to_string()),
+                                encoding: None,
+                                stats: None,
                             };
-                            let response_json = serde_json::to_string(&response).unwrap();
-                            let _ = stream.write_all(response_json.as_bytes());
+                            send_response(&writer, request_id.as_ref(), &response);
                         }
                     }
                     "status" => {
                         if let Some(judge_id) = request.judge_id {
-                            let judge_pool = judge_pool.lock().unwrap();
                             let result = judge_pool.get_task_status(&judge_id);
                             match result {
                                 Some(status) => {
-                                    let response = Response {
-                                        status: "ok".to_string(),
-                                        judge_id: None,
-                                        data: Some(JudgeResult {
-                                            status: status.status,
-                                            score: status.score,
-                                            execution_time: status.execution_time,
-                                            memory_used: status.memory_used,
-                                            error_message: status.error_message,
-                                        }),
-                                        error: None,
-                                    };
-                                    let response_json = serde_json::to_string(&response).unwrap();
-                                    let _ = stream.write_all(response_json.as_bytes());
+                                    send_response(&writer, request_id.as_ref(), &status_response(status));
                                 }
                                 None => {
                                     let response = Response {
@@ -162,9 +466,10 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                                         judge_id: None,
                                         data: None,
                                         error: Some("Judge ID not found".to_string()),
+                                        encoding: None,
+                                        stats: None,
                                     };
-                                    let response_json = serde_json::to_string(&response).unwrap();
-                                    let _ = stream.write_all(response_json.as_bytes());
+                                    send_response(&writer, request_id.as_ref(), &response);
                                 }
                             }
                         } else {
@@ -173,14 +478,97 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                                 judge_id: None,
                                 data: None,
                                 error: Some("Missing judge_id for status action".to_string()),
+                                encoding: None,
+                                stats: None,
                             };
-                            let response_json = serde_json::to_string(&response).unwrap();
-                            let _ = stream.write_all(response_json.as_bytes());
+                            send_response(&writer, request_id.as_ref(), &response);
                         }
                     }
+                    "wait" => {
+                        // 订阅任务结果：不阻塞连接，任务完成时由结果线程把响应推送到本连接。
+                        // 回调只持有连接写端的弱引用，连接关闭后不再推送，也不会让套接字一直保持打开
+                        if let Some(judge_id) = request.judge_id {
+                            let subscriber = Arc::downgrade(&writer);
+                            let subscriber_request_id = request_id.clone();
+                            let subscriber_judge_id = judge_id.clone();
+                            let active = writer.subscribe(&judge_id);
+                            let subscribed = judge_pool.subscribe(
+                                &judge_id,
+                                Box::new(move |status| {
+                                    let subscriber = match subscriber.upgrade() {
+                                        Some(subscriber) => subscriber,
+                                        None => return,
+                                    };
+                                    if active.swap(false, Ordering::Relaxed) {
+                                        push_response(&subscriber, subscriber_request_id.as_ref(), &status_response(status));
+                                        subscriber.finish_subscription(&subscriber_judge_id, &active);
+                                    }
+                                }),
+                            );
+                            if !subscribed {
+                                writer.unsubscribe(&judge_id);
+                                let response = Response {
+                                    status: "error".to_string(),
+                                    judge_id: None,
+                                    data: None,
+                                    error: Some("Judge ID not found".to_string()),
+                                    encoding: None,
+                                    stats: None,
+                                };
+                                send_response(&writer, request_id.as_ref(), &response);
+                            }
+                        } else {
+                            let response = Response {
+                                status: "error".to_string(),
+                                judge_id: None,
+                                data: None,
+                                error: Some("Missing judge_id for wait action".to_string()),
+                                encoding: None,
+                                stats: None,
+                            };
+                            send_response(&writer, request_id.as_ref(), &response);
+                        }
+                    }
+                    "ack" => {
+                        // Web 端已保存结果，评测机可以删除；本连接对该任务的订阅随之作废
+                        if let Some(judge_id) = &request.judge_id {
+                            writer.unsubscribe(judge_id);
+                        }
+                        let response = match request.judge_id {
+                            Some(judge_id) if judge_pool.ack(&judge_id) => Response {
+                                status: "ok".to_string(),
+                                judge_id: None,
+                                data: None,
+                                error: None,
+                                encoding: None,
+                                stats: None,
+                            },
+                            Some(_) => Response {
+                                status: "error".to_string(),
+                                judge_id: None,
+                                data: None,
+                                error: Some("Judge ID not found or not finished".to_string()),
+                                encoding: None,
+                                stats: None,
+                            },
+                            None => Response {
+                                status: "error".to_string(),
+                                judge_id: None,
+                                data: None,
+                                error: Some("Missing judge_id for ack action".to_string()),
+                                encoding: None,
+                                stats: None,
+                            },
+                        };
+                        send_response(&writer, request_id.as_ref(), &response);
+                    }
                     "stats" => {
-                        let judge_pool = judge_pool.lock().unwrap();
                         let active_count = judge_pool.get_active_tasks_count();
+                        let stats = Stats {
+                            active: active_count,
+                            queued: judge_pool.get_queued_tasks_count(),
+                            workers: judge_pool.get_max_threads(),
+                        };
                         
                         let response = Response {
                             status: "ok".to_string(),
@@ -193,9 +581,10 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                                 error_message: None,
                             }),
                             error: None,
+                            encoding: None,
+                            stats: Some(stats),
                         };
-                        let response_json = serde_json::to_string(&response).unwrap();
-                        let _ = stream.write_all(response_json.as_bytes());
+                        send_response(&writer, request_id.as_ref(), &response);
                     }
                     _ => {
                         let response = Response {
@@ -203,14 +592,26 @@ fn handle_client(mut stream: TcpStream, judge_pool: Arc<Mutex<JudgePool>>) {
                             judge_id: None,
                             data: None,
                             error: Some(format!("Unknown action: {}", request.action)),
+                            encoding: None,
+                            stats: None,
                         };
-                        let response_json = serde_json::to_string(&response).unwrap();
-                        let _ = stream.write_all(response_json.as_bytes());
+                        send_response(&writer, request_id.as_ref(), &response);
                     }
                 }
             }
             Err(e) => {
                 println!("Failed to read from stream: {}", e);
+                if e.kind() == std::io::ErrorKind::InvalidData {
+                    let response = Response {
+                        status: "error".to_string(),
+                        judge_id: None,
+                        data: None,
+                        error: Some(e.to_string()),
+                        encoding: None,
+                        stats: None,
+                    };
+                    send_response(&writer, None, &response);
+                }
                 break;
             }
         }
@@ -0,0 +1,432 @@
+use std::collections::hash_map::DefaultHasher;
+use std::collections::HashMap;
+use std::fmt;
+use std::fs::{self, File, OpenOptions};
+use std::hash::{Hash, Hasher};
+use std::io::{self, BufRead, BufReader, Write};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::{Mutex, RwLock};
+use std::time::{SystemTime, UNIX_EPOCH};
+
+use serde::{Deserialize, Serialize};
+
+use crate::types::JudgeStatus;
+
+// 任务完成回调，用于把结果推送给订阅了该任务的连接
+pub type ResultCallback = Box<dyn FnOnce(JudgeStatus) + Send + Sync>;
+
+fn now_secs() -> u64 {
+    SystemTime::now().duration_since(UNIX_EPOCH).map(|d| d.as_secs()).unwrap_or(0)
+}
+
+// 已完成结果的保留策略
+#[derive(Debug, Clone)]
+pub struct RetentionPolicy {
+    // 结果未被取走时的保留时间（秒）
+    pub result_ttl: u64,
+    // 结果已通过 status/wait 取走后的保留时间（秒），客户端 ack 后立即删除
+    pub fetched_ttl: u64,
+    // 最多保留的已完成结果数，超出时先淘汰已取走的、再淘汰最旧的
+    pub max_results: usize,
+}
+
+impl Default for RetentionPolicy {
+    fn default() -> Self {
+        Self {
+            result_ttl: 24 * 3600,
+            fetched_ttl: 300,
+            max_results: 100_000,
+        }
+    }
+}
+
+struct TaskEntry {
+    status: JudgeStatus,
+    // 所属提交与评测请求摘要，用于同一提交的重复 submit 去重
+    submission_id: Option<i32>,
+    request_digest: Option<String>,
+    // 完成时间（Unix 秒），未完成为 None
+    finished_at: Option<u64>,
+    // 结果是否已被客户端取走，读锁下即可标记
+    fetched: AtomicBool,
+}
+
+impl TaskEntry {
+    fn expired(&self, now: u64, policy: &RetentionPolicy) -> bool {
+        match self.finished_at {
+            None => false,
+            Some(at) => {
+                let ttl = if self.fetched.load(Ordering::Relaxed) { policy.fetched_ttl } else { policy.result_ttl };
+                now >= at.saturating_add(ttl)
+            }
+        }
+    }
+}
+
+// 单个分片：状态与结果订阅在同一把锁下，保证订阅与任务完成之间不会漏掉通知
+#[derive(Default)]
+struct Shard {
+    statuses: HashMap<String, TaskEntry>,
+    subscribers: HashMap<String, Vec<ResultCallback>>,
+}
+
+// 结果日志的一行：带 status 表示任务完成，不带表示结果已确认删除
+#[derive(Serialize, Deserialize)]
+struct LogRecord {
+    id: String,
+    #[serde(default)]
+    at: u64,
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    submission_id: Option<i32>,
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    request_digest: Option<String>,
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    status: Option<JudgeStatus>,
+}
+
+// 追加写的结果日志：重启后恢复尚未被 Web 端确认的评测结果。
+// 每条记录直接写入内核（无用户态缓冲），进程被 kill -9 也不会丢失；完成记录另外 fdatasync，
+// 主机崩溃或断电后同样能恢复。确认删除的记录不同步，丢失时只会多恢复一条已保存的结果
+struct ResultLog {
+    path: PathBuf,
+    file: File,
+    records: usize,
+}
+
+impl ResultLog {
+    fn append(&mut self, record: &LogRecord) {
+        let mut line = serde_json::to_vec(record).unwrap();
+        line.push(b'\n');
+        let written = self.file.write_all(&line).and_then(|()| match record.status {
+            Some(_) => self.file.sync_data(),
+            None => Ok(()),
+        });
+        if let Err(e) = written {
+            println!("Failed to write result log {}: {}", self.path.display(), e);
+        }
+        self.records += 1;
+    }
+
+    // 用当前保留的结果重写日志，先写临时文件再原子替换
+    fn rewrite(&mut self, records: &[LogRecord]) -> io::Result<()> {
+        let tmp_path = self.path.with_extension("tmp");
+        {
+            let mut tmp = File::create(&tmp_path)?;
+            for record in records {
+                let mut line = serde_json::to_vec(record).unwrap();
+                line.push(b'\n');
+                tmp.write_all(&line)?;
+            }
+            tmp.sync_all()?;
+        }
+        fs::rename(&tmp_path, &self.path)?;
+        self.file = OpenOptions::new().append(true).open(&self.path)?;
+        self.records = records.len();
+        Ok(())
+    }
+}
+
+// 按任务ID分片的任务状态表。
+// 不同任务的提交、查询与完成落在不同分片上互不阻塞；同一分片内状态查询只取读锁，
+// 大量客户端轮询状态时可以并行执行。已完成的结果按 RetentionPolicy 过期淘汰。
+pub struct TaskStore {
+    shards: Vec<RwLock<Shard>>,
+    // 提交ID -> 任务ID，按提交ID分片；加锁顺序先于任务分片
+    submissions: Vec<Mutex<HashMap<i32, String>>>,
+    policy: RetentionPolicy,
+    log: Option<Mutex<ResultLog>>,
+}
+
+impl fmt::Debug for TaskStore {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        f.debug_struct("TaskStore")
+            .field("shards", &self.shards.len())
+            .field("tasks", &self.len())
+            .field("policy", &self.policy)
+            .finish()
+    }
+}
+
+impl TaskStore {
+    // 分片数取不小于 shard_count 的 2 的幂
+    pub fn new(shard_count: usize, policy: RetentionPolicy) -> Self {
+        let shard_count = shard_count.max(1).next_power_of_two();
+        Self {
+            shards: (0..shard_count).map(|_| RwLock::new(Shard::default())).collect(),
+            submissions: (0..shard_count).map(|_| Mutex::new(HashMap::new())).collect(),
+            policy,
+            log: None,
+        }
+    }
+
+    fn default_shard_count() -> usize {
+        std::thread::available_parallelism().map(|n| n.get()).unwrap_or(4) * 4
+    }
+
+    // 按 CPU 核数确定分片数
+    pub fn with_policy(policy: RetentionPolicy) -> Self {
+        Self::new(Self::default_shard_count(), policy)
+    }
+
+    // 打开结果日志并恢复其中未过期、未确认的结果
+    pub fn open(policy: RetentionPolicy, log_path: &Path) -> io::Result<Self> {
+        let mut store = Self::with_policy(policy);
+
+        let mut restored: HashMap<String, LogRecord> = HashMap::new();
+        if log_path.exists() {
+            let reader = BufReader::new(File::open(log_path)?);
+            for line in reader.lines() {
+                // 崩溃时最后一行可能不完整，跳过无法解析的行
+                let record: LogRecord = match serde_json::from_str(&line?) {
+                    Ok(record) => record,
+                    Err(_) => continue,
+                };
+                if record.status.is_some() {
+                    restored.insert(record.id.clone(), record);
+                } else {
+                    restored.remove(&record.id);
+                }
+            }
+        } else if let Some(dir) = log_path.parent() {
+            fs::create_dir_all(dir)?;
+        }
+
+        let now = now_secs();
+        let mut records: Vec<LogRecord> = restored
+            .into_values()
+            .filter(|r| now < r.at.saturating_add(store.policy.result_ttl))
+            .collect();
+        records.sort_by_key(|r| r.at);
+        if records.len() > store.policy.max_results {
+            records.drain(..records.len() - store.policy.max_results);
+        }
+        for record in &records {
+            let entry = TaskEntry {
+                status: record.status.clone().unwrap(),
+                submission_id: record.submission_id,
+                request_digest: record.request_digest.clone(),
+                finished_at: Some(record.at),
+                fetched: AtomicBool::new(false),
+            };
+            store.shard(&record.id).write().unwrap().statuses.insert(record.id.clone(), entry);
+            if let Some(submission_id) = record.submission_id {
+                store.submission_shard(submission_id).lock().unwrap().insert(submission_id, record.id.clone());
+            }
+        }
+
+        let file = OpenOptions::new().create(true).append(true).open(log_path)?;
+        let mut log = ResultLog { path: log_path.to_path_buf(), file, records: 0 };
+        log.rewrite(&records)?;
+        println!("Restored {} judge results from {}", records.len(), log_path.display());
+        store.log = Some(Mutex::new(log));
+        Ok(store)
+    }
+
+    fn shard(&self, task_id: &str) -> &RwLock<Shard> {
+        let mut hasher = DefaultHasher::new();
+        task_id.hash(&mut hasher);
+        &self.shards[(hasher.finish() as usize) & (self.shards.len() - 1)]
+    }
+
+    fn submission_shard(&self, submission_id: i32) -> &Mutex<HashMap<i32, String>> {
+        &self.submissions[(submission_id as u32 as usize) & (self.submissions.len() - 1)]
+    }
+
+    // 结果日志加锁顺序先于分片锁：完成、确认与日志压缩都先取日志锁，
+    // 保证压缩时看到的任务表与日志内容一致
+    fn lock_log(&self) -> Option<std::sync::MutexGuard<'_, ResultLog>> {
+        self.log.as_ref().map(|log| log.lock().unwrap())
+    }
+
+    // 为提交登记任务。该提交已有仍在表中、且评测请求摘要相同的任务时返回 (原任务ID, false)，
+    // 否则用 make_id 生成新任务ID并返回 (新任务ID, true)。摘要不同（重测、测试数据或限制变化）时
+    // 视为新的评测，提交随之指向新任务
+    pub fn insert_for_submission(
+        &self,
+        submission_id: i32,
+        request_digest: &str,
+        make_id: impl FnOnce() -> String,
+        status: JudgeStatus,
+    ) -> (String, bool) {
+        let mut submissions = self.submission_shard(submission_id).lock().unwrap();
+        if let Some(existing) = submissions.get(&submission_id) {
+            let shard = self.shard(existing).read().unwrap();
+            if let Some(entry) = shard.statuses.get(existing) {
+                if entry.request_digest.as_deref() == Some(request_digest) {
+                    return (existing.clone(), false);
+                }
+            }
+        }
+        let task_id = make_id();
+        let entry = TaskEntry {
+            status,
+            submission_id: Some(submission_id),
+            request_digest: Some(request_digest.to_string()),
+            finished_at: None,
+            fetched: AtomicBool::new(false),
+        };
+        self.shard(&task_id).write().unwrap().statuses.insert(task_id.clone(), entry);
+        submissions.insert(submission_id, task_id.clone());
+        (task_id, true)
+    }
+
+    // 查询任务状态；已完成的结果被标记为已取走
+    pub fn get(&self, task_id: &str) -> Option<JudgeStatus> {
+        let shard = self.shard(task_id).read().unwrap();
+        let entry = shard.statuses.get(task_id)?;
+        if entry.finished_at.is_some() {
+            entry.fetched.store(true, Ordering::Relaxed);
+        }
+        Some(entry.status.clone())
+    }
+
+    pub fn len(&self) -> usize {
+        self.shards.iter().map(|s| s.read().unwrap().statuses.len()).sum()
+    }
+
+    // 写入任务最终状态，并在锁外通知所有订阅者
+    pub fn complete(&self, task_id: String, status: JudgeStatus) {
+        let at = now_secs();
+        let subscribers = {
+            // 先落盘再对外可见，保证客户端看到的结果在重启后仍能取回。
+            // 同步日志时只持有日志锁，不阻塞同一分片上的状态查询
+            let mut log = self.lock_log();
+            let (submission_id, request_digest) = match self.shard(&task_id).read().unwrap().statuses.get(&task_id) {
+                Some(entry) => (entry.submission_id, entry.request_digest.clone()),
+                None => (None, None),
+            };
+            if let Some(ref mut log) = log {
+                log.append(&LogRecord {
+                    id: task_id.clone(),
+                    at,
+                    submission_id,
+                    request_digest: request_digest.clone(),
+                    status: Some(status.clone()),
+                });
+            }
+            let mut shard = self.shard(&task_id).write().unwrap();
+            let subscribers = shard.subscribers.remove(&task_id).unwrap_or_default();
+            let entry = TaskEntry {
+                status: status.clone(),
+                submission_id,
+                request_digest,
+                finished_at: Some(at),
+                fetched: AtomicBool::new(!subscribers.is_empty()),
+            };
+            shard.statuses.insert(task_id, entry);
+            subscribers
+        };
+        for callback in subscribers {
+            callback(status.clone());
+        }
+    }
+
+    // 订阅任务结果：任务已完成时立即回调，否则在完成时回调；任务不存在返回 false
+    pub fn subscribe(&self, task_id: &str, callback: ResultCallback) -> bool {
+        let status = {
+            let mut shard = self.shard(task_id).write().unwrap();
+            match shard.statuses.get(task_id) {
+                None => return false,
+                Some(entry) if entry.finished_at.is_some() => {
+                    entry.fetched.store(true, Ordering::Relaxed);
+                    entry.status.clone()
+                }
+                Some(_) => {
+                    shard.subscribers.entry(task_id.to_string()).or_default().push(callback);
+                    return true;
+                }
+            }
+        };
+        callback(status);
+        true
+    }
+
+    // 客户端确认已保存结果，立即删除；任务不存在或尚未完成返回 false
+    pub fn ack(&self, task_id: &str) -> bool {
+        let mut log = self.lock_log();
+        {
+            let mut shard = self.shard(task_id).write().unwrap();
+            match shard.statuses.get(task_id) {
+                Some(entry) if entry.finished_at.is_some() => {
+                    shard.statuses.remove(task_id);
+                }
+                _ => return false,
+            }
+        }
+        if let Some(ref mut log) = log {
+            log.append(&LogRecord {
+                id: task_id.to_string(),
+                at: now_secs(),
+                submission_id: None,
+                request_digest: None,
+                status: None,
+            });
+        }
+        true
+    }
+
+    // 淘汰过期结果与超出数量上限的结果，并在日志膨胀时压缩日志；返回淘汰数量
+    pub fn sweep(&self) -> usize {
+        let now = now_secs();
+        let mut evicted = 0;
+        // (已取走, 完成时间, 任务ID)
+        let mut finished: Vec<(bool, u64, String)> = Vec::new();
+
+        for shard in &self.shards {
+            let mut shard = shard.write().unwrap();
+            let before = shard.statuses.len();
+            let policy = &self.policy;
+            shard.statuses.retain(|_, entry| !entry.expired(now, policy));
+            evicted += before - shard.statuses.len();
+            for (id, entry) in shard.statuses.iter() {
+                if let Some(at) = entry.finished_at {
+                    finished.push((entry.fetched.load(Ordering::Relaxed), at, id.clone()));
+                }
+            }
+        }
+
+        if finished.len() > self.policy.max_results {
+            // 已取走的排在前面，其次按完成时间从旧到新
+            finished.sort_by(|a, b| b.0.cmp(&a.0).then(a.1.cmp(&b.1)));
+            let excess = finished.len() - self.policy.max_results;
+            for (_, _, id) in finished.drain(..excess) {
+                self.shard(&id).write().unwrap().statuses.remove(&id);
+                evicted += 1;
+            }
+        }
+
+        // 清理指向已删除任务的提交映射
+        for submissions in &self.submissions {
+            submissions
+                .lock()
+                .unwrap()
+                .retain(|_, task_id| self.shard(task_id).read().unwrap().statuses.contains_key(task_id.as_str()));
+        }
+
+        if let Some(mut log) = self.lock_log() {
+            if log.records > (finished.len() * 2).max(1024) {
+                let mut records = Vec::new();
+                for shard in &self.shards {
+                    let shard = shard.read().unwrap();
+                    for (id, entry) in shard.statuses.iter() {
+                        if let Some(at) = entry.finished_at {
+                            records.push(LogRecord {
+                                id: id.clone(),
+                                at,
+                                submission_id: entry.submission_id,
+                                request_digest: entry.request_digest.clone(),
+                                status: Some(entry.status.clone()),
+                            });
+                        }
+                    }
+                }
+                if let Err(e) = log.rewrite(&records) {
+                    println!("Failed to compact result log {}: {}", log.path.display(), e);
+                }
+            }
+        }
+
+        evicted
+    }
+}
@@ -0,0 +1,193 @@
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{BTreeMap, HashMap};
+use std::fs;
+use std::hash::{Hash, Hasher};
+use std::io;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
+use std::time::UNIX_EPOCH;
+
+// 评测机本地的测试点，name 为输入文件名（不含扩展名）
+#[derive(Debug)]
+pub struct TestCase {
+    pub name: String,
+    pub input: String,
+    pub expected_output: String,
+}
+
+impl TestCase {
+    fn size(&self) -> usize {
+        self.name.len() + self.input.len() + self.expected_output.len()
+    }
+}
+
+struct CacheEntry {
+    version: u64,
+    cases: Arc<Vec<TestCase>>,
+    size: usize,
+    last_used: u64,
+}
+
+#[derive(Default)]
+struct CacheInner {
+    entries: HashMap<i32, CacheEntry>,
+    // 最近使用序号 -> 题目ID，序号最小的最先淘汰
+    lru: BTreeMap<u64, i32>,
+    used: usize,
+    tick: u64,
+}
+
+impl CacheInner {
+    fn touch(&mut self, problem_id: i32) {
+        self.tick += 1;
+        let tick = self.tick;
+        if let Some(entry) = self.entries.get_mut(&problem_id) {
+            self.lru.remove(&entry.last_used);
+            entry.last_used = tick;
+            self.lru.insert(tick, problem_id);
+        }
+    }
+
+    fn remove(&mut self, problem_id: i32) {
+        if let Some(entry) = self.entries.remove(&problem_id) {
+            self.lru.remove(&entry.last_used);
+            self.used -= entry.size;
+        }
+    }
+}
+
+// 按题目缓存测试数据，所有工作线程共享。
+// 缓存项以测试数据目录中各文件的名称、大小与修改时间计算版本，测试数据更新后自动重新加载；
+// 总大小超出预算时按最近最少使用淘汰
+pub struct TestCaseCache {
+    budget: usize,
+    inner: Mutex<CacheInner>,
+}
+
+impl std::fmt::Debug for TestCaseCache {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        let inner = self.inner.lock().unwrap();
+        f.debug_struct("TestCaseCache")
+            .field("budget", &self.budget)
+            .field("used", &inner.used)
+            .field("problems", &inner.entries.len())
+            .finish()
+    }
+}
+
+impl TestCaseCache {
+    // budget 为缓存的字节数上限，为 0 时不缓存
+    pub fn new(budget: usize) -> Self {
+        Self {
+            budget,
+            inner: Mutex::new(CacheInner::default()),
+        }
+    }
+
+    // 获取题目的测试数据，缓存未命中或版本变化时从目录加载。
+    // 目录不可读时返回 None
+    pub fn get(&self, problem_id: i32, dir: &Path) -> Option<Arc<Vec<TestCase>>> {
+        let files = list_test_files(dir).ok()?;
+        let version = version_of(&files);
+
+        {
+            let mut inner = self.inner.lock().unwrap();
+            match inner.entries.get(&problem_id) {
+                Some(entry) if entry.version == version => {
+                    let cases = entry.cases.clone();
+                    inner.touch(problem_id);
+                    return Some(cases);
+                }
+                Some(_) => inner.remove(problem_id),
+                None => {}
+            }
+        }
+
+        // 在锁外读取文件，不阻塞其他题目的命中
+        let cases = Arc::new(load_test_cases(&files));
+        let size: usize = cases.iter().map(|c| c.size()).sum();
+        if size > self.budget {
+            return Some(cases);
+        }
+
+        let mut inner = self.inner.lock().unwrap();
+        // 等待期间其他线程可能已加载同一版本
+        inner.remove(problem_id);
+        while inner.used + size > self.budget {
+            let oldest = match inner.lru.values().next() {
+                Some(&oldest) => oldest,
+                None => break,
+            };
+            inner.remove(oldest);
+        }
+        inner.used += size;
+        inner.entries.insert(problem_id, CacheEntry { version, cases: cases.clone(), size, last_used: 0 });
+        inner.touch(problem_id);
+        Some(cases)
+    }
+}
+
+// 测试数据目录中的 .in 文件及其元数据，数字文件名按数值排序（2.in 排在 10.in 之前），其余按文件名排序
+struct TestFile {
+    input_path: PathBuf,
+    // (输入文件大小, 修改时间, 输出文件大小, 修改时间)，用于计算版本
+    stamp: (u64, u128, u64, u128),
+}
+
+fn file_stamp(path: &Path) -> (u64, u128) {
+    match fs::metadata(path) {
+        Ok(meta) => {
+            let modified = meta
+                .modified()
+                .ok()
+                .and_then(|t| t.duration_since(UNIX_EPOCH).ok())
+                .map(|d| d.as_nanos())
+                .unwrap_or(0);
+            (meta.len(), modified)
+        }
+        Err(_) => (0, 0),
+    }
+}
+
+fn list_test_files(dir: &Path) -> io::Result<Vec<TestFile>> {
+    let mut input_paths: Vec<PathBuf> = fs::read_dir(dir)?
+        .filter_map(|e| e.ok())
+        .map(|e| e.path())
+        .filter(|p| p.extension().map_or(false, |ext| ext == "in"))
+        .collect();
+
+    input_paths.sort_by_key(|path| {
+        let number = path.file_stem().and_then(|s| s.to_str()).and_then(|s| s.parse::<u64>().ok());
+        (number.is_none(), number, path.clone())
+    });
+
+    Ok(input_paths
+        .into_iter()
+        .map(|input_path| {
+            let (input_len, input_modified) = file_stamp(&input_path);
+            let (output_len, output_modified) = file_stamp(&input_path.with_extension("out"));
+            TestFile { input_path, stamp: (input_len, input_modified, output_len, output_modified) }
+        })
+        .collect())
+}
+
+fn version_of(files: &[TestFile]) -> u64 {
+    let mut hasher = DefaultHasher::new();
+    for file in files {
+        file.input_path.hash(&mut hasher);
+        file.stamp.hash(&mut hasher);
+    }
+    hasher.finish()
+}
+
+fn load_test_cases(files: &[TestFile]) -> Vec<TestCase> {
+    files
+        .iter()
+        .map(|file| {
+            let name = file.input_path.file_stem().map(|s| s.to_string_lossy().into_owned()).unwrap_or_default();
+            let input = fs::read_to_string(&file.input_path).unwrap_or_default();
+            let expected_output = fs::read_to_string(file.input_path.with_extension("out")).unwrap_or_default();
+            TestCase { name, input, expected_output }
+        })
+        .collect()
+}
@@ -1,3 +1,5 @@
+use serde::{Deserialize, Serialize};
+
 #[derive(Debug, Clone)]
 pub struct JudgeTask {
     pub id: String,
@@ -7,9 +9,34 @@ pub struct JudgeTask {
     pub language: String,
     pub time_limit: i32, // milliseconds
     pub memory_limit: u64, // bytes
+    pub verdict_policy: VerdictPolicy,
+    // Web 端下发的测试点分值与子任务，为空时各测试点等分
+    pub test_cases: Vec<TestCaseSpec>,
 }
 
-#[derive(Debug, Clone)]
+// 判题策略
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Default, Deserialize)]
+#[serde(rename_all = "snake_case")]
+pub enum VerdictPolicy {
+    // 运行全部测试点，每个测试点单独计分（OI）
+    #[default]
+    All,
+    // 遇到首个未通过的测试点即停止，全部通过才得分（ICPC）
+    FirstFailure,
+    // 按子任务计分，子任务内出现未通过的测试点后跳过该子任务的其余测试点
+    Subtask,
+}
+
+// 测试点信息，name 为测试点输入文件名（不含扩展名）
+#[derive(Debug, Clone, Deserialize)]
+pub struct TestCaseSpec {
+    pub name: String,
+    pub score: i32,
+    #[serde(default)]
+    pub subtask: Option<i32>,
+}
+
+#[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct JudgeStatus {
     pub status: String,
     pub score: i32,
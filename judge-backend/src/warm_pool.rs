@@ -0,0 +1,437 @@
+use std::collections::HashMap;
+use std::fs::File;
+use std::path::Path;
+use std::sync::atomic::AtomicBool;
+use std::sync::Mutex;
+
+use crate::config::LanguageConfig;
+use crate::sandbox::{Limits, OutputSink, RunOutcome};
+
+// 预热运行时池：为解释型语言常驻已完成启动的运行时进程（zygote），
+// 每个测试点由其 fork 出的子进程执行用户代码，省去每个测试点的解释器启动开销。
+// 子进程与冷启动时一样位于独立进程组，受相同的 rlimit 与看门狗约束，运行结束即丢弃，
+// 常驻进程本身不执行用户代码，因此各测试点之间互不影响。
+// 计时从 fork 开始，预热语言的所有测试点都不计入解释器启动时间。
+// 目前支持 Python 3；JVM 无法安全 fork，Java、Kotlin 等仍按冷启动运行
+pub struct WarmPool {
+    // 语言 -> 常驻进程的解释器
+    programs: HashMap<String, String>,
+    // 语言 -> 空闲的常驻进程
+    idle: Mutex<HashMap<String, Vec<platform::Runtime>>>,
+    // 每种语言保留的空闲进程数
+    keep: usize,
+}
+
+impl std::fmt::Debug for WarmPool {
+    fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
+        let idle = self.idle.lock().unwrap();
+        let idle: HashMap<&String, usize> = idle.iter().map(|(lang, runtimes)| (lang, runtimes.len())).collect();
+        f.debug_struct("WarmPool").field("idle", &idle).field("keep", &self.keep).finish()
+    }
+}
+
+impl WarmPool {
+    // 为 languages 中支持预热的语言各预先启动 keep 个常驻进程
+    pub fn new(languages: &[String], language_configs: &HashMap<String, LanguageConfig>, keep: usize) -> Self {
+        let mut programs = HashMap::new();
+        for language in languages {
+            let lang_config = match language_configs.get(language) {
+                Some(lang_config) => lang_config,
+                None => continue,
+            };
+            if !platform::supports(language) {
+                println!("Warm runtime is not available for language '{}', running it cold", language);
+                continue;
+            }
+            programs.insert(language.clone(), lang_config.run.program.clone());
+        }
+
+        let pool = Self {
+            programs,
+            idle: Mutex::new(HashMap::new()),
+            keep,
+        };
+        for (language, program) in &pool.programs {
+            let mut started = Vec::new();
+            for _ in 0..keep {
+                match platform::Runtime::spawn(language, program) {
+                    Ok(runtime) => started.push(runtime),
+                    Err(e) => {
+                        println!("Failed to start warm runtime for {}: {}", language, e);
+                        break;
+                    }
+                }
+            }
+            println!("Started {} warm runtimes for {}", started.len(), language);
+            pool.idle.lock().unwrap().insert(language.clone(), started);
+        }
+        pool
+    }
+
+    // 由常驻进程运行测试点。language 未开启预热或无法获得常驻进程时返回 None，由调用方冷启动运行
+    pub fn run(
+        &self,
+        language: &str,
+        code_file: &Path,
+        work_dir: &Path,
+        stdin: &File,
+        limits: &Limits,
+        cancel: Option<&AtomicBool>,
+        sink: &mut dyn OutputSink,
+    ) -> Option<std::io::Result<RunOutcome>> {
+        self.programs.get(language)?;
+        platform::run(self, language, code_file, work_dir, stdin, limits, cancel, sink)
+    }
+
+    fn checkout(&self, language: &str) -> std::io::Result<platform::Runtime> {
+        if let Some(runtime) = self.idle.lock().unwrap().get_mut(language).and_then(|idle| idle.pop()) {
+            return Ok(runtime);
+        }
+        platform::Runtime::spawn(language, &self.programs[language])
+    }
+
+    fn checkin(&self, language: &str, runtime: platform::Runtime) {
+        let mut idle = self.idle.lock().unwrap();
+        let idle = idle.entry(language.to_string()).or_default();
+        if idle.len() < self.keep {
+            idle.push(runtime);
+        }
+    }
+}
+
+#[cfg(unix)]
+mod platform {
+    use super::*;
+    use std::io::{self, Read, Write};
+    use std::os::unix::io::{AsRawFd, FromRawFd, OwnedFd, RawFd};
+    use std::os::unix::net::UnixStream;
+    use std::process::{Child, Command, Stdio};
+    use std::time::{Duration, Instant};
+
+    use crate::sandbox::{self, Reaper};
+
+    // Python 3 常驻进程：从控制套接字（启动时的标准输入）逐行读取运行请求及随附的
+    // 标准输入/输出/错误描述符，fork 出子进程运行用户代码，回报子进程 pid，
+    // 子进程结束后回报 "wait 状态 CPU毫秒 峰值内存KB"
+    const PYTHON_ZYGOTE: &str = r#"
+import json, os, resource, runpy, socket, sys, traceback
+
+def run(request, fds):
+    try:
+        os.setpgid(0, 0)
+        if request['cpu'] is not None:
+            os.sched_setaffinity(0, {request['cpu']})
+        resource.setrlimit(resource.RLIMIT_CPU, (request['cpu_secs'], request['cpu_secs'] + 1))
+        if request['address_space'] is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (request['address_space'], request['address_space']))
+        if request['file_size'] is not None:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (request['file_size'], request['file_size']))
+        os.chdir(request['cwd'])
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.argv = [request['file']]
+        sys.path[0] = os.path.dirname(request['file'])
+    except BaseException:
+        os._exit(127)
+    status = 0
+    try:
+        runpy.run_path(request['file'], run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            status = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # 与直接运行一致，回溯从用户代码开始
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != request['file']:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+        status = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        status = status or 120
+    os._exit(status & 0xff)
+
+def main():
+    control = socket.socket(fileno=os.dup(0))
+    os.dup2(os.open(os.devnull, os.O_RDWR), 0)
+    pending = b''
+    while True:
+        fds = []
+        while b'\n' not in pending:
+            data, received, _, _ = socket.recv_fds(control, 65536, 3)
+            fds += received
+            if not data:
+                return
+            pending += data
+        line, pending = pending.split(b'\n', 1)
+        request = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            run(request, fds)
+        for fd in fds:
+            os.close(fd)
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        control.sendall(b'%d\n' % pid)
+        _, status, usage = os.wait4(pid, 0)
+        cpu_ms = int((usage.ru_utime + usage.ru_stime) * 1000)
+        control.sendall(b'%d %d %d\n' % (status, cpu_ms, usage.ru_maxrss))
+
+main()
+"#;
+
+    // 等待常驻进程回报子进程 pid 的最长时间
+    const SPAWN_TIMEOUT: Duration = Duration::from_secs(10);
+
+    pub fn supports(language: &str) -> bool {
+        zygote_script(language).is_some()
+    }
+
+    fn zygote_script(language: &str) -> Option<&'static str> {
+        match language {
+            "python_3" => Some(PYTHON_ZYGOTE),
+            _ => None,
+        }
+    }
+
+    pub struct Runtime {
+        process: Child,
+        control: UnixStream,
+        pending: Vec<u8>,
+    }
+
+    impl Drop for Runtime {
+        fn drop(&mut self) {
+            let _ = self.process.kill();
+            let _ = self.process.wait();
+        }
+    }
+
+    impl Runtime {
+        pub fn spawn(language: &str, program: &str) -> io::Result<Self> {
+            let script = zygote_script(language)
+                .ok_or_else(|| io::Error::new(io::ErrorKind::Unsupported, "warm runtime not supported"))?;
+            let (control, theirs) = UnixStream::pair()?;
+            let process = Command::new(program)
+                .arg("-c")
+                .arg(script)
+                .stdin(Stdio::from(OwnedFd::from(theirs)))
+                .stdout(Stdio::null())
+                .stderr(Stdio::null())
+                .spawn()?;
+            Ok(Self { process, control, pending: Vec::new() })
+        }
+
+        // 读取一行回报；block 为 false 且尚无完整的一行时返回 None。常驻进程退出时返回 UnexpectedEof
+        fn read_line(&mut self, block: bool) -> io::Result<Option<String>> {
+            self.control.set_nonblocking(!block)?;
+            loop {
+                if let Some(i) = self.pending.iter().position(|&b| b == b'\n') {
+                    let line: Vec<u8> = self.pending.drain(..=i).collect();
+                    return Ok(Some(String::from_utf8_lossy(&line).trim().to_string()));
+                }
+                let mut buf = [0u8; 256];
+                match self.control.read(&mut buf) {
+                    Ok(0) => return Err(io::ErrorKind::UnexpectedEof.into()),
+                    Ok(n) => self.pending.extend_from_slice(&buf[..n]),
+                    Err(e) if e.kind() == io::ErrorKind::WouldBlock && !block => return Ok(None),
+                    Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+                    Err(e) => return Err(e),
+                }
+            }
+        }
+    }
+
+    // 常驻进程 fork 出的子进程，由常驻进程回收后回报结果
+    struct ZygoteChild<'a> {
+        runtime: &'a mut Runtime,
+        pid: libc::pid_t,
+        // 常驻进程是否正常回报了结果，否则不再复用
+        healthy: bool,
+    }
+
+    impl Reaper for ZygoteChild<'_> {
+        fn pid(&self) -> libc::pid_t {
+            self.pid
+        }
+
+        fn reap(&mut self, block: bool) -> io::Result<Option<(libc::c_int, u64, u64)>> {
+            let line = match self.runtime.read_line(block) {
+                Ok(Some(line)) => line,
+                Ok(None) => return Ok(None),
+                // 常驻进程被用户代码终止：按被 SIGKILL 终止处理，资源占用以看门狗观察值为准
+                Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => return Ok(Some((libc::SIGKILL, 0, 0))),
+                Err(e) if e.kind() == io::ErrorKind::WouldBlock || e.kind() == io::ErrorKind::TimedOut => {
+                    return Ok(None)
+                }
+                Err(e) => return Err(e),
+            };
+            let fields: Vec<i64> = line.split_whitespace().filter_map(|v| v.parse().ok()).collect();
+            match fields[..] {
+                [status, cpu_ms, memory_kb] => {
+                    self.healthy = true;
+                    Ok(Some((status as libc::c_int, cpu_ms.max(0) as u64, memory_kb.max(0) as u64)))
+                }
+                _ => Err(io::Error::new(io::ErrorKind::InvalidData, format!("Bad warm runtime reply: {}", line))),
+            }
+        }
+    }
+
+    fn pipe() -> io::Result<(File, File)> {
+        let mut fds = [0 as RawFd; 2];
+        // 读写端均设置 close-on-exec，避免被并发创建的其他子进程继承而收不到 EOF
+        #[cfg(target_os = "linux")]
+        let ret = unsafe { libc::pipe2(fds.as_mut_ptr(), libc::O_CLOEXEC) };
+        #[cfg(not(target_os = "linux"))]
+        let ret = unsafe {
+            let ret = libc::pipe(fds.as_mut_ptr());
+            if ret == 0 {
+                libc::fcntl(fds[0], libc::F_SETFD, libc::FD_CLOEXEC);
+                libc::fcntl(fds[1], libc::F_SETFD, libc::FD_CLOEXEC);
+            }
+            ret
+        };
+        if ret != 0 {
+            return Err(io::Error::last_os_error());
+        }
+        unsafe { Ok((File::from_raw_fd(fds[0]), File::from_raw_fd(fds[1]))) }
+    }
+
+    // 通过 SCM_RIGHTS 随数据发送文件描述符
+    fn send_with_fds(socket: &mut UnixStream, data: &[u8], fds: &[RawFd]) -> io::Result<()> {
+        socket.set_nonblocking(false)?;
+        let fd_bytes = std::mem::size_of_val(fds) as u32;
+        unsafe {
+            // 以 u64 分配保证 cmsghdr 对齐
+            let space = libc::CMSG_SPACE(fd_bytes) as usize;
+            let mut control = vec![0u64; (space + 7) / 8];
+            let mut iov = libc::iovec { iov_base: data.as_ptr() as *mut libc::c_void, iov_len: data.len() };
+            let mut msg: libc::msghdr = std::mem::zeroed();
+            msg.msg_iov = &mut iov;
+            msg.msg_iovlen = 1;
+            msg.msg_control = control.as_mut_ptr() as *mut libc::c_void;
+            msg.msg_controllen = space as _;
+            let cmsg = libc::CMSG_FIRSTHDR(&msg);
+            (*cmsg).cmsg_level = libc::SOL_SOCKET;
+            (*cmsg).cmsg_type = libc::SCM_RIGHTS;
+            (*cmsg).cmsg_len = libc::CMSG_LEN(fd_bytes) as _;
+            std::ptr::copy_nonoverlapping(fds.as_ptr() as *const u8, libc::CMSG_DATA(cmsg), fd_bytes as usize);
+            let sent = libc::sendmsg(socket.as_raw_fd(), &msg, 0);
+            if sent < 0 {
+                return Err(io::Error::last_os_error());
+            }
+            socket.write_all(&data[sent as usize..])
+        }
+    }
+
+    pub fn run(
+        pool: &WarmPool,
+        language: &str,
+        code_file: &Path,
+        work_dir: &Path,
+        stdin: &File,
+        limits: &Limits,
+        cancel: Option<&AtomicBool>,
+        sink: &mut dyn OutputSink,
+    ) -> Option<io::Result<RunOutcome>> {
+        let request = serde_json::json!({
+            "file": code_file,
+            "cwd": work_dir,
+            "cpu_secs": limits.rlimit_cpu_secs(),
+            "address_space": limits.address_space_bytes,
+            "file_size": limits.file_bytes,
+            "cpu": limits.cpu,
+        });
+        let request = format!("{}\n", request);
+        let (stdout_read, stdout_write) = match pipe() {
+            Ok(pipe) => pipe,
+            Err(e) => return Some(Err(e)),
+        };
+        let (stderr_read, stderr_write) = match pipe() {
+            Ok(pipe) => pipe,
+            Err(e) => return Some(Err(e)),
+        };
+        let fds = [stdin.as_raw_fd(), stdout_write.as_raw_fd(), stderr_write.as_raw_fd()];
+
+        // 空闲进程可能已被上一个测试点的用户代码终止，发送失败时换一个新进程重试一次
+        let mut runtime = None;
+        for _ in 0..2 {
+            let mut candidate = match pool.checkout(language) {
+                Ok(candidate) => candidate,
+                Err(e) => {
+                    println!("Failed to start warm runtime for {}: {}", language, e);
+                    return None;
+                }
+            };
+            if send_with_fds(&mut candidate.control, request.as_bytes(), &fds).is_ok() {
+                runtime = Some(candidate);
+                break;
+            }
+        }
+        let mut runtime = runtime?;
+        // 写端已交给子进程，本进程持有的副本必须关闭，否则读不到 EOF
+        drop(stdout_write);
+        drop(stderr_write);
+
+        if let Err(e) = runtime.control.set_read_timeout(Some(SPAWN_TIMEOUT)) {
+            return Some(Err(e));
+        }
+        let pid = match runtime.read_line(true) {
+            Ok(Some(line)) => match line.parse::<libc::pid_t>() {
+                Ok(pid) if pid > 0 => pid,
+                _ => return Some(Err(io::Error::new(io::ErrorKind::InvalidData, format!("Bad warm runtime reply: {}", line)))),
+            },
+            Ok(None) => return Some(Err(io::ErrorKind::TimedOut.into())),
+            Err(e) => return Some(Err(e)),
+        };
+
+        let start = Instant::now();
+        let mut child = ZygoteChild { runtime: &mut runtime, pid, healthy: false };
+        let outcome = sandbox::supervise(Some(stdout_read), Some(stderr_read), limits, start, sink, |output_exceeded| {
+            sandbox::watch_process(&mut child, limits, start, cancel, output_exceeded)
+        });
+        if child.healthy {
+            pool.checkin(language, runtime);
+        }
+        Some(outcome)
+    }
+}
+
+#[cfg(not(unix))]
+mod platform {
+    use super::*;
+
+    pub struct Runtime;
+
+    impl Runtime {
+        pub fn spawn(_language: &str, _program: &str) -> std::io::Result<Self> {
+            Err(std::io::ErrorKind::Unsupported.into())
+        }
+    }
+
+    pub fn supports(_language: &str) -> bool {
+        false
+    }
+
+    pub fn run(
+        _pool: &WarmPool,
+        _language: &str,
+        _code_file: &Path,
+        _work_dir: &Path,
+        _stdin: &File,
+        _limits: &Limits,
+        _cancel: Option<&AtomicBool>,
+        _sink: &mut dyn OutputSink,
+    ) -> Option<std::io::Result<RunOutcome>> {
+        None
+    }
+}
@@ -0,0 +1,133 @@
+use std::fs::{self, File};
+use std::io::{self, Seek, SeekFrom, Write};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+
+// 工作目录名前缀，启动时只清理带此前缀的目录
+const SLOT_PREFIX: &str = "slot-";
+
+// 评测工作目录池：在根目录（优先使用内存文件系统）下预先创建若干工作目录，
+// 评测任务独占一个目录，结束时清空后归还复用，不再为每个任务新建目录
+#[derive(Debug)]
+pub struct Workspaces {
+    root: PathBuf,
+    free: Mutex<Vec<PathBuf>>,
+    next_slot: AtomicUsize,
+}
+
+// 已占用的工作目录，释放时（包括提前返回与 panic）清空并归还
+#[derive(Debug)]
+pub struct Workspace<'a> {
+    pool: &'a Workspaces,
+    dir: PathBuf,
+}
+
+impl Workspaces {
+    // 在 root 下预先创建 slots 个工作目录；上次运行遗留的工作目录先行删除
+    pub fn new(root: &Path, slots: usize) -> io::Result<Self> {
+        fs::create_dir_all(root)?;
+        let root = fs::canonicalize(root)?;
+        for entry in fs::read_dir(&root)?.filter_map(|e| e.ok()) {
+            if entry.file_name().to_string_lossy().starts_with(SLOT_PREFIX) {
+                let _ = fs::remove_dir_all(entry.path());
+            }
+        }
+
+        let pool = Self {
+            root,
+            free: Mutex::new(Vec::new()),
+            next_slot: AtomicUsize::new(0),
+        };
+        let mut free = Vec::with_capacity(slots);
+        for _ in 0..slots {
+            free.push(pool.create_slot()?);
+        }
+        *pool.free.lock().unwrap() = free;
+        Ok(pool)
+    }
+
+    pub fn root(&self) -> &Path {
+        &self.root
+    }
+
+    fn create_slot(&self) -> io::Result<PathBuf> {
+        let dir = self.root.join(format!("{}{}", SLOT_PREFIX, self.next_slot.fetch_add(1, Ordering::Relaxed)));
+        fs::create_dir_all(&dir)?;
+        Ok(dir)
+    }
+
+    // 取一个空的工作目录，预先创建的目录用完时新建
+    pub fn acquire(&self) -> io::Result<Workspace<'_>> {
+        let dir = match self.free.lock().unwrap().pop() {
+            Some(dir) => dir,
+            None => self.create_slot()?,
+        };
+        Ok(Workspace { pool: self, dir })
+    }
+}
+
+impl Workspace<'_> {
+    pub fn path(&self) -> &Path {
+        &self.dir
+    }
+
+    // 以测试点输入构造标准输入。Linux 上使用 memfd，数据只在内存中，
+    // 与普通文件一样可以 seek、mmap；其他系统写入工作目录中的文件
+    pub fn input_file(&self, index: usize, data: &[u8]) -> io::Result<File> {
+        let mut file = memory_file(&format!("input{}", index)).or_else(|_| {
+            File::options()
+                .read(true)
+                .write(true)
+                .create(true)
+                .truncate(true)
+                .open(self.dir.join(format!("input{}.txt", index)))
+        })?;
+        file.write_all(data)?;
+        file.seek(SeekFrom::Start(0))?;
+        Ok(file)
+    }
+}
+
+impl Drop for Workspace<'_> {
+    fn drop(&mut self) {
+        match clear_dir(&self.dir) {
+            Ok(()) => self.pool.free.lock().unwrap().push(self.dir.clone()),
+            Err(e) => {
+                // 无法清空的目录不再复用
+                println!("Failed to clean workspace {}: {}", self.dir.display(), e);
+                let _ = fs::remove_dir_all(&self.dir);
+            }
+        }
+    }
+}
+
+fn clear_dir(dir: &Path) -> io::Result<()> {
+    for entry in fs::read_dir(dir)? {
+        let entry = entry?;
+        if entry.file_type()?.is_dir() {
+            fs::remove_dir_all(entry.path())?;
+        } else {
+            fs::remove_file(entry.path())?;
+        }
+    }
+    Ok(())
+}
+
+#[cfg(target_os = "linux")]
+fn memory_file(name: &str) -> io::Result<File> {
+    use std::ffi::CString;
+    use std::os::unix::io::FromRawFd;
+
+    let name = CString::new(name).map_err(|e| io::Error::new(io::ErrorKind::InvalidInput, e))?;
+    let fd = unsafe { libc::memfd_create(name.as_ptr(), libc::MFD_CLOEXEC) };
+    if fd < 0 {
+        return Err(io::Error::last_os_error());
+    }
+    Ok(unsafe { File::from_raw_fd(fd) })
+}
+
+#[cfg(not(target_os = "linux"))]
+fn memory_file(_name: &str) -> io::Result<File> {
+    Err(io::ErrorKind::Unsupported.into())
+}
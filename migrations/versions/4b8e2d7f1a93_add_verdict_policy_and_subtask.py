@@ -0,0 +1,32 @@
+"""add problem verdict policy and test case subtask
+
+Revision ID: 4b8e2d7f1a93
+Revises: 7a3f9c1d2e64
+Create Date: 2026-10-16 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2d7f1a93'
+down_revision = '7a3f9c1d2e64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('problems', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('verdict_policy', sa.String(length=20), nullable=False, server_default='all'))
+
+    with op.batch_alter_table('test_cases', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('subtask', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('test_cases', schema=None) as batch_op:
+        batch_op.drop_column('subtask')
+
+    with op.batch_alter_table('problems', schema=None) as batch_op:
+        batch_op.drop_column('verdict_policy')
@@ -0,0 +1,32 @@
+"""add submission judge queue fields
+
+Revision ID: 5c2e8a41f0d3
+Revises: 3d1827bb7b17
+Create Date: 2026-10-16 10:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8a41f0d3'
+down_revision = '3d1827bb7b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_submissions_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_submissions_status'))
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,26 @@
+"""add submission judge node
+
+Revision ID: 7a3f9c1d2e64
+Revises: 5c2e8a41f0d3
+Create Date: 2026-10-16 14:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3f9c1d2e64'
+down_revision = '5c2e8a41f0d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('judge_node', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.drop_column('judge_node')
@@ -0,0 +1,47 @@
+"""add verdict cache
+
+Revision ID: e2c6a9b14d57
+Revises: 4b8e2d7f1a93
+Create Date: 2026-10-16 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c6a9b14d57'
+down_revision = '4b8e2d7f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('verdict_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('testcase_version', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('execution_time', sa.Integer(), nullable=True),
+    sa.Column('memory_used', sa.Integer(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('verdict_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_verdict_cache_cache_key'), ['cache_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_verdict_cache_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_verdict_cache_problem_id'), ['problem_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('verdict_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_verdict_cache_problem_id'))
+        batch_op.drop_index(batch_op.f('ix_verdict_cache_id'))
+        batch_op.drop_index(batch_op.f('ix_verdict_cache_cache_key'))
+
+    op.drop_table('verdict_cache')
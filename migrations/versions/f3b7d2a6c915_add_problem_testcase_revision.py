@@ -0,0 +1,29 @@
+"""add problem testcase revision
+
+Revision ID: f3b7d2a6c915
+Revises: e2c6a9b14d57
+Create Date: 2026-10-16 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d2a6c915'
+down_revision = 'e2c6a9b14d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('problems', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('testcase_revision', sa.Integer(), nullable=False, server_default='0'))
+
+    # 缓存键与测试数据版本的算法已变化，旧结果不会再命中
+    op.execute('DELETE FROM verdict_cache')
+
+
+def downgrade():
+    with op.batch_alter_table('problems', schema=None) as batch_op:
+        batch_op.drop_column('testcase_revision')
@@ -6,12 +6,14 @@ import os
 os.environ.setdefault("FLASK_APP", "everjudge")
 
 from everjudge import create_app
+from everjudge.utils import start_embedded_dispatcher
 app = create_app()
 
 if __name__ == "__main__":
     host = app.config.get("SERVER_HOST", "0.0.0.0")
     port = int(app.config.get("SERVER_PORT", "5000"))
     debug = app.config.get("DEBUG", False)
+    start_embedded_dispatcher(app)
     
     if debug:
         try:
@@ -2,4 +2,6 @@
 uWSGI 入口：uwsgi --ini uwsgi.ini 将使用本模块的 app。
 """
 from everjudge import create_app
+from everjudge.utils import start_embedded_dispatcher
 app = create_app()
+start_embedded_dispatcher(app)